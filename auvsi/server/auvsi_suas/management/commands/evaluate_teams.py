@@ -0,0 +1,58 @@
+"""Command to evaluate the teams against a mission."""
+
+import time
+from auvsi_suas.models import MissionConfig
+from auvsi_suas.views.auvsi_admin.evaluate_teams import evaluation_csv
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.management.base import CommandError
+
+
+class Command(BaseCommand):
+    help = ('Evaluates the teams against a mission, writing the evaluation '
+            'CSV and reporting the time taken.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mission',
+                            type=int,
+                            help='ID of the mission to evaluate. Defaults to '
+                            'the active mission.')
+        parser.add_argument('--processes',
+                            type=int,
+                            help='Number of worker processes. Defaults to the '
+                            'EVALUATE_TEAMS_PROCESSES setting.')
+        parser.add_argument('--output',
+                            help='File to write the CSV to. Defaults to '
+                            'standard output.')
+
+    def handle(self, *args, **options):
+        try:
+            if options['mission'] is not None:
+                mission = MissionConfig.objects.get(pk=options['mission'])
+            else:
+                mission = MissionConfig.objects.get(is_active=True)
+        except MissionConfig.DoesNotExist:
+            raise CommandError('Mission not found.')
+        except MissionConfig.MultipleObjectsReturned:
+            raise CommandError('Invalid number of active missions.')
+
+        processes = options['processes']
+        if processes is None:
+            processes = settings.EVALUATE_TEAMS_PROCESSES
+
+        start_time = time.time()
+        user_eval_data = mission.evaluate_teams(processes=processes)
+        wall_time = time.time() - start_time
+
+        output = evaluation_csv(user_eval_data)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output)
+        else:
+            self.stdout.write(output, ending='')
+
+        for (user, eval_data) in user_eval_data.iteritems():
+            self.stderr.write('Evaluated %s in %f seconds.' %
+                              (user.username, eval_data['evaluation_time']))
+        self.stderr.write('Evaluated %d teams in %f seconds.' %
+                          (len(user_eval_data), wall_time))
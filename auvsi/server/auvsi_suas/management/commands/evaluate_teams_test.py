@@ -0,0 +1,37 @@
+"""Tests for the evaluate_teams command."""
+
+import cStringIO
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+
+
+class TestEvaluateTeamsCommand(TestCase):
+    """Tests the evaluate_teams command."""
+
+    fixtures = ['testdata/sample_mission.json']
+
+    def test_evaluate_teams(self):
+        """Writes the CSV and the timings."""
+        stdout = cStringIO.StringIO()
+        stderr = cStringIO.StringIO()
+        call_command('evaluate_teams', stdout=stdout, stderr=stderr)
+
+        csv_data = stdout.getvalue()
+        self.assertEqual(len(csv_data.split('\n')), 4)
+        self.assertIn('username', csv_data)
+        self.assertIn('user0', csv_data)
+        self.assertIn('user1', csv_data)
+
+        timings = stderr.getvalue()
+        self.assertIn('Evaluated user0', timings)
+        self.assertIn('Evaluated user1', timings)
+        self.assertIn('Evaluated 2 teams', timings)
+
+    def test_mission_not_found(self):
+        """Unknown mission is an error."""
+        with self.assertRaises(CommandError):
+            call_command('evaluate_teams',
+                         mission=100000,
+                         stdout=cStringIO.StringIO(),
+                         stderr=cStringIO.StringIO())
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import models, migrations
+import django.utils.timezone
+
+# Number of logs to copy per query.
+BATCH_SIZE = 1000
+
+
+def inline_positions(apps, schema_editor):
+    """Copies the old UasTelemetry into the inline table, deleting old rows.
+
+    The AccessLog parent rows and the positions used only by telemetry are
+    deleted as well, as nothing else refers to them.
+    """
+    AccessLog = apps.get_model('auvsi_suas', 'AccessLog')
+    AerialPosition = apps.get_model('auvsi_suas', 'AerialPosition')
+    GpsPosition = apps.get_model('auvsi_suas', 'GpsPosition')
+    LegacyUasTelemetry = apps.get_model('auvsi_suas', 'LegacyUasTelemetry')
+    MissionConfig = apps.get_model('auvsi_suas', 'MissionConfig')
+    StationaryObstacle = apps.get_model('auvsi_suas', 'StationaryObstacle')
+    Target = apps.get_model('auvsi_suas', 'Target')
+    UasTelemetry = apps.get_model('auvsi_suas', 'UasTelemetry')
+    Waypoint = apps.get_model('auvsi_suas', 'Waypoint')
+
+    rows = LegacyUasTelemetry.objects.order_by('pk').values_list(
+        'pk', 'user_id', 'timestamp', 'uas_position_id',
+        'uas_position__altitude_msl', 'uas_position__gps_position_id',
+        'uas_position__gps_position__latitude',
+        'uas_position__gps_position__longitude', 'uas_heading')
+
+    log_ids = []
+    aerial_ids = set()
+    gps_ids = set()
+    logs = []
+    for (pk, user_id, timestamp, aerial_id, altitude_msl, gps_id, latitude,
+         longitude, uas_heading) in rows.iterator():
+        log_ids.append(pk)
+        aerial_ids.add(aerial_id)
+        gps_ids.add(gps_id)
+        logs.append(UasTelemetry(user_id=user_id,
+                                 timestamp=timestamp,
+                                 latitude=latitude,
+                                 longitude=longitude,
+                                 altitude_msl=altitude_msl,
+                                 uas_heading=uas_heading))
+        if len(logs) >= BATCH_SIZE:
+            UasTelemetry.objects.bulk_create(logs)
+            logs = []
+    UasTelemetry.objects.bulk_create(logs)
+
+    # Deleting the parent rows cascades to the old telemetry rows.
+    for i in range(0, len(log_ids), BATCH_SIZE):
+        AccessLog.objects.filter(pk__in=log_ids[i:i + BATCH_SIZE]).delete()
+
+    # Keep any positions which are shared with other models.
+    aerial_ids -= set(Waypoint.objects.values_list('position_id', flat=True))
+    aerial_ids = list(aerial_ids)
+    for i in range(0, len(aerial_ids), BATCH_SIZE):
+        AerialPosition.objects.filter(
+            pk__in=aerial_ids[i:i + BATCH_SIZE]).delete()
+
+    gps_ids -= set(AerialPosition.objects.values_list('gps_position_id',
+                                                      flat=True))
+    gps_ids -= set(StationaryObstacle.objects.values_list('gps_position_id',
+                                                          flat=True))
+    gps_ids -= set(Target.objects.values_list('location_id', flat=True))
+    for field in MissionConfig._meta.get_fields():
+        if field.is_relation and field.related_model == GpsPosition:
+            gps_ids -= set(MissionConfig.objects.values_list(
+                field.attname, flat=True))
+    gps_ids = list(gps_ids)
+    for i in range(0, len(gps_ids), BATCH_SIZE):
+        GpsPosition.objects.filter(pk__in=gps_ids[i:i + BATCH_SIZE]).delete()
+
+
+def split_positions(apps, schema_editor):
+    """Copies inline UasTelemetry back into the multi-table layout."""
+    AerialPosition = apps.get_model('auvsi_suas', 'AerialPosition')
+    GpsPosition = apps.get_model('auvsi_suas', 'GpsPosition')
+    LegacyUasTelemetry = apps.get_model('auvsi_suas', 'LegacyUasTelemetry')
+    UasTelemetry = apps.get_model('auvsi_suas', 'UasTelemetry')
+
+    for log in UasTelemetry.objects.order_by('pk').iterator():
+        gps_position = GpsPosition.objects.create(latitude=log.latitude,
+                                                  longitude=log.longitude)
+        aerial_position = AerialPosition.objects.create(
+            gps_position=gps_position,
+            altitude_msl=log.altitude_msl)
+        LegacyUasTelemetry.objects.create(user_id=log.user_id,
+                                          timestamp=log.timestamp,
+                                          uas_position=aerial_position,
+                                          uas_heading=log.uas_heading)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('auvsi_suas', '0011_accesslog_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.RenameModel(old_name='UasTelemetry',
+                               new_name='LegacyUasTelemetry', ),
+        migrations.CreateModel(
+            name='UasTelemetry',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID',
+                                        serialize=False,
+                                        auto_created=True,
+                                        primary_key=True)),
+                ('timestamp', models.DateTimeField(
+                    default=django.utils.timezone.now,
+                    db_index=True)),
+                ('latitude', models.FloatField()),
+                ('longitude', models.FloatField()),
+                ('altitude_msl', models.FloatField()),
+                ('uas_heading', models.FloatField()),
+                ('user', models.ForeignKey(to=settings.AUTH_USER_MODEL)),
+            ],
+            options={'index_together': set([('user', 'timestamp')]), }, ),
+        migrations.RunPython(inline_positions, split_positions),
+        migrations.DeleteModel(name='LegacyUasTelemetry', ),
+    ]
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import models, migrations
+import django.utils.timezone
+
+# Number of logs to copy per query.
+BATCH_SIZE = 1000
+
+# The (legacy name, name) of each access log moved into its own table.
+ACCESS_LOG_MODELS = [
+    ('LegacyObstacleAccessLog', 'ObstacleAccessLog'),
+    ('LegacyServerInfoAccessLog', 'ServerInfoAccessLog'),
+]
+
+
+def inline_access_logs(apps, schema_editor):
+    """Copies the old access logs into their own tables, deleting old rows.
+
+    The AccessLog parent rows are deleted as well, as nothing else refers to
+    them.
+    """
+    AccessLog = apps.get_model('auvsi_suas', 'AccessLog')
+
+    for (legacy_name, name) in ACCESS_LOG_MODELS:
+        LegacyLog = apps.get_model('auvsi_suas', legacy_name)
+        Log = apps.get_model('auvsi_suas', name)
+
+        rows = LegacyLog.objects.order_by('pk').values_list('pk', 'user_id',
+                                                            'timestamp')
+
+        log_ids = []
+        logs = []
+        for (pk, user_id, timestamp) in rows.iterator():
+            log_ids.append(pk)
+            logs.append(Log(user_id=user_id, timestamp=timestamp))
+            if len(logs) >= BATCH_SIZE:
+                Log.objects.bulk_create(logs)
+                logs = []
+        Log.objects.bulk_create(logs)
+
+        # Deleting the parent rows cascades to the old log rows.
+        for i in range(0, len(log_ids), BATCH_SIZE):
+            AccessLog.objects.filter(pk__in=log_ids[i:i + BATCH_SIZE]).delete()
+
+
+def split_access_logs(apps, schema_editor):
+    """Copies the access logs back into the multi-table layout."""
+    for (legacy_name, name) in ACCESS_LOG_MODELS:
+        LegacyLog = apps.get_model('auvsi_suas', legacy_name)
+        Log = apps.get_model('auvsi_suas', name)
+
+        for log in Log.objects.order_by('pk').iterator():
+            LegacyLog.objects.create(user_id=log.user_id,
+                                     timestamp=log.timestamp)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('auvsi_suas', '0012_uastelemetry_inline_position'),
+    ]
+
+    operations = [
+        migrations.RenameModel(old_name='ObstacleAccessLog',
+                               new_name='LegacyObstacleAccessLog', ),
+        migrations.RenameModel(old_name='ServerInfoAccessLog',
+                               new_name='LegacyServerInfoAccessLog', ),
+        migrations.CreateModel(
+            name='ObstacleAccessLog',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID',
+                                        serialize=False,
+                                        auto_created=True,
+                                        primary_key=True)),
+                ('timestamp', models.DateTimeField(
+                    default=django.utils.timezone.now,
+                    db_index=True)),
+                ('user', models.ForeignKey(to=settings.AUTH_USER_MODEL)),
+            ],
+            options={'index_together': set([('user', 'timestamp')]), }, ),
+        migrations.CreateModel(
+            name='ServerInfoAccessLog',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID',
+                                        serialize=False,
+                                        auto_created=True,
+                                        primary_key=True)),
+                ('timestamp', models.DateTimeField(
+                    default=django.utils.timezone.now,
+                    db_index=True)),
+                ('user', models.ForeignKey(to=settings.AUTH_USER_MODEL)),
+            ],
+            options={'index_together': set([('user', 'timestamp')]), }, ),
+        migrations.RunPython(inline_access_logs, split_access_logs),
+        migrations.DeleteModel(name='LegacyObstacleAccessLog', ),
+        migrations.DeleteModel(name='LegacyServerInfoAccessLog', ),
+    ]
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('auvsi_suas', '0013_access_log_single_table'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamViolations',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('pickled_state', models.BinaryField()),
+                ('mission', models.ForeignKey(to='auvsi_suas.MissionConfig')),
+                ('user', models.ForeignKey(to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterUniqueTogether(
+            name='teamviolations',
+            unique_together=set([('mission', 'user')]),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+from django.conf import settings
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('auvsi_suas', '0014_team_violations'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamFlightCheckpoint',
+            fields=[
+                ('id', models.AutoField(verbose_name='ID', serialize=False, auto_created=True, primary_key=True)),
+                ('flight_start', models.DateTimeField(null=True, blank=True)),
+                ('pickled_checkpoint', models.BinaryField()),
+                ('mission', models.ForeignKey(to='auvsi_suas.MissionConfig')),
+                ('user', models.ForeignKey(to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AlterIndexTogether(
+            name='teamflightcheckpoint',
+            index_together=set([('mission', 'user')]),
+        ),
+    ]
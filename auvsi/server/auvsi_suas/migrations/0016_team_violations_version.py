@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auvsi_suas', '0015_team_flight_checkpoint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teamviolations',
+            name='version',
+            field=models.IntegerField(default=1),
+        ),
+    ]
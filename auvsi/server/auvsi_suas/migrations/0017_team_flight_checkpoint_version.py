@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auvsi_suas', '0016_team_violations_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='teamflightcheckpoint',
+            name='version',
+            field=models.IntegerField(default=1),
+        ),
+    ]
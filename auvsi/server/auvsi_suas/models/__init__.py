@@ -1,5 +1,7 @@
 from aerial_position import AerialPosition
 from access_log import AccessLog
+from access_log_buffer import AccessLogBuffer
+from flight_index import FlightIndex
 from fly_zone import FlyZone
 from gps_position import GpsPosition
 from mission_config import MissionConfig
@@ -11,5 +13,7 @@ from stationary_obstacle import StationaryObstacle
 from target import Target, TargetType, Color, Shape, Orientation
 from time_period import TimePeriod
 from takeoff_or_landing_event import TakeoffOrLandingEvent
+from team_flight_checkpoint import TeamFlightCheckpoint
+from team_violations import TeamViolations
 from uas_telemetry import UasTelemetry
 from waypoint import Waypoint
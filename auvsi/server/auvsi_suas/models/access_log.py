@@ -3,18 +3,30 @@
 import datetime
 import numpy as np
 from time_period import TimePeriod
+from auvsi_suas.models.epoch import seconds_since_epoch
 from django.conf import settings
 from django.db import models
 from django.utils import timezone
 
+# Percentiles of the time between logs given by rate statistics.
+RATE_PERCENTILES = [50, 90, 99]
 
-class AccessLog(models.Model):
-    """Base class which logs access of information."""
-    # Timestamp of the access
-    timestamp = models.DateTimeField(auto_now_add=True, db_index=True)
+
+class AbstractAccessLog(models.Model):
+    """Abstract base class which logs access of information.
+
+    Subclasses of this are stored in their own table, without a join to a
+    parent table, which keeps high-rate logs cheap to write and to read.
+    """
+    # Timestamp of the access. Defaults to now, but may be given explicitly
+    # for logs which are reported after the fact (e.g. batched telemetry).
+    timestamp = models.DateTimeField(default=timezone.now, db_index=True)
     # The user which accessed the data
     user = models.ForeignKey(settings.AUTH_USER_MODEL, db_index=True)
 
+    class Meta:
+        abstract = True
+
     def __unicode__(self):
         """Descriptive text for use in displays."""
         return unicode("%s (pk:%s, user:%s, timestamp:%s)" %
@@ -86,6 +98,128 @@ class AccessLog(models.Model):
 
         return ret
 
+    @classmethod
+    def timestamps_by_user(cls, users, time_periods=None):
+        """Gets the sorted log times of users, with a single query.
+
+        Args:
+            users: The users to get the log times for.
+            time_periods: Optional. A list of TimePeriod objects. If given,
+                only times within the bounds of the periods are loaded.
+        Returns:
+            A map from user ID to a sorted numpy array of log times as
+            seconds since the epoch. Users without logs map to empty arrays.
+        """
+        logs = cls.objects.filter(user__in=[user.pk for user in users])
+        if time_periods:
+            starts = [period.start for period in time_periods]
+            ends = [period.end for period in time_periods]
+            if None not in starts:
+                logs = logs.filter(timestamp__gte=min(starts))
+            if None not in ends:
+                logs = logs.filter(timestamp__lte=max(ends))
+        rows = logs.order_by('user', 'timestamp').values_list('user_id',
+                                                              'timestamp')
+
+        user_times = dict((user.pk, []) for user in users)
+        for (user_id, timestamp) in rows.iterator():
+            user_times[user_id].append(timestamp)
+        return dict((user_id, seconds_since_epoch(times))
+                    for (user_id, times) in user_times.iteritems())
+
+    @classmethod
+    def times_between_logs(cls, time_periods, times):
+        """Gets the times between logs within the time periods.
+
+        The times between the start of a period and its first log, and between
+        its last log and the end, are included. Periods without logs count in
+        full.
+
+        Args:
+            time_periods: A list of TimePeriod objects.
+            times: A sorted numpy array of log times as seconds since the
+                epoch.
+        Returns:
+            A numpy array of the times between logs in seconds.
+        """
+        gaps = [np.zeros(0)]
+        for period in time_periods:
+            start = end = None
+            first = 0
+            last = len(times)
+            if period.start is not None:
+                start = seconds_since_epoch([period.start])[0]
+                first = np.searchsorted(times, start, side='left')
+            if period.end is not None:
+                end = seconds_since_epoch([period.end])[0]
+                last = np.searchsorted(times, end, side='right')
+            period_times = times[first:last]
+
+            # Account for a time period with no logs
+            if len(period_times) == 0:
+                if start is not None and end is not None:
+                    gaps.append(np.array([end - start]))
+                continue
+
+            # Account for time between takeoff, logs and landing
+            if start is not None:
+                period_times = np.concatenate(([start], period_times))
+            if end is not None:
+                period_times = np.concatenate((period_times, [end]))
+            gaps.append(np.diff(period_times))
+        return np.concatenate(gaps)
+
+    @classmethod
+    def rate_stats(cls, user, time_periods, time_period_logs=None):
+        """Gets statistics of the time between access logs.
+
+        Args:
+            user: The user to get the access log rates for.
+            time_periods: A list of TimePeriod objects. Note: to avoid
+                computing rates with duplicate logs, ensure that all
+                time periods are non-overlapping.
+            time_period_logs: Optional. A list of AccessLog lists, where each
+                AccessLog list contains all AccessLogs corresponding to the
+                related TimePeriod. If None, the log times are loaded with a
+                single query.
+        Returns:
+            A dict with the 'max' and 'avg' time between logs, and 'pN' for
+            each Nth percentile in RATE_PERCENTILES. Values are None if there
+            are no times between logs.
+        """
+        if not time_periods:
+            return cls.gap_stats(np.zeros(0))
+
+        if time_period_logs:
+            gaps = [cls.times_between_logs(
+                [period], seconds_since_epoch([log.timestamp for log in logs]))
+                    for (period, logs) in zip(time_periods, time_period_logs)]
+            return cls.gap_stats(np.concatenate(gaps))
+
+        times = cls.timestamps_by_user([user], time_periods)[user.pk]
+        return cls.gap_stats(cls.times_between_logs(time_periods, times))
+
+    @classmethod
+    def gap_stats(cls, gaps):
+        """Computes statistics of the times between logs.
+
+        Args:
+            gaps: A numpy array of times between logs in seconds.
+        Returns:
+            The dict of statistics described by rate_stats().
+        """
+        if len(gaps) == 0:
+            stats = {'max': None, 'avg': None}
+            for percentile in RATE_PERCENTILES:
+                stats['p%d' % percentile] = None
+            return stats
+
+        stats = {'max': float(np.max(gaps)), 'avg': float(np.mean(gaps))}
+        for (percentile, value) in zip(RATE_PERCENTILES,
+                                       np.percentile(gaps, RATE_PERCENTILES)):
+            stats['p%d' % percentile] = float(value)
+        return stats
+
     @classmethod
     def rates(cls, user, time_periods, time_period_logs=None):
         """Gets the access log rates.
@@ -97,54 +231,18 @@ class AccessLog(models.Model):
                 time periods are non-overlapping.
             time_period_logs: Optional. A list of AccessLog lists, where each
                 AccessLog list contains all AccessLogs corresponding to the
-                related TimePeriod. If None, will obtain by calling
-                by_time_period().
+                related TimePeriod. If None, the log times are loaded with a
+                single query.
         Returns:
             A (max, avg) tuple. The max is the max time between logs, and avg
             is the avg time between logs.
             """
-        # Check that time periods were provided.
-        if not time_periods:
-            return (None, None)
+        stats = cls.rate_stats(user, time_periods, time_period_logs)
+        return (stats['max'], stats['avg'])
 
-        # If logs were not provided, obtain.
-        if not time_period_logs:
-            time_period_logs = cls.by_time_period(user, time_periods)
 
-        # Calculate time between log files.
-        times_between_logs = []
-        for i, period in enumerate(time_periods):
-            # Get the logs for this period
-            # Coerce the QuerySet into a list, so we can use negative indexing.
-            logs = list(time_period_logs[i])
+class AccessLog(AbstractAccessLog):
+    """Base class which logs access of information.
 
-            # Account for a time period with no logs
-            if len(logs) == 0:
-                if period.start is not None and period.end is not None:
-                    time_diff = (period.end - period.start).total_seconds()
-                    times_between_logs.append(time_diff)
-                continue
-
-            # Account for time between takeoff and first log
-            if period.start is not None:
-                first = logs[0]
-                time_diff = (first.timestamp - period.start).total_seconds()
-                times_between_logs.append(time_diff)
-
-            # Account for time between logs
-            for j, log in enumerate(logs[:-1]):
-                nextlog = logs[j + 1]
-                time_diff = (nextlog.timestamp - log.timestamp).total_seconds()
-                times_between_logs.append(time_diff)
-
-            # Account for time between last log and landing
-            if period.end is not None:
-                last_log = logs[-1]
-                time_diff = (period.end - last_log.timestamp).total_seconds()
-                times_between_logs.append(time_diff)
-
-        # Compute rates using the time between log files.
-        times_between_logs = np.array(times_between_logs)
-        times_between_max = np.max(times_between_logs)
-        times_between_avg = np.mean(times_between_logs)
-        return (times_between_max, times_between_avg)
+    Subclasses of this use multi-table inheritance, sharing this table.
+    """
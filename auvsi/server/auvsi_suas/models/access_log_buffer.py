@@ -0,0 +1,164 @@
+"""Buffered writer of access logs."""
+
+import atexit
+import logging
+import threading
+import time
+from django import db
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+# Logging for the module
+logger = logging.getLogger(__name__)
+
+
+class AccessLogBuffer(object):
+    """Buffers access logs in memory and writes them in batches.
+
+    Logs keep the time they were made, and are written with a single
+    bulk_create() by a background thread once ACCESS_LOG_BUFFER_MAX_LOGS are
+    buffered, or once the oldest has waited ACCESS_LOG_BUFFER_MAX_DELAY_SEC.
+    With a max of 1 log, logs are written as they are made.
+
+    When a batch fails to be written, its logs are written one at a time, so
+    a bad log doesn't hold back the rest. With ACCESS_LOG_BUFFER_DURABLE,
+    buffered logs are written when the process exits, and logs which fail to
+    be written are kept to retry up to ACCESS_LOG_BUFFER_MAX_RETRIES times.
+    Otherwise they are lost. At most ACCESS_LOG_BUFFER_MAX_BUFFERED logs are
+    kept, dropping the oldest.
+    """
+
+    def __init__(self, model):
+        """Creates an empty buffer.
+
+        Args:
+            model: The AbstractAccessLog subclass of the logs.
+        """
+        self.model = model
+        self.logs = []
+        self.oldest_time = None
+        self.condition = threading.Condition()
+        self.writer = None
+        atexit.register(self.shutdown)
+
+    def log(self, user, timestamp=None):
+        """Logs an access.
+
+        Args:
+            user: The user which accessed the data.
+            timestamp: Optional. The time of the access. Defaults to now.
+        """
+        if timestamp is None:
+            timestamp = timezone.now()
+        log = self.model(user_id=user.pk, timestamp=timestamp)
+
+        if settings.ACCESS_LOG_BUFFER_MAX_LOGS <= 1:
+            log.save()
+            return
+
+        with self.condition:
+            if not self.logs:
+                self.oldest_time = time.time()
+            self.logs.append(log)
+            self.drop_overflow()
+            if self.writer is None:
+                self.writer = threading.Thread(target=self.write_forever,
+                                               name='AccessLogBuffer(%s)' %
+                                               self.model.__name__)
+                self.writer.daemon = True
+                self.writer.start()
+            if (len(self.logs) == 1 or
+                    len(self.logs) >= settings.ACCESS_LOG_BUFFER_MAX_LOGS):
+                self.condition.notify()
+
+    def flush(self):
+        """Writes the buffered logs.
+
+        Returns:
+            The number of logs written.
+        Raises:
+            DatabaseError: Some logs failed to be written.
+        """
+        with self.condition:
+            (logs, self.logs) = (self.logs, [])
+            self.condition.notify()
+        if not logs:
+            return 0
+        try:
+            with transaction.atomic():
+                self.model.objects.bulk_create(logs)
+            return len(logs)
+        except Exception:
+            logger.exception('Failed to write %d %s, writing them alone.',
+                             len(logs), self.model.__name__)
+
+        failed = []
+        for log in logs:
+            try:
+                with transaction.atomic():
+                    log.save()
+            except Exception:
+                logger.exception('Failed to write %s of user %s at %s.',
+                                 self.model.__name__, log.user_id,
+                                 log.timestamp)
+                failed.append(log)
+
+        retry = []
+        for log in failed:
+            log.write_failures = getattr(log, 'write_failures', 0) + 1
+            if (settings.ACCESS_LOG_BUFFER_DURABLE and log.write_failures <=
+                    settings.ACCESS_LOG_BUFFER_MAX_RETRIES):
+                retry.append(log)
+        if retry:
+            with self.condition:
+                if not self.logs:
+                    self.oldest_time = time.time()
+                self.logs[:0] = retry
+                self.drop_overflow()
+        if failed:
+            raise db.DatabaseError(
+                'Failed to write %d of %d %s, dropped %d.' %
+                (len(failed), len(logs), self.model.__name__,
+                 len(failed) - len(retry)))
+        return len(logs)
+
+    def drop_overflow(self):
+        """Drops the oldest logs past the max buffered, holding the lock."""
+        overflow = len(self.logs) - settings.ACCESS_LOG_BUFFER_MAX_BUFFERED
+        if overflow > 0:
+            logger.error('Dropped %d buffered %s.', overflow,
+                         self.model.__name__)
+            del self.logs[:overflow]
+
+    def shutdown(self):
+        """Writes the buffered logs if durable, as the process exits."""
+        if not settings.ACCESS_LOG_BUFFER_DURABLE:
+            return
+        try:
+            self.flush()
+        except Exception:
+            logger.exception('Failed to write %s on shutdown.',
+                             self.model.__name__)
+
+    def wait_until_due(self):
+        """Waits until the buffered logs should be written."""
+        with self.condition:
+            while not self.logs:
+                self.condition.wait()
+            due_time = (self.oldest_time +
+                        settings.ACCESS_LOG_BUFFER_MAX_DELAY_SEC)
+            while (0 < len(self.logs) < settings.ACCESS_LOG_BUFFER_MAX_LOGS
+                   and time.time() < due_time):
+                self.condition.wait(due_time - time.time())
+
+    def write_forever(self):
+        """Writes the buffered logs as they become due, for the writer."""
+        while True:
+            self.wait_until_due()
+            try:
+                db.close_old_connections()
+                self.flush()
+            except Exception:
+                logger.exception('Failed to write %s.', self.model.__name__)
+                time.sleep(settings.ACCESS_LOG_BUFFER_MAX_DELAY_SEC)
@@ -0,0 +1,88 @@
+"""Tests for the access_log_buffer module."""
+
+import datetime
+from auvsi_suas.models import AccessLogBuffer
+from auvsi_suas.models import ObstacleAccessLog
+from django.contrib.auth.models import User
+from django.db import DatabaseError
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+
+
+class TestAccessLogBuffer(TestCase):
+    """Tests the AccessLogBuffer."""
+
+    def setUp(self):
+        self.user = User.objects.create_user('testuser', 'testemail@x.com',
+                                             'testpass')
+        self.buffer = AccessLogBuffer(ObstacleAccessLog)
+
+    def test_unbuffered(self):
+        """With a max of 1 log, logs are written as they are made."""
+        with self.settings(ACCESS_LOG_BUFFER_MAX_LOGS=1):
+            self.buffer.log(self.user)
+        self.assertEqual(1, ObstacleAccessLog.objects.count())
+        self.assertEqual(0, self.buffer.flush())
+
+    @override_settings(ACCESS_LOG_BUFFER_MAX_LOGS=100,
+                       ACCESS_LOG_BUFFER_MAX_DELAY_SEC=1000)
+    def test_flush(self):
+        """Buffered logs are written together, keeping their timestamps."""
+        start = datetime.datetime(2000, 1, 1, tzinfo=timezone.utc)
+        times = [start + datetime.timedelta(seconds=i) for i in xrange(3)]
+        for timestamp in times:
+            self.buffer.log(self.user, timestamp=timestamp)
+        self.assertEqual(0, ObstacleAccessLog.objects.count())
+
+        self.assertEqual(3, self.buffer.flush())
+        logs = ObstacleAccessLog.by_user(self.user)
+        self.assertEqual(times, [log.timestamp for log in logs])
+        self.assertEqual(0, self.buffer.flush())
+
+    @override_settings(ACCESS_LOG_BUFFER_MAX_LOGS=100,
+                       ACCESS_LOG_BUFFER_MAX_DELAY_SEC=1000)
+    def test_shutdown(self):
+        """Buffered logs are written on shutdown only if durable."""
+        self.buffer.log(self.user)
+        with self.settings(ACCESS_LOG_BUFFER_DURABLE=False):
+            self.buffer.shutdown()
+        self.assertEqual(0, ObstacleAccessLog.objects.count())
+
+        with self.settings(ACCESS_LOG_BUFFER_DURABLE=True):
+            self.buffer.shutdown()
+        self.assertEqual(1, ObstacleAccessLog.objects.count())
+
+    @override_settings(ACCESS_LOG_BUFFER_MAX_LOGS=100,
+                       ACCESS_LOG_BUFFER_MAX_DELAY_SEC=1000,
+                       ACCESS_LOG_BUFFER_DURABLE=True,
+                       ACCESS_LOG_BUFFER_MAX_RETRIES=2)
+    def test_failed_logs(self):
+        """Bad logs are retried alone, then dropped, without the rest."""
+        for _ in xrange(3):
+            self.buffer.log(self.user)
+        self.buffer.logs[1].timestamp = None
+
+        for _ in xrange(2):
+            self.assertRaises(DatabaseError, self.buffer.flush)
+            self.assertEqual(1, len(self.buffer.logs))
+        self.assertEqual(2, ObstacleAccessLog.objects.count())
+
+        self.buffer.log(self.user)
+        self.assertRaises(DatabaseError, self.buffer.flush)
+        self.assertEqual([], self.buffer.logs)
+        self.assertEqual(3, ObstacleAccessLog.objects.count())
+
+    @override_settings(ACCESS_LOG_BUFFER_MAX_LOGS=100,
+                       ACCESS_LOG_BUFFER_MAX_DELAY_SEC=1000,
+                       ACCESS_LOG_BUFFER_MAX_BUFFERED=2)
+    def test_max_buffered(self):
+        """The oldest logs are dropped past the max buffered."""
+        start = datetime.datetime(2000, 1, 1, tzinfo=timezone.utc)
+        times = [start + datetime.timedelta(seconds=i) for i in xrange(3)]
+        for timestamp in times:
+            self.buffer.log(self.user, timestamp=timestamp)
+
+        self.assertEqual(2, self.buffer.flush())
+        logs = ObstacleAccessLog.by_user(self.user)
+        self.assertEqual(times[1:], [log.timestamp for log in logs])
@@ -259,3 +259,52 @@ class TestAccessLogRates(TestAccessLogCommon):
 
         self.assertAlmostEqual(1.0, rates[0])  # max
         self.assertAlmostEqual(0.75, rates[1], delta=0.001)  # avg
+
+    def test_rate_stats(self):
+        """Percentiles of the time between logs are computed."""
+        delta = datetime.timedelta(seconds=1)
+
+        logs = self.create_logs(self.user1, delta=delta)
+        logs += self.create_logs(self.user1,
+                                 start=logs[-1].timestamp + 3 * delta,
+                                 delta=delta)
+        period = self.consistent_period(logs, delta)
+
+        stats = AccessLog.rate_stats(self.user1, [period])
+
+        self.assertAlmostEqual(3.0, stats['max'])
+        self.assertAlmostEqual(23. / 21, stats['avg'])
+        self.assertAlmostEqual(1.0, stats['p50'])
+        self.assertAlmostEqual(1.0, stats['p90'])
+        self.assertAlmostEqual(2.6, stats['p99'])
+
+    def test_rate_stats_no_logs(self):
+        """Periods without logs count in full, unless unbounded."""
+        stats = AccessLog.rate_stats(self.user1,
+                                     [TimePeriod(self.year2000, self.year2001)])
+        self.assertAlmostEqual(366 * 24 * 60 * 60, stats['max'])
+
+        stats = AccessLog.rate_stats(self.user1, [TimePeriod(None, None)])
+        self.assertIsNone(stats['max'])
+        self.assertIsNone(stats['avg'])
+        self.assertIsNone(stats['p99'])
+
+    def test_timestamps_by_user(self):
+        """Times of multiple users are loaded together."""
+        delta = datetime.timedelta(seconds=1)
+
+        self.create_logs(self.user1, num=3, start=self.year2000, delta=delta)
+        self.create_logs(self.user2, num=2, start=self.year2003, delta=delta)
+
+        times = AccessLog.timestamps_by_user([self.user1, self.user2])
+        start = (self.year2000 - self.year2000.replace(year=1970)
+                 ).total_seconds()
+        self.assertSequenceEqual([start, start + 1, start + 2],
+                                 list(times[self.user1.pk]))
+        self.assertEqual(2, len(times[self.user2.pk]))
+
+        times = AccessLog.timestamps_by_user(
+            [self.user1, self.user2],
+            time_periods=[TimePeriod(self.year2001, self.year2004)])
+        self.assertEqual(0, len(times[self.user1.pk]))
+        self.assertEqual(2, len(times[self.user2.pk]))
@@ -0,0 +1,231 @@
+"""Cached values which track the models they depend on."""
+
+import functools
+import logging
+import threading
+import time
+from django import db
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import request_finished
+from django.db.models.signals import m2m_changed
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+
+# Logging for the module
+logger = logging.getLogger(__name__)
+
+# The m2m_changed actions after which relations have changed.
+M2M_CHANGED_ACTIONS = ['post_add', 'post_remove', 'post_clear']
+
+
+class CachedArtifact(object):
+    """A value computed from models and kept in the cache.
+
+    Each artifact declares the models it depends on, and any artifacts it is
+    computed from. When an instance of one of the models is saved or deleted,
+    or a many-to-many relation given by its through model changes, the
+    artifact and the artifacts computed from it are invalidated. Other cached
+    values are kept. A dependency on a widely used model, such as a position,
+    may be limited to the instances the artifact uses.
+
+    Invalidation increments a generation kept in the cache, which is part of
+    the artifact's keys, so every value of the artifact is evicted at once.
+
+    With CACHE_EAGER_REBUILD, artifacts with a rebuild function are rebuilt
+    by a background thread after the request which invalidated them, so the
+    next request finds them in the cache.
+    """
+
+    # Artifacts invalidated in this process and waiting to be rebuilt.
+    pending_rebuilds = set()
+    pending_rebuilds_lock = threading.Lock()
+
+    def __init__(self, name, dependencies, rebuild=None, invalidated=None):
+        """Creates the artifact.
+
+        Args:
+            name: The name of the artifact, used in cache keys.
+            dependencies: A list of the model classes, many-to-many through
+                models and CachedArtifacts the artifact is computed from. A
+                model may be given as a tuple (model, used), where used is a
+                function of an instance giving whether the artifact uses it.
+                New instances aren't used yet, so only changes to and deletes
+                of used instances invalidate the artifact.
+            rebuild: Optional. A function of no arguments which computes and
+                caches the artifact's commonly used values.
+            invalidated: Optional. A function of no arguments called when the
+                artifact is invalidated, which resets state derived from the
+                artifact that is kept outside the cache.
+        """
+        self.name = name
+        self.rebuild = rebuild
+        self.invalidated = invalidated
+        self.dependents = []
+
+        for dependency in dependencies:
+            if isinstance(dependency, CachedArtifact):
+                dependency.dependents.append(self)
+                continue
+            receiver = self.dependency_changed
+            if isinstance(dependency, tuple):
+                (dependency, used) = dependency
+                receiver = functools.partial(self.used_dependency_changed,
+                                             used)
+            for signal in [post_save, post_delete, m2m_changed]:
+                signal.connect(receiver,
+                               sender=dependency,
+                               weak=False,
+                               dispatch_uid='%s/%s' %
+                               (self.name, dependency.__name__))
+
+    def generation_key(self):
+        """Gets the cache key of the artifact's generation."""
+        return '/CachedArtifact/%s/generation' % self.name
+
+    def generation(self):
+        """Gets the current generation of the artifact."""
+        key = self.generation_key()
+        generation = cache.get(key)
+        if generation is None:
+            # Start from the time, so a generation lost from the cache doesn't
+            # return to one whose values are still cached.
+            cache.add(key, int(time.time() * 1000), None)
+            generation = cache.get(key)
+        return generation
+
+    def key(self, *args):
+        """Gets the cache key of a value of the artifact.
+
+        Args:
+            args: The arguments identifying the value, if the artifact has
+                more than one.
+        Returns:
+            The cache key for the current generation.
+        """
+        return '/%s/%d/%s' % (self.name, self.generation(),
+                              '/'.join(str(arg) for arg in args))
+
+    def get(self, *args):
+        """Gets a cached value of the artifact, or None if not cached."""
+        return cache.get(self.key(*args))
+
+    def set(self, value, *args):
+        """Caches a value of the artifact."""
+        cache.set(self.key(*args), value)
+
+    def delete(self, *args):
+        """Evicts a cached value of the artifact."""
+        cache.delete(self.key(*args))
+
+    def get_many(self, args_list):
+        """Gets the cached values of the artifact for several arguments.
+
+        Args:
+            args_list: A list of the single argument identifying each value.
+        Returns:
+            A dict from argument to value, for the values which are cached.
+        """
+        keys = dict((self.key(arg), arg) for arg in args_list)
+        return dict((keys[key], value)
+                    for (key, value) in cache.get_many(keys.keys()).items())
+
+    def set_many(self, values):
+        """Caches values of the artifact for several arguments.
+
+        Args:
+            values: A dict from the single argument identifying each value to
+                the value.
+        """
+        cache.set_many(dict((self.key(arg), value)
+                            for (arg, value) in values.items()))
+
+    def get_or_compute(self, compute, *args):
+        """Gets a value of the artifact, computing and caching it if needed.
+
+        Args:
+            compute: A function of no arguments giving the value. None is not
+                cached.
+            args: The arguments identifying the value.
+        Returns:
+            The value.
+        """
+        key = self.key(*args)
+        value = cache.get(key)
+        if value is None:
+            value = compute()
+            if value is not None:
+                cache.set(key, value)
+        return value
+
+    def invalidate(self):
+        """Invalidates the artifact and those computed from it."""
+        key = self.generation_key()
+        try:
+            cache.incr(key)
+        except ValueError:
+            # No generation is cached, so neither are any values.
+            pass
+
+        if self.invalidated is not None:
+            self.invalidated()
+        if self.rebuild is not None and settings.CACHE_EAGER_REBUILD:
+            with CachedArtifact.pending_rebuilds_lock:
+                CachedArtifact.pending_rebuilds.add(self)
+        for dependent in self.dependents:
+            dependent.invalidate()
+
+    def dependency_changed(self, sender, **kwargs):
+        """Invalidates the artifact when a model it depends on changes."""
+        if 'action' in kwargs and kwargs['action'] not in M2M_CHANGED_ACTIONS:
+            return
+        logger.info('%s changed, invalidating %s.', sender.__name__,
+                    self.name)
+        self.invalidate()
+
+    def used_dependency_changed(self, used, sender, instance, **kwargs):
+        """Invalidates the artifact when an instance it uses changes.
+
+        Args:
+            used: A function of an instance giving whether the artifact uses
+                it.
+            sender: The model of the instance.
+            instance: The saved or deleted instance.
+        """
+        if kwargs.get('created') or not used(instance):
+            return
+        self.dependency_changed(sender, **kwargs)
+
+    @classmethod
+    def rebuild_pending(cls):
+        """Rebuilds the artifacts waiting to be rebuilt."""
+        with cls.pending_rebuilds_lock:
+            (artifacts, cls.pending_rebuilds) = (cls.pending_rebuilds, set())
+        for artifact in artifacts:
+            try:
+                artifact.rebuild()
+            except Exception:
+                logger.exception('Failed to rebuild %s.', artifact.name)
+
+    @classmethod
+    def rebuild_pending_in_background(cls, **kwargs):
+        """Starts a thread to rebuild pending artifacts, if there are any.
+
+        Run once a request finishes, when its changes are committed.
+        """
+        if not cls.pending_rebuilds:
+            return
+
+        def rebuild():
+            try:
+                cls.rebuild_pending()
+            finally:
+                db.connection.close()
+
+        thread = threading.Thread(target=rebuild, name='CachedArtifact')
+        thread.daemon = True
+        thread.start()
+
+
+request_finished.connect(CachedArtifact.rebuild_pending_in_background,
+                         dispatch_uid='CachedArtifact.rebuild_pending')
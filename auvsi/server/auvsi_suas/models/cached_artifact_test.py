@@ -0,0 +1,120 @@
+"""Tests for the cached_artifact module."""
+
+from auvsi_suas.models import AerialPosition
+from auvsi_suas.models import FlyZone
+from auvsi_suas.models import GpsPosition
+from auvsi_suas.models import ServerInfo
+from auvsi_suas.models import Waypoint
+from auvsi_suas.models.cached_artifact import CachedArtifact
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+
+class TestCachedArtifact(TestCase):
+    """Tests the CachedArtifact."""
+
+    def setUp(self):
+        cache.clear()
+        self.info_artifact = CachedArtifact('Test/info', [ServerInfo])
+        self.zone_artifact = CachedArtifact(
+            'Test/zone', [FlyZone, FlyZone.boundary_pts.through])
+        self.dependent_artifact = CachedArtifact('Test/dependent',
+                                                 [self.info_artifact])
+
+    def test_get_or_compute(self):
+        """Values are computed once, and None is not cached."""
+        computed = []
+
+        def compute():
+            computed.append(True)
+            return 'value'
+
+        self.assertEqual('value', self.info_artifact.get_or_compute(compute,
+                                                                    1))
+        self.assertEqual('value', self.info_artifact.get_or_compute(compute,
+                                                                    1))
+        self.assertEqual(1, len(computed))
+        self.assertIsNone(self.info_artifact.get(2))
+
+        self.assertIsNone(self.info_artifact.get_or_compute(lambda: None, 3))
+        self.assertEqual('value', self.info_artifact.get_or_compute(compute,
+                                                                    3))
+
+    def test_get_many(self):
+        """Several values are cached and read at once."""
+        self.info_artifact.set_many({1: 'one', 2: 'two'})
+        self.assertEqual({1: 'one',
+                          2: 'two'}, self.info_artifact.get_many([1, 2, 3]))
+        self.assertEqual('one', self.info_artifact.get(1))
+
+    def test_invalidated_by_dependency(self):
+        """Only artifacts depending on a changed model are invalidated."""
+        self.info_artifact.set('info')
+        self.zone_artifact.set('zone')
+        self.dependent_artifact.set('dependent')
+
+        GpsPosition(latitude=0, longitude=0).save()
+        self.assertEqual('info', self.info_artifact.get())
+
+        ServerInfo(timestamp=timezone.now(), team_msg='Hello').save()
+        self.assertIsNone(self.info_artifact.get())
+        self.assertIsNone(self.dependent_artifact.get())
+        self.assertEqual('zone', self.zone_artifact.get())
+
+    def test_invalidated_by_relation(self):
+        """Artifacts are invalidated when many-to-many relations change."""
+        zone = FlyZone(altitude_msl_min=0, altitude_msl_max=100)
+        zone.save()
+        gpos = GpsPosition(latitude=0, longitude=0)
+        gpos.save()
+        apos = AerialPosition(gps_position=gpos, altitude_msl=0)
+        apos.save()
+        wpt = Waypoint(position=apos, order=0)
+        wpt.save()
+
+        self.zone_artifact.set('zone')
+        zone.boundary_pts.add(wpt)
+        self.assertIsNone(self.zone_artifact.get())
+
+    def test_rebuild(self):
+        """Invalidated artifacts with a rebuild function are rebuilt."""
+        artifact = CachedArtifact(
+            'Test/rebuild', [],
+            rebuild=lambda: artifact.set('rebuilt'))
+
+        with self.settings(CACHE_EAGER_REBUILD=False):
+            artifact.invalidate()
+        CachedArtifact.rebuild_pending()
+        self.assertIsNone(artifact.get())
+
+        with self.settings(CACHE_EAGER_REBUILD=True):
+            artifact.invalidate()
+        CachedArtifact.rebuild_pending()
+        self.assertEqual('rebuilt', artifact.get())
+
+    def test_invalidated(self):
+        """Invalidation calls the artifact's and its dependents' hooks."""
+        calls = []
+        artifact = CachedArtifact('Test/invalidated', [],
+                                  invalidated=lambda: calls.append('artifact'))
+        CachedArtifact('Test/invalidated_dependent', [artifact],
+                       invalidated=lambda: calls.append('dependent'))
+
+        artifact.invalidate()
+        self.assertEqual(['artifact', 'dependent'], calls)
+
+    def test_invalidated_by_used_instance(self):
+        """Artifacts limited to used instances ignore other instances."""
+        artifact = CachedArtifact(
+            'Test/used', [(GpsPosition, lambda gpos: gpos.latitude == 1)])
+        artifact.set('value')
+
+        # New instances aren't used yet.
+        used = GpsPosition.objects.create(latitude=1, longitude=0)
+        unused = GpsPosition.objects.create(latitude=2, longitude=0)
+        unused.save()
+        self.assertEqual('value', artifact.get())
+
+        used.save()
+        self.assertIsNone(artifact.get())
@@ -1,6 +1,7 @@
 """Functions for computing distance."""
 
 import math
+import numpy as np
 from auvsi_suas.models import units
 
 
@@ -54,3 +55,101 @@ def distance_to(
     gps_dist_ft = units.kilometers_to_feet(gps_dist_km)
     alt_dist_ft = abs(altitude_1 - altitude_2)
     return math.hypot(gps_dist_ft, alt_dist_ft)
+
+
+def haversine_array(lon1, lat1, lon2, lat2):
+    """Calculate the great circle distance between arrays of points.
+
+    Computes the same distance as haversine(), elementwise over numpy arrays.
+    The arrays are broadcast against each other.
+
+    Args:
+        lon1, lat1: Arrays of the latitude and longitude of positions 1
+        lon2, lat2: Arrays of the latitude and longitude of positions 2
+
+    Returns:
+        An array of the distances in kilometers
+    """
+    lon1 = np.radians(lon1)
+    lat1 = np.radians(lat1)
+    lon2 = np.radians(lon2)
+    lat2 = np.radians(lat2)
+
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
+    hav_a = (np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) *
+             np.sin(dlon / 2) ** 2)
+    hav_c = 2 * np.arcsin(np.sqrt(hav_a))
+
+    return 6371 * hav_c
+
+
+def distance_to_array(
+    latitude_1, longitude_1, altitude_1, latitude_2, longitude_2, altitude_2
+):
+    """Get the distances in feet between arrays of positions.
+
+    Computes the same distance as distance_to(), elementwise over numpy
+    arrays. The arrays are broadcast against each other.
+
+    Args:
+        latitude_1: The latitudes of the first positions.
+        longitude_1: The longitudes of the first positions.
+        altitude_1: The altitudes in feet of the first positions.
+        latitude_2: The latitudes of the second positions.
+        longitude_2: The longitudes of the second positions.
+        altitude_2: The altitudes in feet of the second positions.
+    """
+    gps_dist_km = haversine_array(longitude_1, latitude_1, longitude_2,
+                                  latitude_2)
+    gps_dist_ft = units.kilometers_to_feet(gps_dist_km)
+    alt_dist_ft = np.abs(np.subtract(altitude_1, altitude_2))
+    return np.hypot(gps_dist_ft, alt_dist_ft)
+
+
+def distance_to_many(latitude, longitude, altitude, latitudes, longitudes,
+                     altitudes):
+    """Get the distances in feet from one position to many positions.
+
+    Args:
+        latitude: The latitude of the position.
+        longitude: The longitude of the position.
+        altitude: The altitude in feet of the position.
+        latitudes: An array of the latitudes of the other positions.
+        longitudes: An array of the longitudes of the other positions.
+        altitudes: An array of the altitudes in feet of the other positions.
+    Returns:
+        An array with the distance to each of the other positions.
+    """
+    return distance_to_array(latitude, longitude, altitude,
+                             np.asarray(latitudes, dtype=np.float64),
+                             np.asarray(longitudes, dtype=np.float64),
+                             np.asarray(altitudes, dtype=np.float64))
+
+
+def distance_matrix(latitudes_1, longitudes_1, altitudes_1, latitudes_2,
+                    longitudes_2, altitudes_2):
+    """Get the distances in feet between every pair of two sets of positions.
+
+    Args:
+        latitudes_1: An array of the latitudes of the first N positions.
+        longitudes_1: An array of the longitudes of the first N positions.
+        altitudes_1: An array of the altitudes in feet of the first N
+            positions.
+        latitudes_2: An array of the latitudes of the second M positions.
+        longitudes_2: An array of the longitudes of the second M positions.
+        altitudes_2: An array of the altitudes in feet of the second M
+            positions.
+    Returns:
+        An N by M array where element (i, j) is the distance between the
+        first position i and the second position j.
+    """
+    def column(values):
+        return np.asarray(values, dtype=np.float64)[:, np.newaxis]
+
+    def row(values):
+        return np.asarray(values, dtype=np.float64)[np.newaxis, :]
+
+    return distance_to_array(column(latitudes_1), column(longitudes_1),
+                             column(altitudes_1), row(latitudes_2),
+                             row(longitudes_2), row(altitudes_2))
@@ -1,6 +1,9 @@
 """Tests for the distance module."""
 
+import numpy as np
+import time
 from auvsi_suas.models import distance
+from django.conf import settings
 from django.test import TestCase
 
 
@@ -19,6 +22,13 @@ class TestHaversine(TestCase):
             distance_received = distance.haversine(lon1, lat1, lon2, lat2)
             self.assertCloseEnough(distance_actual, distance_received)
 
+        # The array version gives the same distances for all inputs at once
+        (lon1, lat1, lon2, lat2, distance_actual) = np.array(
+            input_output_list, dtype=np.float64).T
+        distance_received = distance.haversine_array(lon1, lat1, lon2, lat2)
+        for (actual, received) in zip(distance_actual, distance_received):
+            self.assertCloseEnough(actual, received)
+
     def test_zero_distance(self):
         """Tests various latitudes and longitudes which have zero distance."""
         self.evaluate_inputs([
@@ -52,4 +62,90 @@ class TestHaversine(TestCase):
         ])  # yapf: disable
 
 
+class TestDistanceToArray(TestCase):
+    """Tests the array distance_to code."""
+
+    def test_matches_distance_to(self):
+        """Array distances are the same as scalar distances."""
+        positions = [
+            # (lat1,     lon1,       alt1, lat2,      lon2,       alt2)
+            (38.145306, -76.428709, 0,    38.146146, -76.426375, 0),
+            (38.145399, -76.428537, 100,  38.144686, -76.427818, 300),
+            (38.142471, -76.434261, 50,   38.142471, -76.434261, 10),
+        ]  # yapf: disable
+        dists = distance.distance_to_array(*np.array(positions).T)
+        for (pos, dist) in zip(positions, dists):
+            self.assertAlmostEqual(distance.distance_to(*pos), dist)
+
+    def test_broadcast(self):
+        """A single position is broadcast against arrays of positions."""
+        dists = distance.distance_to_array(38, -76, 100,
+                                           np.array([38, 38]),
+                                           np.array([-76, -76]),
+                                           np.array([100, 150]))
+        np.testing.assert_allclose(dists, [0, 50])
+
+
+class TestDistanceToMany(TestCase):
+    """Tests the one to many distance code."""
+
+    def test_distances(self):
+        """Distances from one position to each of many positions."""
+        dists = distance.distance_to_many(38.145306, -76.428709, 0,
+                                          [38.145306, 38.146146, 38.145306],
+                                          [-76.428709, -76.426375, -76.428709],
+                                          [0, 0, 100])
+        self.assertEqual(dists.shape, (3, ))
+        self.assertAlmostEqual(dists[0], 0)
+        self.assertAlmostEqual(dists[1], distance.distance_to(
+            38.145306, -76.428709, 0, 38.146146, -76.426375, 0))
+        self.assertAlmostEqual(dists[2], 100)
+
+    def test_empty(self):
+        """No positions gives no distances."""
+        dists = distance.distance_to_many(38, -76, 0, [], [], [])
+        self.assertEqual(dists.shape, (0, ))
+
+
+class TestDistanceMatrix(TestCase):
+    """Tests the many to many distance code."""
+
+    def test_matrix(self):
+        """Matrix elements are the distances between each pair."""
+        positions_1 = [(38.145306, -76.428709, 0), (38.145399, -76.428537, 50)]
+        positions_2 = [(38.146146, -76.426375, 0), (38.144686, -76.427818, 0),
+                       (38.142471, -76.434261, 100)]
+        dists = distance.distance_matrix(*(list(np.array(positions_1).T) +
+                                           list(np.array(positions_2).T)))
+        self.assertEqual(dists.shape, (2, 3))
+        for i, pos_1 in enumerate(positions_1):
+            for j, pos_2 in enumerate(positions_2):
+                self.assertAlmostEqual(dists[i, j],
+                                       distance.distance_to(*pos_1 + pos_2))
+
+    def test_loadtest(self):
+        """Compares scalar and vectorized distance throughput."""
+        if not settings.TEST_ENABLE_LOADTEST:
+            return
+
+        for num_points in [1000, 100000, 1000000]:
+            lats = np.random.uniform(38.14, 38.15, num_points)
+            lons = np.random.uniform(-76.43, -76.42, num_points)
+            alts = np.random.uniform(0, 750, num_points)
+
+            start_t = time.clock()
+            for i in xrange(num_points):
+                distance.distance_to(38.145, -76.425, 100, lats[i], lons[i],
+                                     alts[i])
+            scalar_rate = num_points / (time.clock() - start_t)
+
+            start_t = time.clock()
+            distance.distance_to_many(38.145, -76.425, 100, lats, lons, alts)
+            vector_rate = num_points / (time.clock() - start_t)
+
+            print 'Distance Rate %d Points (scalar %f, vectorized %f)' % (
+                num_points, scalar_rate, vector_rate)
+            self.assertGreater(vector_rate, scalar_rate)
+
+
 # TODO: Add additional tests for distance_to()
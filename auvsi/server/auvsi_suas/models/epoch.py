@@ -0,0 +1,20 @@
+"""The epoch that times are measured from for evaluation."""
+
+import numpy as np
+from datetime import datetime
+from django.utils import timezone
+
+# Obstacles start each path at their first waypoint at this time.
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def seconds_since_epoch(times):
+    """Converts times to seconds since the obstacle path epoch.
+
+    Args:
+        times: A list of datetimes with time zone.
+    Returns:
+        A numpy array of floating point seconds since EPOCH.
+    """
+    return np.array([(t - EPOCH).total_seconds() for t in times],
+                    dtype=np.float64)
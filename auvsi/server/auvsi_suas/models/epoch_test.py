@@ -0,0 +1,18 @@
+"""Tests for the epoch module."""
+
+import datetime
+from auvsi_suas.models.epoch import EPOCH
+from auvsi_suas.models.epoch import seconds_since_epoch
+from django.test import TestCase
+
+
+class TestSecondsSinceEpoch(TestCase):
+    """Tests the conversion of times to seconds since the epoch."""
+
+    def test_seconds_since_epoch(self):
+        """Times convert to float seconds."""
+        times = [EPOCH, EPOCH + datetime.timedelta(seconds=1.5),
+                 EPOCH - datetime.timedelta(days=1)]
+        self.assertSequenceEqual([0, 1.5, -86400],
+                                 list(seconds_since_epoch(times)))
+        self.assertEqual(0, len(seconds_since_epoch([])))
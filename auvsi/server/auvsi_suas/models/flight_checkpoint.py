@@ -0,0 +1,227 @@
+"""Checkpoint of the evaluation of a team's flight."""
+
+import numpy as np
+from fly_zone_geometry import FlyZoneGeometry
+
+# The kinds of logs whose times between logs are evaluated for interop.
+INTEROP_KINDS = ['uas_telem', 'server_info', 'obst_info']
+
+
+class FlightCheckpoint(object):
+    """The evaluation of a flight from the logs folded in so far.
+
+    Holds running aggregates of the flight's deduped telemetry and access
+    logs, so the flight is scored without the logs. Only logs older than a
+    settle time are folded in, as newer logs may still be committed out of ID
+    order. The checkpoint is extended with the logs since the settle time,
+    and those with IDs after the last folded in, which must not be older than
+    those already folded in.
+
+    Times are seconds since the obstacle path epoch.
+    """
+
+    def __init__(self, mission_data, end):
+        """Creates the checkpoint of a flight without logs.
+
+        Args:
+            mission_data: The mission data from
+                MissionConfig.evaluation_data().
+            end: The end of the flight, or None if it hasn't ended.
+        """
+        self.end = end
+
+        # The datetime before which the flight's logs were folded in, or None
+        # if none were.
+        self.settled = None
+
+        # The greatest ID and the time of the last log of each kind folded
+        # in.
+        self.last_pks = dict((kind, 0) for kind in INTEROP_KINDS)
+        self.last_times = dict((kind, None) for kind in INTEROP_KINDS)
+
+        # The first and last log times and the times between them, without
+        # duplicate telemetry.
+        self.first_log_times = dict((kind, None) for kind in INTEROP_KINDS)
+        self.last_log_times = dict((kind, None) for kind in INTEROP_KINDS)
+        self.gaps = dict((kind, np.zeros(0)) for kind in INTEROP_KINDS)
+
+        # The (latitude, longitude, altitude_msl, uas_heading) of the last
+        # telemetry, for dedupe.
+        self.last_values = None
+        # The position of the last deduped telemetry, whether it was in
+        # bounds, and whether the UAS was out of bounds since the one before.
+        self.last_position = None
+        self.last_in_bounds = False
+        self.last_out = False
+
+        self.out_of_bounds_time = 0.0
+        self.out_of_bounds_violations = 0
+
+        # The closest approach to each waypoint, and the time of the first
+        # telemetry at it.
+        num_waypoints = len(mission_data['waypoints'])
+        self.closest_distances = np.full(num_waypoints, np.inf)
+        self.closest_timestamps = [None] * num_waypoints
+
+        # The IDs of the obstacles collided with.
+        self.stationary_collisions = set()
+        self.moving_collisions = set()
+
+    def extends(self, end):
+        """Whether the checkpoint can be extended for the flight.
+
+        A flight which has since ended can be extended if no logs after the
+        end were folded in.
+
+        Args:
+            end: The current end of the flight, or None if it hasn't ended.
+        Returns:
+            Whether the checkpoint is valid for the flight.
+        """
+        if end == self.end:
+            return True
+        if self.end is not None:
+            return False
+        return all(time is None or time <= end
+                   for time in self.last_times.values())
+
+    def folded(self, kind, pk, timestamp):
+        """Whether a log was folded in.
+
+        Logs older than the settle time are assumed to have been committed
+        by the time they were folded in.
+
+        Args:
+            kind: The kind of the log, one of INTEROP_KINDS.
+            pk: The ID of the log.
+            timestamp: The timestamp of the log.
+        Returns:
+            Whether the log was folded in.
+        """
+        return (self.settled is not None and timestamp < self.settled and
+                pk <= self.last_pks[kind])
+
+    def in_order(self, kind, times):
+        """Whether logs can be folded in after those already folded in.
+
+        Args:
+            kind: The kind of the logs, one of INTEROP_KINDS.
+            times: A sorted numpy array of the log times.
+        Returns:
+            Whether none of the logs are older than the last folded in.
+        """
+        last_time = self.last_times[kind]
+        return len(times) == 0 or last_time is None or times[0] >= last_time
+
+    def fold_access_logs(self, kind, pks, times):
+        """Folds in access logs.
+
+        Args:
+            kind: The kind of the logs, 'server_info' or 'obst_info'.
+            pks: A list of the IDs of the logs.
+            times: A sorted numpy array of the log times.
+        """
+        if len(times) == 0:
+            return
+        self.fold_times(kind, times)
+        self.last_pks[kind] = max([self.last_pks[kind]] + list(pks))
+        self.last_times[kind] = times[-1]
+
+    def fold_times(self, kind, times):
+        """Folds log times into the times between logs.
+
+        Args:
+            kind: The kind of the logs, one of INTEROP_KINDS.
+            times: A sorted numpy array of the log times, not empty.
+        """
+        if self.first_log_times[kind] is None:
+            self.first_log_times[kind] = times[0]
+            gaps = np.diff(times)
+        else:
+            gaps = np.diff(np.concatenate(([self.last_log_times[kind]],
+                                           times)))
+        self.gaps[kind] = np.concatenate((self.gaps[kind], gaps))
+        self.last_log_times[kind] = times[-1]
+
+    def fold_telemetry(self, fly_zones, pks, times, values):
+        """Folds in telemetry, for the times between logs and out of bounds.
+
+        The telemetry is deduped, and the time out of bounds found in the same
+        way as over a whole flight.
+
+        Args:
+            fly_zones: The list of FlyZoneGeometry that the UAS must be in.
+            pks: A list of the IDs of the logs.
+            times: A sorted numpy array of the log times.
+            values: A numpy array with a (latitude, longitude, altitude_msl,
+                uas_heading) row for each log.
+        Returns:
+            A numpy array of the indexes of the logs which aren't duplicates.
+        """
+        if len(times) == 0:
+            return np.zeros(0, dtype=int)
+        self.last_pks['uas_telem'] = max([self.last_pks['uas_telem']] +
+                                         list(pks))
+        self.last_times['uas_telem'] = times[-1]
+
+        # Drop logs which duplicate the log before them.
+        last_values = self.last_values
+        if last_values is None:
+            last_values = np.full(4, np.nan)
+        previous = np.vstack((last_values, values[:-1]))
+        keep_ids = np.flatnonzero(np.any(values != previous, axis=1))
+        self.last_values = values[-1]
+        if len(keep_ids) == 0:
+            return keep_ids
+        times = times[keep_ids]
+        positions = values[keep_ids, :3]
+
+        # Continue from the last position, where a violation continues if
+        # the UAS was out of bounds.
+        if self.last_position is not None:
+            last_time = self.last_log_times['uas_telem']
+            times = np.concatenate(([last_time], times))
+            positions = np.vstack((self.last_position, positions))
+        (out_time, intervals) = FlyZoneGeometry.out_of_bounds_intervals(
+            fly_zones, times, positions)
+        self.out_of_bounds_time += out_time
+        self.out_of_bounds_violations += len(intervals)
+        if intervals and self.last_out and not self.last_in_bounds:
+            self.out_of_bounds_violations -= 1
+
+        last_positions = positions[-2:]
+        inside = np.zeros(len(last_positions), dtype=bool)
+        for zone in fly_zones:
+            inside |= zone.contains(last_positions[:, 0],
+                                    last_positions[:, 1],
+                                    last_positions[:, 2])
+        self.last_out = len(inside) == 2 and not np.all(inside)
+        self.last_in_bounds = bool(inside[-1])
+        self.last_position = positions[-1]
+
+        self.fold_times('uas_telem', times[len(times) - len(keep_ids):])
+        return keep_ids
+
+    def times_between_logs(self, kind, start):
+        """Gets the times between logs of the flight.
+
+        See AbstractAccessLog.times_between_logs().
+
+        Args:
+            kind: The kind of the logs, one of INTEROP_KINDS.
+            start: The start of the flight, or None if unknown.
+        Returns:
+            A numpy array of the times between logs in seconds.
+        """
+        first = self.first_log_times[kind]
+        if first is None:
+            if start is not None and self.end is not None:
+                return np.array([self.end - start])
+            return np.zeros(0)
+
+        gaps = [self.gaps[kind]]
+        if start is not None:
+            gaps.insert(0, [first - start])
+        if self.end is not None:
+            gaps.append([self.end - self.last_log_times[kind]])
+        return np.concatenate(gaps)
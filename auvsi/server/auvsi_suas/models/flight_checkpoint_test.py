@@ -0,0 +1,141 @@
+"""Tests for the flight_checkpoint module."""
+
+import numpy as np
+from auvsi_suas.models.flight_checkpoint import FlightCheckpoint
+from auvsi_suas.models.fly_zone_geometry import FlyZoneGeometry
+from django.test import TestCase
+
+# [times, (latitude, longitude, altitude_msl, uas_heading) values]
+TESTDATA_FLIGHT = (
+    np.arange(10, dtype=np.float64),
+    np.array([(0.5, 0.1, 100, 0), (0.5, 0.1, 100, 0), (0.5, 1.5, 100, 0),
+              (0.5, 2.5, 100, 0), (0.5, 2.5, 100, 0), (0.5, 0.1, 100, 0),
+              (0.5, 1.5, 100, 0), (0.5, 1.5, 100, 90), (0.5, 0.1, 100, 0),
+              (0.5, 0.2, 100, 0)], dtype=np.float64),
+)  # yapf: disable
+
+
+class TestFlightCheckpoint(TestCase):
+    """Tests the FlightCheckpoint class."""
+
+    def setUp(self):
+        """Creates a zone from 0,0 to 1,1 and a mission with a waypoint."""
+        self.fly_zones = [FlyZoneGeometry([(0, 0), (0, 1), (1, 1), (1, 0)], 0,
+                                          1000)]
+        self.mission_data = {'waypoints': np.zeros((1, 3))}
+
+    def fold(self, checkpoint, times, values):
+        pks = range(int(times[0]) + 1, int(times[0]) + len(times) + 1)
+        return checkpoint.fold_telemetry(self.fly_zones, pks, times, values)
+
+    def test_fold_telemetry(self):
+        """Folding a flight matches evaluating the deduped flight."""
+        (times, values) = TESTDATA_FLIGHT
+        checkpoint = FlightCheckpoint(self.mission_data, None)
+
+        keep_ids = self.fold(checkpoint, times, values)
+        self.assertSequenceEqual([0, 2, 3, 5, 6, 7, 8, 9], list(keep_ids))
+
+        (out_time, intervals) = FlyZoneGeometry.out_of_bounds_intervals(
+            self.fly_zones, times[keep_ids], values[keep_ids, :3])
+        self.assertAlmostEqual(out_time, checkpoint.out_of_bounds_time)
+        self.assertEqual(len(intervals), checkpoint.out_of_bounds_violations)
+        self.assertSequenceEqual(list(np.diff(times[keep_ids])),
+                                 list(checkpoint.gaps['uas_telem']))
+        self.assertEqual(10, checkpoint.last_pks['uas_telem'])
+
+    def test_fold_telemetry_chunks(self):
+        """Folding a flight in chunks matches folding it whole."""
+        (times, values) = TESTDATA_FLIGHT
+        whole = FlightCheckpoint(self.mission_data, None)
+        self.fold(whole, times, values)
+
+        # Chunk boundaries split duplicates and violations.
+        for splits in [[1], [3], [4, 7], range(1, 10)]:
+            chunked = FlightCheckpoint(self.mission_data, None)
+            keep_ids = []
+            for (chunk_times, chunk_values) in zip(np.split(times, splits),
+                                                   np.split(values, splits)):
+                offset = int(chunk_times[0])
+                keep_ids += [offset + i
+                             for i in self.fold(chunked, chunk_times,
+                                                chunk_values)]
+            self.assertSequenceEqual([0, 2, 3, 5, 6, 7, 8, 9], keep_ids)
+            self.assertAlmostEqual(whole.out_of_bounds_time,
+                                   chunked.out_of_bounds_time)
+            self.assertEqual(whole.out_of_bounds_violations,
+                             chunked.out_of_bounds_violations)
+            self.assertSequenceEqual(list(whole.gaps['uas_telem']),
+                                     list(chunked.gaps['uas_telem']))
+
+    def test_fold_access_logs(self):
+        """Access logs are folded into the times between logs."""
+        checkpoint = FlightCheckpoint(self.mission_data, None)
+        checkpoint.fold_access_logs('server_info', [1, 2], np.array([1., 2.]))
+        checkpoint.fold_access_logs('server_info', [], np.zeros(0))
+        checkpoint.fold_access_logs('server_info', [4], np.array([4.]))
+
+        self.assertSequenceEqual([1, 2],
+                                 list(checkpoint.gaps['server_info']))
+        self.assertEqual(4, checkpoint.last_pks['server_info'])
+        self.assertEqual(0, checkpoint.last_pks['obst_info'])
+
+    def test_folded(self):
+        """Logs are folded in if settled and not after the last ID."""
+        checkpoint = FlightCheckpoint(self.mission_data, None)
+        self.assertFalse(checkpoint.folded('obst_info', 1, 5))
+
+        checkpoint.fold_access_logs('obst_info', [3, 2], np.array([1., 2.]))
+        checkpoint.settled = 5
+        self.assertTrue(checkpoint.folded('obst_info', 1, 4))
+        self.assertFalse(checkpoint.folded('obst_info', 1, 5))
+        self.assertFalse(checkpoint.folded('obst_info', 4, 4))
+        self.assertFalse(checkpoint.folded('server_info', 1, 4))
+
+        # The greatest ID is kept.
+        checkpoint.fold_access_logs('obst_info', [1], np.array([3.]))
+        self.assertEqual(3, checkpoint.last_pks['obst_info'])
+
+    def test_in_order(self):
+        """Logs older than those folded in can't be folded in."""
+        checkpoint = FlightCheckpoint(self.mission_data, None)
+        self.assertTrue(checkpoint.in_order('obst_info', np.array([5.])))
+        checkpoint.fold_access_logs('obst_info', [1], np.array([5.]))
+
+        self.assertTrue(checkpoint.in_order('obst_info', np.zeros(0)))
+        self.assertTrue(checkpoint.in_order('obst_info', np.array([5., 6.])))
+        self.assertFalse(checkpoint.in_order('obst_info', np.array([4., 6.])))
+        self.assertTrue(checkpoint.in_order('server_info', np.array([4.])))
+
+    def test_extends(self):
+        """Checkpoints extend while no logs after the flight's end are in."""
+        checkpoint = FlightCheckpoint(self.mission_data, None)
+        self.assertTrue(checkpoint.extends(None))
+        self.assertTrue(checkpoint.extends(10))
+
+        checkpoint.fold_access_logs('obst_info', [1], np.array([5.]))
+        self.assertTrue(checkpoint.extends(5))
+        self.assertFalse(checkpoint.extends(4))
+
+        checkpoint.end = 5
+        self.assertTrue(checkpoint.extends(5))
+        self.assertFalse(checkpoint.extends(6))
+        self.assertFalse(checkpoint.extends(None))
+
+    def test_times_between_logs(self):
+        """Times between logs include the start and end of the flight."""
+        checkpoint = FlightCheckpoint(self.mission_data, 10)
+        self.assertSequenceEqual(
+            [8], list(checkpoint.times_between_logs('obst_info', 2)))
+        self.assertSequenceEqual(
+            [], list(checkpoint.times_between_logs('obst_info', None)))
+
+        checkpoint.fold_access_logs('obst_info', [1, 2], np.array([3., 7.]))
+        self.assertSequenceEqual(
+            [1, 4, 3], list(checkpoint.times_between_logs('obst_info', 2)))
+        self.assertSequenceEqual(
+            [4, 3], list(checkpoint.times_between_logs('obst_info', None)))
+
+        checkpoint.end = None
+        self.assertSequenceEqual(
+            [1, 4], list(checkpoint.times_between_logs('obst_info', 2)))
@@ -0,0 +1,106 @@
+"""Index of a user's flights, from their takeoff and landing events."""
+
+import bisect
+from time_period import TimePeriod
+
+
+class FlightIndex(object):
+    """A user's takeoff and landing events, indexed for lookups by time.
+
+    The events are kept sorted by time, along with the flights they define.
+    Flights are sorted and don't overlap, so whether the user was in the air
+    at a time, and which flights overlap a period, are found by binary
+    search.
+    """
+
+    def __init__(self, events=()):
+        """Creates the index.
+
+        Args:
+            events: An iterable of (timestamp, uas_in_air) tuples for the
+                user's events, sorted by timestamp.
+        """
+        self.times = []
+        self.in_air_states = []
+        for (timestamp, uas_in_air) in events:
+            self.times.append(timestamp)
+            self.in_air_states.append(uas_in_air)
+        self.update_flights()
+
+    def update_flights(self):
+        """Computes the flights from the events.
+
+        Duplicate takeoff or landing events are ignored.
+        """
+        self.periods = []
+
+        # If UAS landing at start, assume forgot to log takeoff, assign infinity
+        if self.times and not self.in_air_states[0]:
+            self.periods.append(TimePeriod(None, self.times[0]))
+
+        # Use transition from ground to air and air to ground for flight periods
+        takeoff_time = None
+        uas_in_air = False
+        for (timestamp, event_in_air) in zip(self.times, self.in_air_states):
+            # Check for transition from ground to air
+            if not uas_in_air and event_in_air:
+                takeoff_time = timestamp
+                uas_in_air = event_in_air
+            # Check for transition from air to ground
+            if uas_in_air and not event_in_air:
+                uas_in_air = event_in_air
+                self.periods.append(TimePeriod(takeoff_time, timestamp))
+
+        # If UAS in air at end, assume forgot to log landing, assign infinity
+        if uas_in_air:
+            self.periods.append(TimePeriod(self.times[-1], None))
+
+        # Only the first flight may have no start, and only the last no end,
+        # so the known starts and ends are sorted lists for bisection.
+        self.starts_offset = 0
+        if self.periods and self.periods[0].start is None:
+            self.starts_offset = 1
+        self.starts = [p.start for p in self.periods[self.starts_offset:]]
+        self.ends = [p.end for p in self.periods if p.end is not None]
+
+    def flights(self):
+        """Gets the flights.
+
+        Returns:
+            A list of TimePeriod objects corresponding to individual flights,
+            in chronological order.
+        """
+        return list(self.periods)
+
+    def flights_overlapping(self, start, end):
+        """Gets the flights overlapping a period.
+
+        Args:
+            start: The start of the period, or None if unbounded.
+            end: The end of the period, or None if unbounded.
+        Returns:
+            A list of the TimePeriod objects of the flights overlapping the
+            period, in chronological order.
+        """
+        first = 0
+        if start is not None:
+            # The first flight ending at or after the start.
+            first = bisect.bisect_left(self.ends, start)
+        last = len(self.periods)
+        if end is not None:
+            # The flights starting at or before the end.
+            last = self.starts_offset + bisect.bisect_right(self.starts, end)
+        return self.periods[first:last]
+
+    def in_air(self, time):
+        """Determines whether the UAS was in the air at a time.
+
+        Args:
+            time: The time to check.
+        Returns:
+            Whether the last event before the time was a takeoff.
+        """
+        i = bisect.bisect_left(self.times, time)
+        if i == 0:
+            return False
+        return self.in_air_states[i - 1]
@@ -0,0 +1,57 @@
+"""Tests for the flight_index module."""
+
+import datetime
+from auvsi_suas.models import FlightIndex
+from auvsi_suas.models import TimePeriod
+from django.test import TestCase
+from django.utils import timezone
+
+
+class TestFlightIndex(TestCase):
+    """Tests the FlightIndex."""
+
+    def setUp(self):
+        self.start = datetime.datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+    def t(self, minutes):
+        """Gets the time some minutes after the start."""
+        return self.start + datetime.timedelta(minutes=minutes)
+
+    def test_flights(self):
+        """Flights are found from the events."""
+        index = FlightIndex([(self.t(0), False), (self.t(10), True),
+                             (self.t(15), True), (self.t(20), False),
+                             (self.t(25), False), (self.t(30), True)])
+        self.assertEqual([TimePeriod(None, self.t(0)),
+                          TimePeriod(self.t(10), self.t(20)),
+                          TimePeriod(self.t(30), None)], index.flights())
+
+        self.assertEqual([], FlightIndex().flights())
+
+    def test_in_air(self):
+        """In air after a takeoff, until the next landing."""
+        index = FlightIndex([(self.t(10), True), (self.t(20), False)])
+        self.assertFalse(index.in_air(self.t(5)))
+        self.assertFalse(index.in_air(self.t(10)))
+        self.assertTrue(index.in_air(self.t(15)))
+        self.assertTrue(index.in_air(self.t(20)))
+        self.assertFalse(index.in_air(self.t(25)))
+
+    def test_flights_overlapping(self):
+        """Flights overlapping a period are found, including open ones."""
+        index = FlightIndex([(self.t(0), False), (self.t(10), True),
+                             (self.t(20), False), (self.t(30), True),
+                             (self.t(40), False), (self.t(50), True)])
+        (before, first, second, after) = index.flights()
+
+        self.assertEqual([before, first, second, after],
+                         index.flights_overlapping(None, None))
+        self.assertEqual([before], index.flights_overlapping(None, self.t(5)))
+        self.assertEqual([first, second],
+                         index.flights_overlapping(self.t(20), self.t(30)))
+        self.assertEqual([], index.flights_overlapping(self.t(21),
+                                                       self.t(29)))
+        self.assertEqual([second, after],
+                         index.flights_overlapping(self.t(35), None))
+        self.assertEqual([after], index.flights_overlapping(self.t(60),
+                                                            self.t(70)))
@@ -2,8 +2,11 @@
 from auvsi_suas.patches.simplekml_patch import AltitudeMode
 from auvsi_suas.patches.simplekml_patch import Color
 import numpy as np
+from aerial_position import AerialPosition
+from cached_artifact import CachedArtifact
+from gps_position import GpsPosition
 from django.db import models
-from matplotlib import path as mplpath
+from fly_zone_geometry import FlyZoneGeometry
 from waypoint import Waypoint
 
 
@@ -26,6 +29,23 @@ class FlyZone(models.Model):
                        (str(self.pk), str(self.altitude_msl_min),
                         str(self.altitude_msl_max), boundary_str))
 
+    def geometry(self):
+        """Gets the compiled geometry of the zone.
+
+        The geometry is cached until the zone or its boundary is changed.
+
+        Returns:
+            A FlyZoneGeometry for the zone.
+        """
+        def compile_geometry():
+            boundary = self.boundary_pts.order_by('order').values_list(
+                'position__gps_position__latitude',
+                'position__gps_position__longitude')
+            return FlyZoneGeometry(list(boundary), self.altitude_msl_min,
+                                   self.altitude_msl_max)
+
+        return geometry_cache.get_or_compute(compile_geometry, self.pk)
+
     def contains_pos(self, aerial_pos):
         """Whether the given pos is inside the zone.
 
@@ -44,47 +64,23 @@ class FlyZone(models.Model):
         Returns:
             A list storing whether each position is inside the boundary.
         """
-        # Get boundary points
-        ordered_pts = self.boundary_pts.order_by('order')
-        path_pts = [[wpt.position.gps_position.latitude,
-                     wpt.position.gps_position.longitude]
-                    for wpt in ordered_pts]
-        # First check enough points to define a polygon
-        if len(path_pts) < 3:
-            return [False] * len(aerial_pos_list)
-
-        # Create path to use for testing polygon inclusion
-        path_pts.append(path_pts[0])
-        path = mplpath.Path(np.array(path_pts))
-
-        # Test each aerial position for altitude
-        results = []
-        for aerial_pos in aerial_pos_list:
-            # Check altitude bounds
-            alt = aerial_pos.altitude_msl
-            altitude_check = (
-                alt <= self.altitude_msl_max and alt >= self.altitude_msl_min
-            )
-            results.append(altitude_check)
-
-        # Create a list of positions to test whether inside polygon
-        polygon_test_point_ids = [cur_id
-                                  for cur_id in range(len(aerial_pos_list))
-                                  if results[cur_id]]
-        if len(polygon_test_point_ids) == 0:
-            return results
-        polygon_test_points = [[aerial_pos_list[cur_id].gps_position.latitude,
-                                aerial_pos_list[cur_id].gps_position.longitude]
-                               for cur_id in polygon_test_point_ids]
-
-        # Test each point for inside polygon
-        polygon_test_results = path.contains_points(
-            np.array(polygon_test_points))
-        for test_id in range(len(polygon_test_point_ids)):
-            cur_id = polygon_test_point_ids[test_id]
-            results[cur_id] = (polygon_test_results[test_id] == True)
-
-        return results
+        latitudes = [pos.gps_position.latitude for pos in aerial_pos_list]
+        longitudes = [pos.gps_position.longitude for pos in aerial_pos_list]
+        altitudes = [pos.altitude_msl for pos in aerial_pos_list]
+        return self.contains_positions(latitudes, longitudes,
+                                       altitudes).tolist()
+
+    def contains_positions(self, latitudes, longitudes, altitudes):
+        """Whether each of the positions is inside the zone.
+
+        Args:
+            latitudes: An array of the latitudes of the positions.
+            longitudes: An array of the longitudes of the positions.
+            altitudes: An array of the altitudes (MSL) of the positions.
+        Returns:
+            A numpy array of whether each position is inside the zone.
+        """
+        return self.geometry().contains(latitudes, longitudes, altitudes)
 
     @classmethod
     def out_of_bounds(cls, fly_zones, uas_telemetry_logs):
@@ -98,25 +94,22 @@ class FlyZone(models.Model):
             The floating point total time in seconds spent out of bounds as
             indicated by the telemetry logs.
         """
-        # Get the aerial positions for the logs
-        aerial_pos_list = [cur_log.uas_position
-                           for cur_log in uas_telemetry_logs]
-        log_ids_to_process = range(len(aerial_pos_list))
+        positions = np.array([(log.latitude, log.longitude, log.altitude_msl)
+                              for log in uas_telemetry_logs],
+                             dtype=np.float64).reshape(-1, 3)
 
         # Evaluate zones against the logs, eliminating satisfied ones, until
         # only the out of boundary ids remain
+        log_ids_to_process = np.arange(len(positions))
         for zone in fly_zones:
             # Stop processing if no ids
             if len(log_ids_to_process) == 0:
                 break
-            # Evaluate the positions still not satisfied
-            cur_positions = [aerial_pos_list[cur_id]
-                             for cur_id in log_ids_to_process]
-            satisfied_positions = zone.contains_many_pos(cur_positions)
             # Retain those which were not satisfied in this pass
-            log_ids_to_process = [log_ids_to_process[cur_id]
-                                  for cur_id in range(len(log_ids_to_process))
-                                  if not satisfied_positions[cur_id]]
+            cur_positions = positions[log_ids_to_process]
+            satisfied_positions = zone.contains_positions(
+                cur_positions[:, 0], cur_positions[:, 1], cur_positions[:, 2])
+            log_ids_to_process = log_ids_to_process[~satisfied_positions]
 
         # Positions that remain are out of bound positions, compute total time
         total_time = 0
@@ -134,6 +127,27 @@ class FlyZone(models.Model):
 
         return total_time
 
+    @classmethod
+    def out_of_bounds_intervals(cls, fly_zones, times, positions):
+        """Determines the time spent out of bounds over a flight.
+
+        See FlyZoneGeometry.out_of_bounds_intervals().
+
+        Args:
+            fly_zones: The list of FlyZone that the UAS must be in.
+            times: A numpy array of the flight's times in seconds.
+            positions: A numpy array with a (latitude, longitude, altitude_msl)
+                row for the UAS at each of the times.
+        Returns:
+            A tuple (total_time, intervals) where total_time is the floating
+            point total time in seconds spent out of bounds, and intervals is a
+            list of (start, end) tuples of float seconds during which the UAS
+            was out of bounds.
+        """
+        geometries = [zone.geometry() for zone in fly_zones]
+        return FlyZoneGeometry.out_of_bounds_intervals(geometries, times,
+                                                       positions)
+
     @classmethod
     def kml_all(cls, kml):
         """
@@ -174,3 +188,15 @@ class FlyZone(models.Model):
         pol.style.linestyle.color = Color.red
         pol.style.linestyle.width = 3
         pol.style.polystyle.color = Color.changealphaint(50, Color.green)
+
+
+# The compiled geometry of fly zones, by zone. Only changes to the positions of
+# boundary points invalidate it, as positions are saved for other uses.
+geometry_cache = CachedArtifact('FlyZone/geometry', [
+    FlyZone, FlyZone.boundary_pts.through,
+    (Waypoint, lambda wpt: FlyZone.objects.filter(boundary_pts=wpt).exists()),
+    (AerialPosition, lambda apos: FlyZone.objects.filter(
+        boundary_pts__position=apos).exists()),
+    (GpsPosition, lambda gpos: FlyZone.objects.filter(
+        boundary_pts__position__gps_position=gpos).exists()),
+])
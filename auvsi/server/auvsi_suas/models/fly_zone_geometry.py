@@ -0,0 +1,138 @@
+"""Compiled fly zone geometry."""
+
+import numpy as np
+from matplotlib import path as mplpath
+
+# Number of bisections used to find where a segment crosses a boundary.
+BOUNDARY_CROSSING_ITERATIONS = 10
+
+
+class FlyZoneGeometry(object):
+    """The boundary and altitude bounds of a FlyZone, ready for evaluation.
+
+    Holds the boundary polygon as a numpy array along with its bounding box,
+    so positions can be tested without touching the database.
+    """
+
+    def __init__(self, boundary, altitude_msl_min, altitude_msl_max):
+        """Compiles the geometry.
+
+        Args:
+            boundary: A list of (latitude, longitude) boundary points in
+                order.
+            altitude_msl_min: The minimum altitude (MSL) in feet.
+            altitude_msl_max: The maximum altitude (MSL) in feet.
+        """
+        self.boundary = np.array(boundary, dtype=np.float64).reshape(-1, 2)
+        self.altitude_msl_min = altitude_msl_min
+        self.altitude_msl_max = altitude_msl_max
+
+        # Need enough points to define a polygon
+        self.path = None
+        if len(self.boundary) >= 3:
+            self.path = mplpath.Path(np.vstack((self.boundary,
+                                                self.boundary[:1])))
+            (self.latitude_min, self.longitude_min) = self.boundary.min(axis=0)
+            (self.latitude_max, self.longitude_max) = self.boundary.max(axis=0)
+
+    def contains(self, latitudes, longitudes, altitudes):
+        """Whether each of the positions is inside the zone.
+
+        Args:
+            latitudes: An array of the latitudes of the positions.
+            longitudes: An array of the longitudes of the positions.
+            altitudes: An array of the altitudes (MSL) of the positions.
+        Returns:
+            A numpy array of whether each position is inside the zone.
+        """
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        altitudes = np.asarray(altitudes, dtype=np.float64)
+
+        inside = np.zeros(len(altitudes), dtype=bool)
+        if self.path is None:
+            return inside
+
+        # Only test the polygon for positions within altitude and bounding box
+        candidates = ((altitudes >= self.altitude_msl_min) &
+                      (altitudes <= self.altitude_msl_max) &
+                      (latitudes >= self.latitude_min) &
+                      (latitudes <= self.latitude_max) &
+                      (longitudes >= self.longitude_min) &
+                      (longitudes <= self.longitude_max))
+        candidate_ids = np.flatnonzero(candidates)
+        if len(candidate_ids) == 0:
+            return inside
+
+        points = np.column_stack((latitudes[candidate_ids],
+                                  longitudes[candidate_ids]))
+        inside[candidate_ids] = self.path.contains_points(points)
+        return inside
+
+    @staticmethod
+    def out_of_bounds_intervals(geometries, times, positions):
+        """Determines the time spent out of bounds over a flight.
+
+        The UAS is taken to fly straight between positions at constant speed.
+        Where a segment between positions crosses the boundary, the crossing
+        time is found by bisecting the segment.
+
+        Args:
+            geometries: The list of FlyZoneGeometry that the UAS must be in.
+            times: A numpy array of the flight's times in seconds.
+            positions: A numpy array with a (latitude, longitude, altitude_msl)
+                row for the UAS at each of the times.
+        Returns:
+            A tuple (total_time, intervals) where total_time is the floating
+            point total time in seconds spent out of bounds, and intervals is a
+            list of (start, end) tuples of float seconds during which the UAS
+            was out of bounds. Intervals start and end at the interpolated
+            boundary crossings, or at the first and last positions.
+        """
+        def inside_any(points):
+            inside = np.zeros(len(points), dtype=bool)
+            for geometry in geometries:
+                inside |= geometry.contains(points[:, 0], points[:, 1],
+                                            points[:, 2])
+            return inside
+
+        if len(times) < 2:
+            return (0.0, [])
+        inside = inside_any(positions)
+        starts_in = inside[:-1]
+        ends_in = inside[1:]
+
+        # Bisect the segments which cross the boundary, keeping lower bounds
+        # on the same side as the start of the segment.
+        crossing_ids = np.flatnonzero(starts_in != ends_in)
+        lower = np.zeros(len(crossing_ids))
+        upper = np.ones(len(crossing_ids))
+        seg_starts = positions[crossing_ids]
+        seg_deltas = positions[crossing_ids + 1] - seg_starts
+        for _ in xrange(BOUNDARY_CROSSING_ITERATIONS):
+            middle = (lower + upper) / 2
+            middle_in = inside_any(seg_starts +
+                                   seg_deltas * middle[:, np.newaxis])
+            same_side = middle_in == starts_in[crossing_ids]
+            lower = np.where(same_side, middle, lower)
+            upper = np.where(same_side, upper, middle)
+        crossing_times = times[:-1].copy()
+        crossing_times[crossing_ids] += ((times[crossing_ids + 1] -
+                                          times[crossing_ids]) *
+                                         (lower + upper) / 2)
+
+        # Out of bounds part of each segment, ending or starting at crossings
+        out_starts = np.where(starts_in, crossing_times, times[:-1])
+        out_ends = np.where(ends_in, crossing_times, times[1:])
+        has_out = ~(starts_in & ends_in)
+        total_time = float(np.sum((out_ends - out_starts)[has_out]))
+
+        # Consecutive out of bounds parts join unless they meet inside
+        prev_has_out = np.concatenate(([False], has_out[:-1]))
+        next_has_out = np.concatenate((has_out[1:], [False]))
+        first_ids = np.flatnonzero(has_out & (~prev_has_out | starts_in))
+        last_ids = np.flatnonzero(has_out & (~next_has_out | ends_in))
+        intervals = [(float(out_starts[first]), float(out_ends[last]))
+                     for (first, last) in zip(first_ids, last_ids)]
+
+        return (total_time, intervals)
@@ -0,0 +1,39 @@
+"""Tests for the fly_zone_geometry module."""
+
+import numpy as np
+from auvsi_suas.models.fly_zone_geometry import FlyZoneGeometry
+from django.test import TestCase
+
+
+class TestFlyZoneGeometry(TestCase):
+    """Tests the FlyZoneGeometry class."""
+
+    def test_bounds(self):
+        """The bounding box of the boundary is precomputed."""
+        geometry = FlyZoneGeometry([(0, 0), (10, 5), (2, 20)], 0, 100)
+        self.assertEqual(geometry.latitude_min, 0)
+        self.assertEqual(geometry.latitude_max, 10)
+        self.assertEqual(geometry.longitude_min, 0)
+        self.assertEqual(geometry.longitude_max, 20)
+
+    def test_contains(self):
+        """Tests positions against a triangle."""
+        geometry = FlyZoneGeometry([(0, 0), (10, 0), (0, 10)], 0, 100)
+        inside = geometry.contains([1, 1, 6, 1, 1, 20],
+                                   [1, 1, 6, 1, 1, 1],
+                                   [0, 100, 50, -1, 101, 50])
+        self.assertEqual(inside.tolist(),
+                         [True, True, False, False, False, False])
+
+    def test_not_polygon(self):
+        """Can't be inside fewer than three points."""
+        for boundary in [[], [(0, 0)], [(0, 0), (10, 10)]]:
+            geometry = FlyZoneGeometry(boundary, 0, 100)
+            inside = geometry.contains([0, 5], [0, 5], [50, 50])
+            self.assertEqual(inside.tolist(), [False, False])
+
+    def test_empty(self):
+        """No positions gives no results."""
+        geometry = FlyZoneGeometry([(0, 0), (10, 0), (0, 10)], 0, 100)
+        inside = geometry.contains(np.array([]), np.array([]), np.array([]))
+        self.assertEqual(inside.shape, (0, ))
@@ -1,6 +1,7 @@
 """Tests for the fly_zone module."""
 
 import datetime
+import numpy as np
 from auvsi_suas.models import AerialPosition
 from auvsi_suas.models import FlyZone
 from auvsi_suas.models import GpsPosition
@@ -229,6 +230,44 @@ class TestFlyZone(TestCase):
             self.assertEqual(
                 zone.contains_many_pos(aerial_pos_list), expected_results)
 
+    def test_geometry_invalidated(self):
+        """The cached geometry is rebuilt when the boundary changes."""
+        (zone, _) = self.testdata_containspos[2]
+        apos = AerialPosition(altitude_msl=50,
+                              gps_position=GpsPosition(latitude=150,
+                                                       longitude=50))
+        self.assertFalse(zone.contains_pos(apos))
+
+        # Move a boundary point to take in the position
+        wpt = zone.boundary_pts.get(order=1)
+        wpt.position.gps_position.latitude = 200
+        wpt.position.gps_position.save()
+        wpt.save()
+        self.assertTrue(zone.contains_pos(apos))
+
+        # Remove the boundary point
+        zone.boundary_pts.remove(wpt)
+        self.assertFalse(zone.contains_pos(apos))
+        self.assertEqual(len(zone.geometry().boundary), 3)
+
+    def test_geometry_invalidated_by_position(self):
+        """Editing a boundary position rebuilds the geometry."""
+        (zone, _) = self.testdata_containspos[2]
+        apos = AerialPosition(altitude_msl=50,
+                              gps_position=GpsPosition(latitude=150,
+                                                       longitude=50))
+        self.assertFalse(zone.contains_pos(apos))
+
+        # Other positions don't invalidate the geometry.
+        GpsPosition.objects.create(latitude=1, longitude=1).save()
+        with self.assertNumQueries(0):
+            zone.geometry()
+
+        gpos = zone.boundary_pts.get(order=1).position.gps_position
+        gpos.latitude = 200
+        gpos.save()
+        self.assertTrue(zone.contains_pos(apos))
+
     def test_out_of_bounds(self):
         """Tests the UAS out of bounds method."""
         (zone_details, uas_details) = TESTDATA_FLYZONE_EVALBOUNDS
@@ -293,3 +332,49 @@ class TestFlyZone(TestCase):
             # Assert out of bounds time matches expected
             out_of_bounds_time = FlyZone.out_of_bounds(zones, uas_logs)
             self.assertAlmostEqual(out_of_bounds_time, exp_out_of_bounds_time)
+
+    def test_out_of_bounds_intervals(self):
+        """Tests the interpolated out of bounds evaluation."""
+        (zone_details, _) = TESTDATA_FLYZONE_EVALBOUNDS
+        zones = []
+        for (alt_min, alt_max, wpts) in zone_details:
+            zone = FlyZone(altitude_msl_min=alt_min, altitude_msl_max=alt_max)
+            zone.save()
+            for wpt_id, (lat, lon) in enumerate(wpts):
+                gpos = GpsPosition(latitude=lat, longitude=lon)
+                gpos.save()
+                apos = AerialPosition(gps_position=gpos, altitude_msl=0)
+                apos.save()
+                wpt = Waypoint(order=wpt_id, position=apos)
+                wpt.save()
+                zone.boundary_pts.add(wpt)
+            zones.append(zone)
+
+        # Leaves north at 0.5s, returns at 2.67s, climbs out at 4.5s
+        times = np.array([0.0, 1.0, 2.0, 3.0, 4.0, 5.0])
+        positions = np.array([
+            (38.5, -76.5, 50),
+            (39.5, -76.5, 50),
+            (40, -76.5, 50),
+            (38.5, -76.5, 50),
+            (38.5, -76.5, 650),
+            (38.5, -76.5, 750),
+        ])  # yapf: disable
+        (total_time, intervals) = FlyZone.out_of_bounds_intervals(
+            zones, times, positions)
+        self.assertAlmostEqual(total_time, 2 + 2. / 3, places=2)
+        self.assertEqual(len(intervals), 2)
+        for ((start, end), (exp_start, exp_end)) in zip(
+                intervals, [(0.5, 2 + 2. / 3), (4.5, 5)]):
+            self.assertAlmostEqual(start, exp_start, places=2)
+            self.assertAlmostEqual(end, exp_end, places=2)
+
+        # Always out of bounds
+        (total_time, intervals) = FlyZone.out_of_bounds_intervals(
+            zones, times[:3], positions[1:4] + [10, 0, 0])
+        self.assertEqual(total_time, 2.0)
+        self.assertEqual(intervals, [(0.0, 2.0)])
+
+        # Single position has no time
+        self.assertEqual(FlyZone.out_of_bounds_intervals(
+            zones, times[1:2], positions[1:2]), (0.0, []))
@@ -1,23 +1,49 @@
 """Mission configuration model."""
 
+import bisect
+import collections
+import copy
+import datetime
 import itertools
 import logging
+import multiprocessing
+import numpy as np
+import operator
+import time
+from auvsi_suas.models import distance
 from auvsi_suas.patches.simplekml_patch import Color
 from auvsi_suas.patches.simplekml_patch import AltitudeMode
+from aerial_position import AerialPosition
+from cached_artifact import CachedArtifact
+from epoch import seconds_since_epoch
+from flight_checkpoint import FlightCheckpoint
+from flight_checkpoint import INTEROP_KINDS
 from fly_zone import FlyZone
+from fly_zone import geometry_cache
 from gps_position import GpsPosition
 from moving_obstacle import MovingObstacle
+from moving_obstacle import path_cache
 from obstacle_access_log import ObstacleAccessLog
 from server_info import ServerInfo
 from server_info_access_log import ServerInfoAccessLog
 from stationary_obstacle import StationaryObstacle
 from takeoff_or_landing_event import TakeoffOrLandingEvent
+from team_flight_checkpoint import TeamFlightCheckpoint
+from team_violations import TeamViolations
 from time_period import TimePeriod
 from uas_telemetry import UasTelemetry
+from violation_monitor import ViolationMonitor
+from violation_monitor import empty_violations
 from waypoint import Waypoint
+from django import db
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import IntegrityError
 from django.db import models
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
+from django.utils import timezone
 
 # Logging for the module
 logger = logging.getLogger(__name__)
@@ -122,118 +148,418 @@ class MissionConfig(models.Model):
             A list of booleans where each value indicates whether the UAS
             satisfied the waypoint for that index.
         """
-        waypoints_satisfied = []
-        waypoints = self.mission_waypoints.order_by('order')
-        for waypoint in waypoints:
-            satisfied = False
-            for uas_log in uas_telemetry_logs:
-                distance = uas_log.uas_position.distance_to(waypoint.position)
-                if distance < settings.SATISFIED_WAYPOINT_DIST_MAX_FT:
-                    satisfied = True
-                    break
-            waypoints_satisfied.append(satisfied)
-        return waypoints_satisfied
-
-    def evaluate_teams(self):
+        return [wpt_eval['satisfied']
+                for wpt_eval in self.evaluate_waypoints(uas_telemetry_logs)]
+
+    def evaluate_waypoints(self, uas_telemetry_logs):
+        """Evaluates the UAS's approach to each of the waypoints.
+
+        The distances between every waypoint and log are computed as a matrix,
+        a chunk of SATISFIED_WAYPOINT_EVAL_CHUNK_LOGS logs at a time.
+
+        Args:
+            uas_telemetry_logs: A list of UAS Telemetry logs.
+        Returns:
+            A list with a dict for each waypoint, in order, of the form:
+            {
+                'satisfied': Whether the UAS satisfied the waypoint,
+                'closest_distance': Closest distance of the UAS in feet,
+                'closest_time': Time of the log with the closest distance,
+            }
+            The closest distance and time are None if there are no logs.
+        """
+        (_, positions) = UasTelemetry.arrays(uas_telemetry_logs)
+        timestamps = [log.timestamp for log in uas_telemetry_logs]
+        return self.evaluate_waypoint_positions(self.waypoint_positions(),
+                                                positions, timestamps)
+
+    def waypoint_positions(self):
+        """Gets the positions of the mission waypoints.
+
+        Returns:
+            A numpy array with a (latitude, longitude, altitude_msl) row for
+            each waypoint, in order.
+        """
+        waypoints = self.mission_waypoints.order_by('order').values_list(
+            'position__gps_position__latitude',
+            'position__gps_position__longitude', 'position__altitude_msl')
+        return np.array(list(waypoints), dtype=np.float64).reshape(-1, 3)
+
+    @staticmethod
+    def evaluate_waypoint_positions(wpt_positions, positions, timestamps):
+        """Evaluates the UAS's approach to each of the waypoints.
+
+        See evaluate_waypoints().
+
+        Args:
+            wpt_positions: A numpy array with a (latitude, longitude,
+                altitude_msl) row for each waypoint.
+            positions: A numpy array with a (latitude, longitude, altitude_msl)
+                row for each UAS position.
+            timestamps: A list of the times of the UAS positions.
+        Returns:
+            The list of waypoint evaluations given by evaluate_waypoints().
+        """
+        # Closest distance and log index for each waypoint over all chunks
+        closest_dists = np.full(len(wpt_positions), np.inf)
+        closest_ids = np.zeros(len(wpt_positions), dtype=int)
+        wpt_ids = np.arange(len(wpt_positions))
+        chunk_size = settings.SATISFIED_WAYPOINT_EVAL_CHUNK_LOGS
+        for start in xrange(0, len(positions), chunk_size):
+            chunk = positions[start:start + chunk_size]
+            dists = distance.distance_matrix(
+                wpt_positions[:, 0], wpt_positions[:, 1], wpt_positions[:, 2],
+                chunk[:, 0], chunk[:, 1], chunk[:, 2])
+            chunk_ids = np.argmin(dists, axis=1)
+            chunk_dists = dists[wpt_ids, chunk_ids]
+            closer = chunk_dists < closest_dists
+            closest_dists[closer] = chunk_dists[closer]
+            closest_ids[closer] = chunk_ids[closer] + start
+
+        evaluations = []
+        for (closest_dist, closest_id) in zip(closest_dists, closest_ids):
+            if not timestamps:
+                evaluations.append({'satisfied': False,
+                                    'closest_distance': None,
+                                    'closest_time': None})
+            else:
+                evaluations.append({
+                    'satisfied': bool(closest_dist <
+                                      settings.SATISFIED_WAYPOINT_DIST_MAX_FT),
+                    'closest_distance': float(closest_dist),
+                    'closest_time': timestamps[closest_id],
+                })
+        return evaluations
+
+    def evaluate_teams(self, processes=1):
         """Evaluates the teams (non admin users) of the competition.
 
+        Args:
+            processes: The number of worker processes to score teams with. If
+                1, teams are scored in this process. See team_evaluations().
         Returns:
-            A map from user to evaluate data. The evaluation data has the
-            following map structure:
+            An ordered map from user to evaluate data, sorted by user ID. The
+            evaluation data has the following map structure:
             {
                 'waypoints_satisfied': {
                     id: Boolean,
                 }
+                'waypoints_closest_approach': {
+                    id: {'distance': Feet, 'timestamp': Time},
+                }
                 'out_of_bounds_time': Seconds spent out of bounds,
+                'out_of_bounds_violations': Number of times out of bounds,
                 'interop_times': {
-                    'server_info': {'max': Value, 'avg': Value},
-                    'obst_info': {'max': Value, 'avg': Value},
-                    'uas_telem': {'max': Value, 'avg': Value},
+                    'server_info': {'max': Value, 'avg': Value, 'p50': Value,
+                                    'p90': Value, 'p99': Value},
+                    'obst_info': {'max': Value, 'avg': Value, ...},
+                    'uas_telem': {'max': Value, 'avg': Value, ...},
                 },
                 'stationary_obst_collision': {
                     id: Boolean
                 },
                 'moving_obst_collision': {
                     id: Boolean
-                }
+                },
+                'evaluation_time': Seconds spent scoring the team,
             }
         """
-        # Start a results map from user to evaluation data
-        results = {}
+        start_time = time.time()
+        results = collections.OrderedDict(self.team_evaluations(processes))
+        logger.info('Evaluated %d teams in %f seconds.', len(results),
+                    time.time() - start_time)
+        return results
 
-        # Fill in evaluation data for each user except admins
-        users = User.objects.all()
+    def team_evaluations(self, processes=1, mission_data=None):
+        """Evaluates the teams (non admin users) of the competition in turn.
+
+        The data for the teams is loaded a chunk of teams at a time, so memory
+        use is bounded by the EVALUATE_TEAMS_CHUNK_TEAMS setting rather than
+        the number of teams. Each team is scored independently, either in this
+        process or fanned out to a pool of worker processes. The evaluation of
+        each flight is checkpointed in the database, so a team is rescored
+        from only the logs uploaded since it was last scored.
+
+        Args:
+            processes: The number of worker processes to score teams with. If
+                1, teams are scored in this process as they are consumed.
+                More than 1 forks a pool, so is only for use outside of
+                request handling, like the evaluate_teams command.
+            mission_data: The mission data from evaluation_data(), if already
+                loaded.
+        Yields:
+            A (user, evaluation data) tuple for each team, sorted by user ID.
+            The evaluation data is described by evaluate_teams().
+        """
         logger.info('Starting team evaluations.')
 
-        for user in users:
-            # Ignore admins.
-            if user.is_superuser:
-                continue
+        # Load all mission data needed for scoring.
+        if mission_data is None:
+            mission_data = self.evaluation_data()
+        users = list(User.objects.filter(is_superuser=False).order_by('pk'))
 
-            logger.info('Evaluation starting for user: %s.' % user.username)
-
-            # Start the evaluation data structure.
-            eval_data = results.setdefault(user, {})
-
-            # Find the user's flights.
-            flight_periods = TakeoffOrLandingEvent.flights(user)
-            uas_period_logs = UasTelemetry.dedupe(
-                UasTelemetry.by_time_period(user, flight_periods))
-            uas_logs = list(itertools.chain.from_iterable(uas_period_logs))
-
-            # Determine if the uas hit the waypoints.
-            waypoints_hit = self.satisfied_waypoints(uas_logs)
-            waypoints_keyed = {}
-            for i, hit in enumerate(waypoints_hit):
-                waypoints_keyed[i + 1] = hit
-            eval_data['waypoints_satisfied'] = waypoints_keyed
-
-            # Determine if the uas went out of bounds. This must be done for
-            # each period individually so time between periods isn't counted as
-            # out of bounds time. Note that this calculates reported time out
-            # of bounds, not actual or possible time spent out of bounds.
-            out_of_bounds_time = 0
-            for logs in uas_period_logs:
-                out_of_bounds_time += FlyZone.out_of_bounds(
-                    self.fly_zones.all(), logs)
-            eval_data['out_of_bounds_time'] = out_of_bounds_time
-
-            # Determine interop rates.
-            interop_times = eval_data.setdefault('interop_times', {})
-
-            server_info_times = ServerInfoAccessLog.rates(user, flight_periods)
-            obstacle_times = ObstacleAccessLog.rates(user, flight_periods)
-            uas_telemetry_times = UasTelemetry.rates(
-                user, flight_periods,
-                time_period_logs=uas_period_logs)
-
-            interop_times['server_info'] = {
-                'max': server_info_times[0],
-                'avg': server_info_times[1]
-            }
-            interop_times['obst_info'] = {
-                'max': obstacle_times[0],
-                'avg': obstacle_times[1]
-            }
-            interop_times['uas_telem'] = {
-                'max': uas_telemetry_times[0],
-                'avg': uas_telemetry_times[1]
-            }
+        pool = None
+        if processes > 1 and len(users) > 1:
+            # Workers need no database access, and must not share this
+            # process's connections, so close them before forking. They are
+            # reopened when next used.
+            db.connections.close_all()
+            pool = multiprocessing.Pool(min(processes, len(users)))
+        try:
+            chunk_teams = settings.EVALUATE_TEAMS_CHUNK_TEAMS
+            for i in xrange(0, len(users), chunk_teams):
+                chunk = users[i:i + chunk_teams]
 
-            # Determine collisions with stationary and moving obstacles.
-            stationary_collisions = eval_data.setdefault(
-                'stationary_obst_collision', {})
-            for obst in self.stationary_obstacles.all():
-                collision = obst.evaluate_collision_with_uas(uas_logs)
-                stationary_collisions[obst.pk] = collision
+                # Score the teams. Results are in the same order as the teams.
+                work = [(mission_data, team_data)
+                        for team_data in self.teams_evaluation_data(
+                            chunk, mission_data)]
+                if pool:
+                    evaluations = pool.imap(evaluate_team_star, work)
+                else:
+                    evaluations = itertools.imap(evaluate_team_star, work)
 
-            moving_collisions = eval_data.setdefault(
-                'moving_obst_collision', {})
-            for obst in self.moving_obstacles.all():
-                collision = obst.evaluate_collision_with_uas(uas_logs)
-                moving_collisions[obst.pk] = collision
+                for (user, (eval_data, checkpoints)) in itertools.izip(
+                        chunk, evaluations):
+                    self.save_flight_checkpoints(user, checkpoints)
+                    logger.info('Evaluated user %s in %f seconds.',
+                                user.username, eval_data['evaluation_time'])
+                    yield (user, eval_data)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
 
-        return results
+    def evaluation_data(self):
+        """Gets the mission data needed to score teams.
+
+        The data is fully loaded, so scoring needs no database access and may
+        happen in another process.
+
+        Returns:
+            A dict with the keys 'waypoints', a numpy array of the waypoint
+            positions, 'fly_zones', a list of FlyZoneGeometry, and
+            'stationary_obstacles' and 'moving_obstacles', lists of the loaded
+            obstacles.
+        """
+        stationary_obstacles = list(
+            self.stationary_obstacles.select_related('gps_position'))
+        moving_obstacles = list(self.moving_obstacles.all())
+        for obst in moving_obstacles:
+            if obst.get_fixed_position() is None:
+                obst.get_path_spline_curve()
+
+        return {
+            'waypoints': self.waypoint_positions(),
+            'fly_zones': [zone.geometry() for zone in self.fly_zones.all()],
+            'stationary_obstacles': stationary_obstacles,
+            'moving_obstacles': moving_obstacles,
+        }
+
+    def teams_evaluation_data(self, users, mission_data):
+        """Gets the flight data needed to score teams.
+
+        The evaluation of each flight is checkpointed, so only the logs since
+        the checkpoint settled and those uploaded since are loaded, with a
+        single query for each kind of log. A flight is evaluated from scratch
+        if it has no checkpoint, ended before logs folded into the
+        checkpoint, or has new logs older than those folded in.
+
+        Args:
+            users: The list of users to get data for.
+            mission_data: The mission data from evaluation_data().
+        Returns:
+            A list with a dict for each user, with the keys 'settled', the
+            datetime before which logs are folded into the checkpoints, and
+            'flights', a list of (key, start, checkpoint, logs) for each
+            flight, in order. key is the start of the flight as a datetime or
+            None, identifying its checkpoint, start is the same as seconds
+            since the obstacle path epoch, checkpoint is the flight's
+            FlightCheckpoint and logs are the flight's new logs, as given by
+            flight_logs().
+        """
+        settled = timezone.now() - datetime.timedelta(
+            seconds=settings.EVALUATE_TEAMS_SETTLE_SEC)
+        flight_indexes = TakeoffOrLandingEvent.flight_indexes(users,
+                                                              cached=False)
+        flights = [(user.pk, period)
+                   for user in users
+                   for period in flight_indexes[user.pk].flights()]
+        saved = dict(((row.user_id, row.flight_start), row.checkpoint)
+                     for row in TeamFlightCheckpoint.objects.filter(
+                         mission=self, user__in=users))
+
+        checkpoints = []
+        for (user_pk, period) in flights:
+            (_, end) = period_seconds(period)
+            # Checkpoints of another version are None, so are started over.
+            checkpoint = saved.get((user_pk, period.start))
+            if checkpoint is None or not checkpoint.extends(end):
+                checkpoint = FlightCheckpoint(mission_data, end)
+            checkpoint.end = end
+            checkpoints.append(checkpoint)
+        logs = flight_logs(flights, checkpoints)
+
+        # Start over the flights with logs older than those folded in.
+        restarts = [i for (i, checkpoint) in enumerate(checkpoints)
+                    if not all(checkpoint.in_order(kind, logs[i][kind][1])
+                               for kind in INTEROP_KINDS)]
+        if restarts:
+            for i in restarts:
+                checkpoints[i] = FlightCheckpoint(mission_data,
+                                                  checkpoints[i].end)
+            restart_logs = flight_logs([flights[i] for i in restarts],
+                                       [checkpoints[i] for i in restarts])
+            for (i, flight) in zip(restarts, restart_logs):
+                logs[i] = flight
+
+        teams_flights = dict((user.pk, []) for user in users)
+        for ((user_pk, period), checkpoint, flight) in zip(flights,
+                                                           checkpoints, logs):
+            (start, _) = period_seconds(period)
+            teams_flights[user_pk].append((period.start, start, checkpoint,
+                                           flight))
+        return [{'settled': settled, 'flights': teams_flights[user.pk]}
+                for user in users]
+
+    def save_flight_checkpoints(self, user, checkpoints):
+        """Saves the checkpoints of a team's flights, replacing the old ones.
+
+        Args:
+            user: The user who flew.
+            checkpoints: A list of (key, checkpoint) tuples for the user's
+                flights, with keys as given by teams_evaluation_data().
+        """
+        rows = []
+        for (start, checkpoint) in checkpoints:
+            row = TeamFlightCheckpoint(mission=self, user=user,
+                                       flight_start=start)
+            row.checkpoint = checkpoint
+            rows.append(row)
+        with transaction.atomic():
+            TeamFlightCheckpoint.objects.filter(mission=self,
+                                                user=user).delete()
+            TeamFlightCheckpoint.objects.bulk_create(rows)
+
+    def violation_monitor(self):
+        """Gets the mission's obstacles and fly zones compiled for monitoring.
+
+        The monitor is cached until the mission, its obstacles or its fly
+        zones are changed.
+
+        Returns:
+            A ViolationMonitor for the mission.
+        """
+        def compile_monitor():
+            stationary_obstacles = [
+                (obst.pk, obst.gps_position.latitude,
+                 obst.gps_position.longitude, obst.cylinder_radius,
+                 obst.cylinder_height)
+                for obst in self.stationary_obstacles.select_related(
+                    'gps_position')
+            ]
+            moving_obstacles = [(obst.pk, obst.path())
+                                for obst in self.moving_obstacles.all()]
+            return ViolationMonitor(
+                [zone.geometry() for zone in self.fly_zones.all()],
+                stationary_obstacles, moving_obstacles)
+
+        return violation_monitor_cache.get_or_compute(compile_monitor,
+                                                      self.pk)
+
+    def monitor_telemetry(self, logs):
+        """Checks uploaded telemetry for violations of the mission.
+
+        Telemetry during the teams' flights is checked against the mission's
+        obstacles and fly zones, and folded into each team's running
+        violation state. The states are read and written back in a
+        transaction holding their rows, so concurrent uploads by a team
+        don't lose each other's updates. Checking needs two queries per
+        team once the monitor and the teams' flights are cached.
+
+        Args:
+            logs: A list of UasTelemetry logs.
+        Returns:
+            A list of (log, alert) tuples for the violations started by the
+            logs, with alerts described by ViolationMonitor.update().
+        """
+        users = dict((log.user_id, log.user) for log in logs)
+        if not users:
+            return []
+        monitor = self.violation_monitor()
+        flight_indexes = TakeoffOrLandingEvent.flight_indexes(users.values())
+
+        alerts = []
+        with transaction.atomic():
+            rows = self.lock_violations(users.keys())
+            states = dict((pk, row.state) for (pk, row) in rows.items())
+            for log in sorted(logs, key=lambda log: log.timestamp):
+                flights = flight_indexes[log.user_id].flights_overlapping(
+                    log.timestamp, log.timestamp)
+                if not flights:
+                    continue
+                log_time = seconds_since_epoch([log.timestamp])[0]
+                log_alerts = monitor.update(states[log.user_id],
+                                            flights[-1].start, log_time,
+                                            log.latitude, log.longitude,
+                                            log.altitude_msl)
+                alerts.extend((log, alert) for alert in log_alerts)
+
+            for (pk, row) in rows.items():
+                row.state = states[pk]
+                row.save()
+        return alerts
+
+    def lock_violations(self, user_pks):
+        """Gets the rows of teams' violation states, locked for update.
+
+        Rows missing for a team are created with an empty state. Must be
+        called in a transaction, which holds the locks.
+
+        Args:
+            user_pks: The IDs of the users to get the rows of.
+        Returns:
+            A dict from user ID to TeamViolations.
+        """
+        locked_rows = TeamViolations.objects.select_for_update()
+        rows = dict((row.user_id, row)
+                    for row in locked_rows.filter(mission=self,
+                                                  user__in=user_pks))
+        for pk in user_pks:
+            if pk in rows:
+                continue
+            row = TeamViolations(mission=self, user_id=pk)
+            row.state = empty_violations()
+            try:
+                with transaction.atomic():
+                    row.save()
+            except IntegrityError:
+                # Created by a concurrent upload.
+                row = locked_rows.get(mission=self, user_id=pk)
+            rows[pk] = row
+        return rows
+
+    def violations(self, users):
+        """Gets the teams' running violation state for the mission.
+
+        The state is accumulated by monitor_telemetry() as telemetry is
+        uploaded, so reading it needs a single query and no evaluation. It
+        is reset when the mission, its obstacles or its fly zones are
+        changed. MissionConfig.evaluate_teams() remains the official
+        evaluation.
+
+        Args:
+            users: The users to get the state of.
+        Returns:
+            A dict from user ID to the state described by
+            violation_monitor.empty_violations().
+        """
+        states = dict((user.pk, empty_violations()) for user in users)
+        rows = TeamViolations.objects.filter(mission=self,
+                                             user__in=states.keys())
+        for row in rows:
+            states[row.user_id] = row.state
+        return states
 
     def json(self):
         """Return a dict, for conversion to JSON."""
@@ -417,3 +743,344 @@ class MissionConfig(models.Model):
         # Stationary Obstacles
         stationary_obstacles_folder = kml_folder.newfolder(
             name='Stationary Obstacles')
+
+
+def team_interop_times(server_info_gaps, obstacle_gaps, uas_telemetry_gaps):
+    """Evaluates a team's interop rates.
+
+    Args:
+        server_info_gaps: A numpy array of the seconds between server info
+            requests during flights.
+        obstacle_gaps: A numpy array of the seconds between obstacle requests
+            during flights.
+        uas_telemetry_gaps: A numpy array of the seconds between telemetry
+            uploads during flights.
+    Returns:
+        The 'interop_times' evaluation described by
+        MissionConfig.evaluate_teams().
+    """
+    return {
+        'server_info': ServerInfoAccessLog.gap_stats(server_info_gaps),
+        'obst_info': ObstacleAccessLog.gap_stats(obstacle_gaps),
+        'uas_telem': UasTelemetry.gap_stats(uas_telemetry_gaps),
+    }
+
+
+def period_seconds(period):
+    """Gets the start and end of a time period in seconds.
+
+    Args:
+        period: A TimePeriod.
+    Returns:
+        A tuple (start, end) of seconds since the obstacle path epoch, each
+        None if the period is unbounded.
+    """
+    return tuple(None if t is None else seconds_since_epoch([t])[0]
+                 for t in (period.start, period.end))
+
+
+# The kinds of logs loaded for evaluation, with their models and the fields
+# loaded besides the ID and time.
+LOG_KINDS = [
+    ('uas_telem', UasTelemetry,
+     ['latitude', 'longitude', 'altitude_msl', 'uas_heading']),
+    ('server_info', ServerInfoAccessLog, []),
+    ('obst_info', ObstacleAccessLog, []),
+]
+
+
+def flight_logs(flights, checkpoints):
+    """Loads the logs of flights uploaded since their checkpoints.
+
+    The logs of each kind are loaded with a single query for all flights.
+
+    Args:
+        flights: A list of (user ID, TimePeriod) tuples for the flights.
+        checkpoints: A list of the FlightCheckpoint of each flight.
+    Returns:
+        A list with a dict for each flight, from each of INTEROP_KINDS to the
+        flight's logs not folded into its checkpoint, sorted by time. These
+        are the logs since the checkpoint settled, and those with IDs after
+        the last folded in. Telemetry is a tuple (pks, times, values,
+        timestamps), of the log IDs, a numpy array of the times as seconds
+        since the obstacle path epoch, a numpy array with a (latitude,
+        longitude, altitude_msl, uas_heading) row for each log, and the log
+        timestamps. Access logs are a tuple (pks, times).
+    """
+    logs = [{} for _ in flights]
+    for (kind, model, fields) in LOG_KINDS:
+        queries = []
+        for ((user_pk, period), checkpoint) in zip(flights, checkpoints):
+            query = models.Q(pk__gt=checkpoint.last_pks[kind])
+            if checkpoint.settled is not None:
+                query |= models.Q(timestamp__gte=checkpoint.settled)
+            query &= models.Q(user=user_pk)
+            if period.start is not None:
+                query &= models.Q(timestamp__gte=period.start)
+            if period.end is not None:
+                query &= models.Q(timestamp__lte=period.end)
+            queries.append(query)
+
+        user_rows = collections.defaultdict(list)
+        if queries:
+            rows = model.objects.filter(reduce(operator.or_, queries))
+            rows = rows.order_by('user', 'timestamp', 'pk').values_list(
+                'user', 'pk', 'timestamp', *fields)
+            for row in rows.iterator():
+                user_rows[row[0]].append(row)
+
+        for (i, ((user_pk, period), checkpoint)) in enumerate(
+                zip(flights, checkpoints)):
+            rows = user_rows[user_pk]
+            timestamps = [row[2] for row in rows]
+            first = 0
+            if period.start is not None:
+                first = bisect.bisect_left(timestamps, period.start)
+            last = len(rows)
+            if period.end is not None:
+                last = bisect.bisect_right(timestamps, period.end)
+            # Other flights' logs at the ends of this one may be folded in.
+            rows = [row for row in rows[first:last]
+                    if not checkpoint.folded(kind, row[1], row[2])]
+
+            pks = [row[1] for row in rows]
+            timestamps = [row[2] for row in rows]
+            times = seconds_since_epoch(timestamps)
+            if fields:
+                values = np.array([row[3:] for row in rows],
+                                  dtype=np.float64).reshape(-1, len(fields))
+                logs[i][kind] = (pks, times, values, timestamps)
+            else:
+                logs[i][kind] = (pks, times)
+    return logs
+
+
+def empty_team_data():
+    """Gets the data of a team which never flew.
+
+    Returns:
+        The team data in the form given by
+        MissionConfig.teams_evaluation_data().
+    """
+    return {'settled': None, 'flights': []}
+
+
+def split_logs(logs, time):
+    """Splits a flight's logs at a time.
+
+    Args:
+        logs: The flight's logs, as given by flight_logs().
+        time: The time to split at, as seconds since the obstacle path epoch.
+    Returns:
+        A tuple (before, after) of the logs before the time and the rest, in
+        the same form.
+    """
+    before = {}
+    after = {}
+    for (kind, kind_logs) in logs.items():
+        split = np.searchsorted(kind_logs[1], time)
+        before[kind] = tuple(part[:split] for part in kind_logs)
+        after[kind] = tuple(part[split:] for part in kind_logs)
+    return (before, after)
+
+
+def fold_flight(mission_data, checkpoint, logs):
+    """Folds a flight's new logs into its checkpoint.
+
+    Args:
+        mission_data: The mission data from MissionConfig.evaluation_data().
+        checkpoint: The flight's FlightCheckpoint, updated in place.
+        logs: The flight's new logs, as given by flight_logs().
+    """
+    for kind in ['server_info', 'obst_info']:
+        checkpoint.fold_access_logs(kind, *logs[kind])
+
+    (pks, times, values, timestamps) = logs['uas_telem']
+    keep_ids = checkpoint.fold_telemetry(mission_data['fly_zones'], pks,
+                                         times, values)
+    if len(keep_ids) == 0:
+        return
+    times = times[keep_ids]
+    positions = values[keep_ids, :3]
+    timestamps = [timestamps[i] for i in keep_ids]
+
+    # Keep the earliest closest approach to each waypoint.
+    waypoint_evals = MissionConfig.evaluate_waypoint_positions(
+        mission_data['waypoints'], positions, timestamps)
+    for (i, wpt_eval) in enumerate(waypoint_evals):
+        if wpt_eval['closest_distance'] < checkpoint.closest_distances[i]:
+            checkpoint.closest_distances[i] = wpt_eval['closest_distance']
+            checkpoint.closest_timestamps[i] = wpt_eval['closest_time']
+
+    for obst in mission_data['stationary_obstacles']:
+        if obst.evaluate_collision_with_flight(times, positions):
+            checkpoint.stationary_collisions.add(obst.pk)
+    for obst in mission_data['moving_obstacles']:
+        (collision, _, _) = obst.evaluate_collision_with_flight(times,
+                                                                positions)
+        if collision:
+            checkpoint.moving_collisions.add(obst.pk)
+
+
+def evaluate_team(mission_data, team_data):
+    """Scores a team's flights against the mission.
+
+    The flights' new logs before the settle time are folded into their
+    checkpoints, and the team scored from copies of the checkpoints with the
+    rest of the logs folded in.
+
+    Args:
+        mission_data: The mission data from MissionConfig.evaluation_data().
+        team_data: The team's data from MissionConfig.teams_evaluation_data().
+            The checkpoints are updated in place.
+    Returns:
+        The team's evaluation data, as described by
+        MissionConfig.evaluate_teams().
+    """
+    start_time = time.time()
+    eval_data = {}
+
+    flights = []
+    for (_, start, checkpoint, logs) in team_data['flights']:
+        settled = seconds_since_epoch([team_data['settled']])[0]
+        (settled_logs, new_logs) = split_logs(logs, settled)
+        fold_flight(mission_data, checkpoint, settled_logs)
+        checkpoint.settled = team_data['settled']
+
+        if any(len(new_logs[kind][0]) for kind in INTEROP_KINDS):
+            checkpoint = copy.deepcopy(checkpoint)
+            fold_flight(mission_data, checkpoint, new_logs)
+        flights.append((start, checkpoint))
+
+    # Determine if the uas hit the waypoints, at the earliest closest
+    # approach over all flights.
+    num_waypoints = len(mission_data['waypoints'])
+    closest_dists = np.full(num_waypoints, np.inf)
+    closest_timestamps = [None] * num_waypoints
+    for (_, checkpoint) in flights:
+        closer = checkpoint.closest_distances < closest_dists
+        for i in np.flatnonzero(closer):
+            closest_dists[i] = checkpoint.closest_distances[i]
+            closest_timestamps[i] = checkpoint.closest_timestamps[i]
+    waypoints_keyed = {}
+    closest_keyed = {}
+    for i in xrange(num_waypoints):
+        if closest_timestamps[i] is None:
+            waypoints_keyed[i + 1] = False
+            closest_keyed[i + 1] = {'distance': None, 'timestamp': None}
+        else:
+            waypoints_keyed[i + 1] = bool(
+                closest_dists[i] < settings.SATISFIED_WAYPOINT_DIST_MAX_FT)
+            closest_keyed[i + 1] = {
+                'distance': float(closest_dists[i]),
+                'timestamp': closest_timestamps[i],
+            }
+    eval_data['waypoints_satisfied'] = waypoints_keyed
+    eval_data['waypoints_closest_approach'] = closest_keyed
+
+    # Time out of bounds is found for each flight individually, so time
+    # between flights isn't counted as out of bounds time. Note that this
+    # estimates time out of bounds from the reported positions, assuming
+    # straight flight between them.
+    eval_data['out_of_bounds_time'] = sum(
+        checkpoint.out_of_bounds_time for (_, checkpoint) in flights)
+    eval_data['out_of_bounds_violations'] = sum(
+        checkpoint.out_of_bounds_violations for (_, checkpoint) in flights)
+
+    gaps = {}
+    for kind in INTEROP_KINDS:
+        gaps[kind] = np.concatenate(
+            [np.zeros(0)] + [checkpoint.times_between_logs(kind, start)
+                             for (start, checkpoint) in flights])
+    eval_data['interop_times'] = team_interop_times(
+        gaps['server_info'], gaps['obst_info'], gaps['uas_telem'])
+
+    # Determine collisions with stationary and moving obstacles.
+    stationary_collisions = set()
+    moving_collisions = set()
+    for (_, checkpoint) in flights:
+        stationary_collisions |= checkpoint.stationary_collisions
+        moving_collisions |= checkpoint.moving_collisions
+    eval_data['stationary_obst_collision'] = dict(
+        (obst.pk, obst.pk in stationary_collisions)
+        for obst in mission_data['stationary_obstacles'])
+    eval_data['moving_obst_collision'] = dict(
+        (obst.pk, obst.pk in moving_collisions)
+        for obst in mission_data['moving_obstacles'])
+
+    eval_data['evaluation_time'] = time.time() - start_time
+    return eval_data
+
+
+def evaluate_team_star(args):
+    """Calls evaluate_team() with a tuple of arguments, for process pools.
+
+    Returns:
+        A tuple (eval_data, checkpoints) of the team's evaluation data and a
+        list of (key, checkpoint) tuples for the team's updated flight
+        checkpoints, as they are copies when scored in another process. Keys
+        are as given by MissionConfig.teams_evaluation_data().
+    """
+    (_, team_data) = args
+    eval_data = evaluate_team(*args)
+    checkpoints = [(key, checkpoint)
+                   for (key, _, checkpoint, _) in team_data['flights']]
+    return (eval_data, checkpoints)
+
+
+def reset_violations():
+    """Resets the teams' running violation states of every mission."""
+    TeamViolations.objects.all().delete()
+
+
+# The compiled obstacles and fly zones of missions, by mission. Changes to
+# them also reset the teams' violation states, which were found with them.
+# Positions are saved for other uses, like targets, so only changes to the
+# positions of stationary obstacles invalidate it.
+violation_monitor_cache = CachedArtifact('MissionConfig/violation_monitor', [
+    MissionConfig, MissionConfig.fly_zones.through,
+    MissionConfig.stationary_obstacles.through,
+    MissionConfig.moving_obstacles.through, StationaryObstacle,
+    (GpsPosition, lambda gpos: StationaryObstacle.objects.filter(
+        gps_position=gpos).exists()), geometry_cache, path_cache
+], invalidated=reset_violations)
+
+
+def reset_flight_checkpoints():
+    """Deletes the saved flight checkpoints of every mission."""
+    TeamFlightCheckpoint.objects.all().delete()
+
+
+# What the saved flight checkpoints are found from. Nothing is cached for it,
+# but invalidating it deletes the checkpoints. New logs are folded into the
+# checkpoints, but changes to existing logs invalidate them. Only changes to
+# the positions of mission waypoints invalidate it, as positions are saved for
+# other uses.
+flight_checkpoint_inputs = CachedArtifact(
+    'MissionConfig/flight_checkpoints', [
+        violation_monitor_cache, MissionConfig.mission_waypoints.through,
+        (Waypoint, lambda wpt: MissionConfig.objects.filter(
+            mission_waypoints=wpt).exists()),
+        (AerialPosition, lambda apos: MissionConfig.objects.filter(
+            mission_waypoints__position=apos).exists()),
+        (GpsPosition, lambda gpos: MissionConfig.objects.filter(
+            mission_waypoints__position__gps_position=gpos).exists())
+    ],
+    invalidated=reset_flight_checkpoints)
+
+
+def evaluation_log_changed(sender, instance, created=False, **kwargs):
+    """Deletes the flight checkpoints when a folded log may be changed."""
+    if not created:
+        flight_checkpoint_inputs.invalidate()
+
+
+for (_, model, _) in LOG_KINDS:
+    post_save.connect(evaluation_log_changed,
+                      sender=model,
+                      dispatch_uid='MissionConfig.log_saved/%s' %
+                      model.__name__)
+    post_delete.connect(evaluation_log_changed,
+                        sender=model,
+                        dispatch_uid='MissionConfig.log_deleted/%s' %
+                        model.__name__)
@@ -6,11 +6,20 @@ from auvsi_suas.models import FlyZone
 from auvsi_suas.models import GpsPosition
 from auvsi_suas.models import MissionConfig
 from auvsi_suas.models import ServerInfo
+from auvsi_suas.models import StationaryObstacle
+from auvsi_suas.models import TakeoffOrLandingEvent
+from auvsi_suas.models import Target
+from auvsi_suas.models import TargetType
+from auvsi_suas.models import TeamFlightCheckpoint
+from auvsi_suas.models import TeamViolations
 from auvsi_suas.models import UasTelemetry
 from auvsi_suas.models import Waypoint
+from auvsi_suas.models.violation_monitor import empty_violations
 from auvsi_suas.patches.simplekml_patch import Kml
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from django.utils import timezone
 
 # [waypoints, uas_logs, satisfied_list]
 TESTDATA_MISSIONCONFIG_EVALWAYPOINTS = (
@@ -122,11 +131,58 @@ class TestMissionConfigModel(TestCase):
         wpts_satisfied = config.satisfied_waypoints(uas_logs)
         self.assertEqual(wpts_satisfied, exp_satisfied)
 
+        # Closest approach is the nearest log to each waypoint
+        wpt_evals = config.evaluate_waypoints(uas_logs)
+        self.assertEqual([e['satisfied'] for e in wpt_evals], exp_satisfied)
+        self.assertAlmostEqual(wpt_evals[0]['closest_distance'], 40)
+        self.assertEqual(wpt_evals[0]['closest_time'], uas_logs[0].timestamp)
+        self.assertAlmostEqual(wpt_evals[2]['closest_distance'], 40)
+        self.assertEqual(wpt_evals[2]['closest_time'], uas_logs[2].timestamp)
+
+        # Chunking the logs gives the same results
+        with self.settings(SATISFIED_WAYPOINT_EVAL_CHUNK_LOGS=2):
+            self.assertEqual(config.evaluate_waypoints(uas_logs), wpt_evals)
+
+        # No logs satisfies no waypoints
+        for wpt_eval in config.evaluate_waypoints([]):
+            self.assertEqual(wpt_eval, {'satisfied': False,
+                                        'closest_distance': None,
+                                        'closest_time': None})
+
 
 class TestMissionConfigModelSampleMission(TestCase):
 
     fixtures = ['testdata/sample_mission.json']
 
+    def test_evaluate_teams_processes(self):
+        """Scoring in a process pool gives the same results in order."""
+        config = MissionConfig.objects.get()
+
+        serial = config.evaluate_teams(processes=1)
+        parallel = config.evaluate_teams(processes=2)
+
+        self.assertEqual(serial.keys(), parallel.keys())
+        self.assertEqual([user.pk for user in serial.keys()],
+                         sorted(user.pk for user in serial.keys()))
+        for user in serial:
+            self.assertGreaterEqual(parallel[user].pop('evaluation_time'), 0)
+            serial[user].pop('evaluation_time')
+            self.assertEqual(serial[user], parallel[user])
+
+    def test_team_evaluations_chunks(self):
+        """Scoring teams in chunks gives the same results in order."""
+        config = MissionConfig.objects.get()
+
+        whole = config.evaluate_teams()
+        with self.settings(EVALUATE_TEAMS_CHUNK_TEAMS=1):
+            chunked = list(config.team_evaluations())
+
+        self.assertEqual(whole.keys(), [user for (user, _) in chunked])
+        for (user, eval_data) in chunked:
+            eval_data.pop('evaluation_time')
+            whole[user].pop('evaluation_time')
+            self.assertEqual(whole[user], eval_data)
+
     def test_evaluate_teams(self):
         """Tests the evaluation of teams method."""
         user0 = User.objects.get(username='user0')
@@ -144,6 +200,12 @@ class TestMissionConfigModelSampleMission(TestCase):
             self.assertIn(1, val['waypoints_satisfied'])
             self.assertIn(2, val['waypoints_satisfied'])
 
+            self.assertIn('waypoints_closest_approach', val)
+            for wpt_id in [1, 2]:
+                closest = val['waypoints_closest_approach'][wpt_id]
+                self.assertIn('distance', closest)
+                self.assertIn('timestamp', closest)
+
             self.assertIn('out_of_bounds_time', val)
 
             self.assertIn('interop_times', val)
@@ -165,7 +227,10 @@ class TestMissionConfigModelSampleMission(TestCase):
         self.assertEqual(True, teams[user0]['waypoints_satisfied'][1])
         self.assertEqual(True, teams[user0]['waypoints_satisfied'][2])
 
-        self.assertAlmostEqual(0.6, teams[user0]['out_of_bounds_time'])
+        self.assertAlmostEqual(0.6,
+                               teams[user0]['out_of_bounds_time'],
+                               places=3)
+        self.assertEqual(1, teams[user0]['out_of_bounds_violations'])
 
         self.assertAlmostEqual(
             0.4, teams[user0]['interop_times']['server_info']['max'])
@@ -192,7 +257,10 @@ class TestMissionConfigModelSampleMission(TestCase):
         self.assertEqual(True, teams[user1]['waypoints_satisfied'][1])
         self.assertEqual(True, teams[user1]['waypoints_satisfied'][2])
 
-        self.assertAlmostEqual(1.0, teams[user1]['out_of_bounds_time'])
+        self.assertAlmostEqual(1.0,
+                               teams[user1]['out_of_bounds_time'],
+                               places=3)
+        self.assertEqual(1, teams[user1]['out_of_bounds_violations'])
 
         self.assertAlmostEqual(
             0.5, teams[user1]['interop_times']['server_info']['max'])
@@ -215,6 +283,304 @@ class TestMissionConfigModelSampleMission(TestCase):
         self.assertEqual(False, teams[user1]['moving_obst_collision'][25])
         self.assertEqual(False, teams[user1]['moving_obst_collision'][26])
 
+    def assertEvaluationsEqual(self, expected, actual):
+        """Asserts team evaluations are equal, but for float rounding."""
+        self.assertEqual(expected.keys(), actual.keys())
+        for user in expected:
+            expected_data = dict(expected[user])
+            actual_data = dict(actual[user])
+            for data in [expected_data, actual_data]:
+                data.pop('evaluation_time')
+            self.assertAlmostEqual(expected_data.pop('out_of_bounds_time'),
+                                   actual_data.pop('out_of_bounds_time'))
+            self.assertEqual(expected_data, actual_data)
+
+    def evaluate_teams_from_scratch(self, config):
+        """Evaluates the teams without checkpoints."""
+        TeamFlightCheckpoint.objects.all().delete()
+        return config.evaluate_teams()
+
+    def saved_checkpoint(self, config, user, flight):
+        """Gets the saved checkpoint of a flight, or None."""
+        rows = TeamFlightCheckpoint.objects.filter(mission=config,
+                                                   user=user,
+                                                   flight_start=flight.start)
+        if not rows:
+            return None
+        return rows[0].checkpoint
+
+    def create_telemetry(self, user, timestamp, latitude, altitude_msl):
+        return UasTelemetry.objects.create(user=user,
+                                           timestamp=timestamp,
+                                           latitude=latitude,
+                                           longitude=-76,
+                                           altitude_msl=altitude_msl,
+                                           uas_heading=0)
+
+    def test_evaluate_teams_checkpoints(self):
+        """Evaluating from checkpoints agrees with evaluating from scratch."""
+        cache.clear()
+        config = MissionConfig.objects.get()
+        user0 = User.objects.get(username='user0')
+        flight = TakeoffOrLandingEvent.flights(user0)[0]
+
+        teams = config.evaluate_teams()
+        last = UasTelemetry.objects.filter(user=user0).latest('timestamp')
+        self.assertEqual(last.pk, self.saved_checkpoint(
+            config, user0, flight).last_pks['uas_telem'])
+        self.assertEvaluationsEqual(teams, config.evaluate_teams())
+
+        # New telemetry is folded in, deduped against the last folded in.
+        delta = datetime.timedelta(seconds=0.05)
+        logs = [
+            self.create_telemetry(user0, last.timestamp + delta, 38, 100),
+            self.create_telemetry(user0, last.timestamp + 2 * delta, 38, 50),
+            self.create_telemetry(user0, last.timestamp + 3 * delta, 38.01,
+                                  50),
+        ]
+        teams = config.evaluate_teams()
+        self.assertEqual(logs[-1].pk, self.saved_checkpoint(
+            config, user0, flight).last_pks['uas_telem'])
+        self.assertEvaluationsEqual(self.evaluate_teams_from_scratch(config),
+                                    teams)
+
+        # Telemetry older than that folded in restarts the flight.
+        config.evaluate_teams()
+        self.create_telemetry(user0, last.timestamp - delta, 38.01, 50)
+        teams = config.evaluate_teams()
+        self.assertEvaluationsEqual(self.evaluate_teams_from_scratch(config),
+                                    teams)
+
+        # Changed telemetry invalidates the checkpoints.
+        config.evaluate_teams()
+        logs[-1].latitude = 38
+        logs[-1].save()
+        self.assertIsNone(self.saved_checkpoint(config, user0, flight))
+        teams = config.evaluate_teams()
+        self.assertEvaluationsEqual(self.evaluate_teams_from_scratch(config),
+                                    teams)
+
+    def test_evaluate_teams_checkpoints_durable(self):
+        """Checkpoints outlast the cache and changes to the team."""
+        config = MissionConfig.objects.get()
+        user0 = User.objects.get(username='user0')
+        flight = TakeoffOrLandingEvent.flights(user0)[0]
+        config.evaluate_teams()
+
+        cache.clear()
+        user0.save()
+        self.assertIsNotNone(self.saved_checkpoint(config, user0, flight))
+
+    def test_evaluate_teams_checkpoints_version(self):
+        """Checkpoints saved with another version are rebuilt."""
+        config = MissionConfig.objects.get()
+        user0 = User.objects.get(username='user0')
+        flight = TakeoffOrLandingEvent.flights(user0)[0]
+        teams = config.evaluate_teams()
+
+        TeamFlightCheckpoint.objects.update(version=0,
+                                            pickled_checkpoint=b'not a pickle')
+        self.assertIsNone(self.saved_checkpoint(config, user0, flight))
+        self.assertEvaluationsEqual(teams, config.evaluate_teams())
+        self.assertIsNotNone(self.saved_checkpoint(config, user0, flight))
+
+    def test_evaluate_teams_checkpoints_settle(self):
+        """Logs are folded in once settled, so late commits aren't lost."""
+        config = MissionConfig.objects.get()
+        user0 = User.objects.get(username='user0')
+        now = timezone.now()
+        TakeoffOrLandingEvent.objects.create(
+            user=user0, timestamp=now - datetime.timedelta(seconds=60),
+            uas_in_air=True)
+        flight = TakeoffOrLandingEvent.flights(user0)[-1]
+        second = datetime.timedelta(seconds=1)
+
+        settled = self.create_telemetry(user0, now - 30 * second, 38, 100)
+        # Leaves an ID free for a log committed late.
+        newer = UasTelemetry.objects.create(pk=settled.pk + 2,
+                                            user=user0,
+                                            timestamp=now - second,
+                                            latitude=38.01,
+                                            longitude=-76,
+                                            altitude_msl=100,
+                                            uas_heading=0)
+        teams = config.evaluate_teams()
+        self.assertEqual(settled.pk, self.saved_checkpoint(
+            config, user0, flight).last_pks['uas_telem'])
+        self.assertEvaluationsEqual(self.evaluate_teams_from_scratch(config),
+                                    teams)
+
+        # A log with a lower ID than one already read, committed after it,
+        # is still found.
+        UasTelemetry.objects.create(pk=newer.pk - 1,
+                                    user=user0,
+                                    timestamp=now - 2 * second,
+                                    latitude=38.02,
+                                    longitude=-76,
+                                    altitude_msl=100,
+                                    uas_heading=0)
+        teams = config.evaluate_teams()
+        self.assertEvaluationsEqual(self.evaluate_teams_from_scratch(config),
+                                    teams)
+
+    def test_evaluate_teams_checkpoints_geometry(self):
+        """Checkpoints are invalidated when the mission geometry changes."""
+        cache.clear()
+        config = MissionConfig.objects.get()
+        user0 = User.objects.get(username='user0')
+        self.assertTrue(
+            config.evaluate_teams()[user0]['stationary_obst_collision'][25])
+
+        position = StationaryObstacle.objects.get(pk=25).gps_position
+        position.latitude = 39
+        position.save()
+        self.assertFalse(
+            config.evaluate_teams()[user0]['stationary_obst_collision'][25])
+
+    def test_evaluate_teams_checkpoints_positions(self):
+        """Checkpoints are only invalidated by mission waypoint positions."""
+        cache.clear()
+        config = MissionConfig.objects.get()
+        user0 = User.objects.get(username='user0')
+        flight = TakeoffOrLandingEvent.flights(user0)[0]
+        config.evaluate_teams()
+
+        # Uploading and moving a target saves its position.
+        location = GpsPosition(latitude=38, longitude=-76)
+        location.save()
+        Target.objects.create(user=user0, target_type=TargetType.standard,
+                              location=location)
+        location.latitude = 39
+        location.save()
+        self.assertIsNotNone(self.saved_checkpoint(config, user0, flight))
+
+        gpos = config.mission_waypoints.all()[0].position.gps_position
+        gpos.latitude += 0.01
+        gpos.save()
+        self.assertIsNone(self.saved_checkpoint(config, user0, flight))
+        teams = config.evaluate_teams()
+        self.assertEvaluationsEqual(self.evaluate_teams_from_scratch(config),
+                                    teams)
+
+    def test_monitor_telemetry(self):
+        """Monitoring uploaded telemetry agrees with the evaluation."""
+        cache.clear()
+        config = MissionConfig.objects.get()
+        teams = config.evaluate_teams()
+
+        alerts = []
+        for log in UasTelemetry.objects.order_by('timestamp'):
+            alerts += config.monitor_telemetry([log])
+        states = config.violations(teams.keys())
+
+        for (user, eval_data) in teams.iteritems():
+            state = states[user.pk]
+            self.assertAlmostEqual(eval_data['out_of_bounds_time'],
+                                   state['out_of_bounds_time'])
+            self.assertEqual(eval_data['out_of_bounds_violations'],
+                             state['out_of_bounds_violations'])
+            for violation in ['stationary_obst_collision',
+                              'moving_obst_collision']:
+                self.assertEqual(
+                    sorted(pk for (pk, collision) in eval_data[violation]
+                           .items() if collision), sorted(state[violation]))
+
+        # Each violation was alerted once.
+        user0 = User.objects.get(username='user0')
+        user0_alerts = [alert for (log, alert) in alerts
+                        if log.user_id == user0.pk]
+        self.assertItemsEqual([
+            {'violation': 'out_of_bounds', 'id': None},
+            {'violation': 'stationary_obst_collision', 'id': 25},
+            {'violation': 'moving_obst_collision', 'id': 25},
+        ], user0_alerts)
+
+    def test_violations_reset(self):
+        """Violations are reset when the mission geometry changes."""
+        cache.clear()
+        config = MissionConfig.objects.get()
+        user0 = User.objects.get(username='user0')
+
+        config.monitor_telemetry(list(UasTelemetry.objects.filter(
+            user=user0).order_by('timestamp')))
+        self.assertTrue(
+            config.violations([user0])[user0.pk]['stationary_obst_collision'])
+
+        obst = config.stationary_obstacles.get(pk=25)
+        obst.cylinder_radius = 1
+        obst.save()
+        self.assertEqual(empty_violations(),
+                         config.violations([user0])[user0.pk])
+
+    def test_violations_kept_by_other_positions(self):
+        """Violations are only reset by changes to obstacle positions."""
+        cache.clear()
+        config = MissionConfig.objects.get()
+        user0 = User.objects.get(username='user0')
+
+        config.monitor_telemetry(list(UasTelemetry.objects.filter(
+            user=user0).order_by('timestamp')))
+        expected = config.violations([user0])[user0.pk]
+        self.assertTrue(expected['stationary_obst_collision'])
+
+        # Uploading and moving a target saves its position.
+        location = GpsPosition(latitude=38, longitude=-76)
+        location.save()
+        target = Target(user=user0, target_type=TargetType.standard,
+                        location=location)
+        target.save()
+        location.latitude = 39
+        location.save()
+        self.assertEqual(1, TeamViolations.objects.count())
+        self.assertEqual(expected, config.violations([user0])[user0.pk])
+
+        obst = config.stationary_obstacles.get(pk=25)
+        obst.gps_position.latitude += 1
+        obst.gps_position.save()
+        self.assertEqual(0, TeamViolations.objects.count())
+
+    def test_violations_durable(self):
+        """Violations outlast the cache and changes to the team."""
+        cache.clear()
+        config = MissionConfig.objects.get()
+        user0 = User.objects.get(username='user0')
+        logs = list(UasTelemetry.objects.filter(user=user0).order_by(
+            'timestamp'))
+
+        config.monitor_telemetry(logs)
+        expected = config.violations([user0])[user0.pk]
+
+        cache.clear()
+        user0.save()
+        self.assertEqual(expected, config.violations([user0])[user0.pk])
+
+        # Monitoring in parts, with the cache cleared between them, gives
+        # the same state.
+        TeamViolations.objects.all().delete()
+        middle = len(logs) // 2
+        config.monitor_telemetry(logs[:middle])
+        cache.clear()
+        config.monitor_telemetry(logs[middle:])
+        self.assertEqual(expected, config.violations([user0])[user0.pk])
+
+    def test_violations_version(self):
+        """Violations stored with another version are started over."""
+        cache.clear()
+        config = MissionConfig.objects.get()
+        user0 = User.objects.get(username='user0')
+        logs = list(UasTelemetry.objects.filter(user=user0).order_by(
+            'timestamp'))
+
+        config.monitor_telemetry(logs)
+        expected = config.violations([user0])[user0.pk]
+        TeamViolations.objects.update(version=0,
+                                      pickled_state=b'not a pickle')
+        self.assertEqual(empty_violations(),
+                         config.violations([user0])[user0.pk])
+
+        config.monitor_telemetry(logs)
+        self.assertEqual(expected, config.violations([user0])[user0.pk])
+
     def test_json(self):
         """Conversion to dict for JSON."""
         config = MissionConfig.objects.get()
@@ -1,16 +1,21 @@
 """Moving obstacle model."""
 
 import numpy as np
+from aerial_position import AerialPosition
 from auvsi_suas.models import distance
 from auvsi_suas.models import units
 from auvsi_suas.patches.simplekml_patch import AltitudeMode
 from auvsi_suas.patches.simplekml_patch import Color
 from auvsi_suas.patches.simplekml_patch import Types
+from cached_artifact import CachedArtifact
 from datetime import timedelta
+from epoch import seconds_since_epoch
+from gps_position import GpsPosition
+from moving_obstacle_path import MovingObstaclePath
 from waypoint import Waypoint
 from django.db import models
 from django.utils import timezone
-from scipy.interpolate import splrep, splev
+from scipy.interpolate import splrep
 
 
 class MovingObstacle(models.Model):
@@ -74,14 +79,22 @@ class MovingObstacle(models.Model):
         """
         num_waypoints = len(waypoints)
         travel_times = np.zeros(num_waypoints + 1)
-        for waypoint_id in range(1, num_waypoints + 1):
-            # Current intra waypoint travel time
-            id_tm1 = (waypoint_id - 1) % num_waypoints
-            id_t = waypoint_id % num_waypoints
-            cur_travel_time = self.get_waypoint_travel_time(
-                waypoints, id_tm1, id_t)
-            travel_times[waypoint_id] = cur_travel_time
+        if num_waypoints < 2 or self.speed_avg <= 0:
+            travel_times[1:] = np.nan  # Travel time undefined
+            return travel_times
+
+        # Distance from each waypoint to the next, wrapping to the first
+        positions = np.array([(wpt.position.gps_position.latitude,
+                               wpt.position.gps_position.longitude,
+                               wpt.position.altitude_msl)
+                              for wpt in waypoints])
+        next_positions = np.roll(positions, -1, axis=0)
+        waypoint_dists = distance.distance_to_array(
+            positions[:, 0], positions[:, 1], positions[:, 2],
+            next_positions[:, 0], next_positions[:, 1], next_positions[:, 2])
 
+        speed_avg_fps = units.knots_to_feet_per_second(self.speed_avg)
+        travel_times[1:] = waypoint_dists / speed_avg_fps
         return travel_times
 
     def get_waypoint_times(self, waypoint_travel_times):
@@ -140,19 +153,13 @@ class MovingObstacle(models.Model):
 
         return (total_travel_time, spline_reps)
 
-    def get_position(self, cur_time=None):
-        """Gets the current position for the obstacle.
+    def get_waypoints(self):
+        """Gets the waypoints of the obstacle path.
 
-        Args:
-          cur_time: The current time as datetime with time zone.
         Returns:
-          Returns a tuple (latitude, longitude, altitude_msl) for the obstacle
-          at the given time.
+            A list of the obstacle's waypoints sorted by order, with
+            consecutive duplicates removed.
         """
-        if cur_time is None:
-            cur_time = timezone.now()
-
-        # Get waypoints
         if hasattr(self, 'preprocessed_waypoints'):
             waypoints = self.preprocessed_waypoints
         else:
@@ -163,40 +170,78 @@ class MovingObstacle(models.Model):
                 if i == 0 or all_wpts[i].distance_to(all_wpts[i - 1]) != 0
             ]
             self.preprocessed_waypoints = waypoints
+        return waypoints
+
+    def get_path_spline_curve(self):
+        """Gets the spline curve of the obstacle's waypoints.
+
+        Returns:
+            The get_spline_curve() tuple for the obstacle's waypoints, which is
+            kept on the object.
+        """
+        if not hasattr(self, 'preprocessed_spline_curve'):
+            self.preprocessed_spline_curve = self.get_spline_curve(
+                self.get_waypoints())
+        return self.preprocessed_spline_curve
 
+    def get_fixed_position(self):
+        """Gets the position of an obstacle which doesn't move.
+
+        Returns:
+            A list [latitude, longitude, altitude_msl] if the obstacle has
+            fewer than two waypoints or no speed, otherwise None.
+        """
         # Waypoint counts of 0 or 1 can skip calc, so can no speed
+        waypoints = self.get_waypoints()
         num_waypoints = len(waypoints)
         if num_waypoints == 0:
-            return (0, 0, 0)  # Undefined position
+            return [0, 0, 0]  # Undefined position
         elif num_waypoints == 1 or self.speed_avg <= 0:
             wpt = waypoints[0]
-            return (wpt.position.gps_position.latitude,
+            return [wpt.position.gps_position.latitude,
                     wpt.position.gps_position.longitude,
-                    wpt.position.altitude_msl)
+                    wpt.position.altitude_msl]
+        return None
 
-        # Get spline representation
-        if hasattr(self, 'preprocessed_spline_curve'):
-            spline_curve = self.preprocessed_spline_curve
-        else:
-            spline_curve = self.get_spline_curve(waypoints)
-            self.preprocessed_spline_curve = spline_curve
-        (total_travel_time, spline_reps) = spline_curve
-
-        # Sample spline at current time
-        epoch_time = timezone.now().replace(year=1970,
-                                            month=1,
-                                            day=1,
-                                            hour=0,
-                                            minute=0,
-                                            second=0,
-                                            microsecond=0)
-        cur_time_sec = (cur_time - epoch_time).total_seconds()
-        cur_path_time = np.mod(cur_time_sec, total_travel_time)
-        latitude = float(splev(cur_path_time, spline_reps[0]))
-        longitude = float(splev(cur_path_time, spline_reps[1]))
-        altitude_msl = float(splev(cur_path_time, spline_reps[2]))
-
-        return (latitude, longitude, altitude_msl)
+    def path(self):
+        """Gets the obstacle's path for evaluation without the model.
+
+        The path is cached until the obstacle or its waypoints are changed.
+
+        Returns:
+            A MovingObstaclePath of the obstacle's spline curve.
+        """
+        return path_cache.get_or_compute(self.compile_path, self.pk)
+
+    def compile_path(self):
+        """Compiles the obstacle's path for evaluation without the model.
+
+        Returns:
+            A MovingObstaclePath of the obstacle's spline curve.
+        """
+        fixed_position = self.get_fixed_position()
+        if fixed_position is not None:
+            return MovingObstaclePath(self.sphere_radius,
+                                      fixed_position=fixed_position)
+        (total_travel_time, spline_reps) = self.get_path_spline_curve()
+        return MovingObstaclePath(self.sphere_radius,
+                                  total_travel_time=total_travel_time,
+                                  spline_reps=spline_reps)
+
+    def get_position(self, cur_time=None):
+        """Gets the current position for the obstacle.
+
+        Args:
+          cur_time: The current time as datetime with time zone.
+        Returns:
+          Returns a tuple (latitude, longitude, altitude_msl) for the obstacle
+          at the given time.
+        """
+        if cur_time is None:
+            cur_time = timezone.now()
+
+        position = self.path().positions(seconds_since_epoch([cur_time]))[0]
+        return tuple(float(value) for value in position)
 
     def contains_pos(self, obst_lat, obst_lon, obst_alt, aerial_pos):
         """Whether the pos is contained within the obstacle's pos.
@@ -224,22 +269,47 @@ class MovingObstacle(models.Model):
             Whether a UAS telemetry log reported indicates a collision with the
             obstacle.
         """
-        for cur_log in uas_telemetry_logs:
-            (lat, lon, alt) = self.get_position(cur_log.timestamp)
-            if self.contains_pos(lat, lon, alt, cur_log.uas_position):
-                return True
-        return False
+        times = seconds_since_epoch([log.timestamp
+                                     for log in uas_telemetry_logs])
+        positions = np.array([(log.latitude, log.longitude, log.altitude_msl)
+                              for log in uas_telemetry_logs],
+                             dtype=np.float64).reshape(-1, 3)
+        (collision, _, _) = self.evaluate_collision_with_flight(times,
+                                                                positions)
+        return collision
+
+    def evaluate_collision_with_flight(self, times, positions):
+        """Evaluates a whole flight for collision with the obstacle.
+
+        Args:
+            times: A numpy array of the flight's times as seconds since the
+                epoch.
+            positions: A numpy array with a (latitude, longitude, altitude_msl)
+                row for the UAS at each of the times.
+        Returns:
+            A tuple (collision, min_separation, min_time). collision is whether
+            any position is inside the obstacle. min_separation is the least
+            distance in feet from the UAS to the obstacle's surface, negative
+            when inside it, and min_time is the time at which it occurred.
+            Both are None if there are no positions.
+        """
+        if len(times) == 0:
+            return (False, None, None)
+
+        obst_positions = self.path().positions(times)
+        dists = distance.distance_to_array(
+            obst_positions[:, 0], obst_positions[:, 1], obst_positions[:, 2],
+            positions[:, 0], positions[:, 1], positions[:, 2])
+
+        min_id = np.argmin(dists)
+        min_separation = float(dists[min_id]) - self.sphere_radius
+        return (min_separation <= 0, min_separation, float(times[min_id]))
 
     def json(self, time=None):
         """Obtain a JSON style representation of object."""
-        (latitude, longitude, altitude_msl) = self.get_position(cur_time=time)
-        data = {
-            'latitude': latitude,
-            'longitude': longitude,
-            'altitude_msl': altitude_msl,
-            'sphere_radius': self.sphere_radius
-        }
-        return data
+        if time is None:
+            time = timezone.now()
+        return self.path().json(seconds_since_epoch([time]))[0]
 
     def kml(self, path, kml, kml_doc):
         """
@@ -261,12 +331,13 @@ class MovingObstacle(models.Model):
 
         coords = []
         when = []
-        ranges = []
 
         if len(path) < 2:
             return
 
         dt = timedelta(milliseconds=kml_output_resolution)
+        uavs = []
+        positions = []
         for pos, uav, time in self.times(path, dt):
             # Spatial Coordinates (longitude, latitude, altitude)
             coord = (pos[1], pos[0], pos[2])
@@ -275,9 +346,15 @@ class MovingObstacle(models.Model):
             # Time Elements
             when.append(time.strftime(kml_datetime_format))
 
-            # Distance Elements
-            uas_range = distance.distance_to(*uav + pos)
-            ranges.append(uas_range)
+            uavs.append(uav)
+            positions.append(pos)
+
+        # Distance Elements
+        uavs = np.array(uavs).reshape(-1, 3)
+        positions = np.array(positions).reshape(-1, 3)
+        ranges = distance.distance_to_array(
+            uavs[:, 0], uavs[:, 1], uavs[:, 2], positions[:, 0],
+            positions[:, 1], positions[:, 2]).tolist()
 
         # Create a new track in the folder
         trk = kml.newgxtrack(name='Obstacle Path {}'.format(self.id))
@@ -315,18 +392,22 @@ class MovingObstacle(models.Model):
         """
         curr = uav_path[0].timestamp
         end = uav_path[len(uav_path) - 1].timestamp
-        path_index = 0  # Index of last known position
+        times = []
         while curr < end:
+            times.append(curr)
+            curr += delta
+        positions = self.path().positions(seconds_since_epoch(times))
+
+        path_index = 0  # Index of last known position
+        for curr, pos in zip(times, positions):
             # Advance the path_index forward in time
             while uav_path[path_index + 1].timestamp <= curr:
                 path_index += 1
 
-            uav = (
-                uav_path[path_index].uas_position.gps_position.latitude,
-                uav_path[path_index].uas_position.gps_position.longitude,
-                uav_path[path_index].uas_position.altitude_msl, )
-            yield self.get_position(curr), uav, curr
-            curr += delta
+            uav = (uav_path[path_index].latitude,
+                   uav_path[path_index].longitude,
+                   uav_path[path_index].altitude_msl, )
+            yield tuple(float(value) for value in pos), uav, curr
 
     @classmethod
     def live_kml(cls, kml, timespan, resolution=100):
@@ -345,9 +426,11 @@ class MovingObstacle(models.Model):
             curr = timezone.now()
             last = curr - span
             time = curr
+            times = []
             while time >= last:
-                yield obstacle.get_position(time)
+                times.append(time)
                 time -= dt
+            return obstacle.path().positions(seconds_since_epoch(times))
 
         for obstacle in MovingObstacle.objects.all():
             dt = timedelta(milliseconds=resolution)
@@ -363,3 +446,17 @@ class MovingObstacle(models.Model):
             linestring.style.linestyle.color = Color.red
             linestring.style.polystyle.color = Color.changealphaint(100,
                                                                     Color.red)
+
+
+# The compiled paths of moving obstacles, by obstacle. Only changes to the
+# positions of obstacle waypoints invalidate it, as positions are saved for
+# other uses.
+path_cache = CachedArtifact('MovingObstacle/path', [
+    MovingObstacle, MovingObstacle.waypoints.through,
+    (Waypoint, lambda wpt: MovingObstacle.objects.filter(
+        waypoints=wpt).exists()),
+    (AerialPosition, lambda apos: MovingObstacle.objects.filter(
+        waypoints__position=apos).exists()),
+    (GpsPosition, lambda gpos: MovingObstacle.objects.filter(
+        waypoints__position__gps_position=gpos).exists()),
+])
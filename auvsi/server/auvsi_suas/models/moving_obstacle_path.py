@@ -0,0 +1,76 @@
+"""Compiled moving obstacle path."""
+
+import numpy as np
+from scipy.interpolate import splev
+
+
+class MovingObstaclePath(object):
+    """The path of a MovingObstacle, ready for evaluation.
+
+    Holds the spline knots and coefficients of the path as compact numpy
+    arrays, so positions can be found without the model or database, and the
+    path can be cached as plain data.
+    """
+
+    def __init__(self,
+                 sphere_radius,
+                 fixed_position=None,
+                 total_travel_time=None,
+                 spline_reps=None):
+        """Compiles the path.
+
+        Args:
+            sphere_radius: The radius of the obstacle's sphere in feet.
+            fixed_position: A (latitude, longitude, altitude_msl) position if
+                the obstacle doesn't move, otherwise None.
+            total_travel_time: The time to complete a circuit of the path, if
+                the obstacle moves.
+            spline_reps: The list of latitude, longitude and altitude tck
+                values for the path, if the obstacle moves.
+        """
+        self.sphere_radius = sphere_radius
+        self.fixed_position = None
+        if fixed_position is not None:
+            self.fixed_position = np.array(fixed_position, dtype=np.float64)
+        self.total_travel_time = total_travel_time
+        self.knots = None
+        self.coefficients = None
+        self.degree = None
+        if spline_reps is not None:
+            self.knots = np.vstack([t for (t, _, _) in spline_reps])
+            self.coefficients = np.vstack([c for (_, c, _) in spline_reps])
+            self.degree = spline_reps[0][2]
+
+    def positions(self, times):
+        """Gets the positions of the obstacle at many times.
+
+        Args:
+            times: A numpy array of times as seconds since the path epoch.
+        Returns:
+            A numpy array with a (latitude, longitude, altitude_msl) row for
+            each of the given times.
+        """
+        times = np.asarray(times, dtype=np.float64)
+        if self.fixed_position is not None:
+            return np.tile(self.fixed_position, (len(times), 1))
+
+        path_times = np.mod(times, self.total_travel_time)
+        return np.column_stack([splev(path_times, (knots, coefficients,
+                                                   self.degree))
+                                for (knots, coefficients) in zip(
+                                    self.knots, self.coefficients)])
+
+    def json(self, times):
+        """Obtain JSON style representations of the obstacle at many times.
+
+        Args:
+            times: A numpy array of times as seconds since the path epoch.
+        Returns:
+            A list with a MovingObstacle.json() style dict for each time.
+        """
+        return [{
+            'latitude': float(latitude),
+            'longitude': float(longitude),
+            'altitude_msl': float(altitude_msl),
+            'sphere_radius': self.sphere_radius
+        } for (latitude, longitude, altitude_msl) in self.positions(times)]
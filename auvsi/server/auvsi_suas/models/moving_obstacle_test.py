@@ -1,6 +1,8 @@
 """Tests for the moving_obstacle module."""
 
 import datetime
+import numpy as np
+import pickle
 import time
 from auvsi_suas.models import AerialPosition
 from auvsi_suas.models import GpsPosition
@@ -8,11 +10,13 @@ from auvsi_suas.models import MovingObstacle
 from auvsi_suas.models import UasTelemetry
 from auvsi_suas.models import units
 from auvsi_suas.models import Waypoint
+from auvsi_suas.models.epoch import seconds_since_epoch
 from auvsi_suas.patches.simplekml_patch import Kml
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.test import TestCase
 from django.utils import timezone
+from scipy.interpolate import splev
 
 TESTDATA_COMPETITION_DIST = [
     (-76.428709, 38.145306, -76.426375, 38.146146, 0.22446),
@@ -260,6 +264,77 @@ class TestMovingObstacle(TestCase):
 
         self.assertNotEqual(original, new)
 
+    def test_path_no_waypoints(self):
+        """Tests path positions on no waypoints."""
+        positions = self.obst_no_wpt.path().positions(np.array([0, 1, 2]))
+        np.testing.assert_array_equal(positions, np.zeros((3, 3)))
+
+    def test_path_one_waypoint(self):
+        """Tests path positions on single waypoints."""
+        positions = self.obst_single_wpt.path().positions(np.array([0, 1]))
+        expected = [self.single_wpt_lat, self.single_wpt_lon,
+                    self.single_wpt_alt]
+        np.testing.assert_array_equal(positions, [expected, expected])
+
+    def test_path_matches_spline(self):
+        """Path positions are on the spline curve, wrapping each circuit."""
+        for obstacle in self.obstacles:
+            (total_travel_time, spline_reps) = obstacle.get_spline_curve(
+                obstacle.get_waypoints())
+            times = np.linspace(-total_travel_time, 2 * total_travel_time,
+                                1001)
+            positions = obstacle.path().positions(times)
+            self.assertEqual(positions.shape, (1001, 3))
+
+            for i in range(3):
+                expected = splev(np.mod(times, total_travel_time),
+                                 spline_reps[i])
+                np.testing.assert_allclose(positions[:, i], expected)
+
+    def test_path_matches_get_position(self):
+        """Path positions are the same as individual positions and JSON."""
+        obstacle = self.obstacles[0]
+        now = timezone.now()
+        times = [now + datetime.timedelta(seconds=s) for s in range(10)]
+
+        positions = obstacle.path().positions(seconds_since_epoch(times))
+        for t, pos in zip(times, positions):
+            self.assertEqual(obstacle.get_position(t), tuple(pos))
+            data = obstacle.json(t)
+            self.assertEqual(tuple(pos), (data['latitude'], data[
+                'longitude'], data['altitude_msl']))
+
+    def test_path(self):
+        """Compiled paths can be pickled."""
+        times = np.linspace(0, 1000, 101)
+        for obstacle in self.obstacles + [self.obst_single_wpt,
+                                          self.obst_no_wpt]:
+            path = pickle.loads(pickle.dumps(obstacle.path(), -1))
+            np.testing.assert_array_equal(path.positions(times),
+                                          obstacle.path().positions(times))
+
+            data = path.json(times[:1])[0]
+            self.assertEqual(obstacle.sphere_radius, data['sphere_radius'])
+            self.assertEqual(path.positions(times[:1])[0][2],
+                             data['altitude_msl'])
+
+    def test_path_invalidated_by_position(self):
+        """Editing a waypoint position rebuilds the path."""
+        obstacle = MovingObstacle.objects.get(pk=self.obst_single_wpt.pk)
+        obstacle.path()
+
+        # Other positions don't invalidate the path.
+        GpsPosition.objects.create(latitude=1, longitude=1).save()
+        with self.assertNumQueries(0):
+            obstacle.path()
+
+        position = obstacle.waypoints.get().position
+        position.altitude_msl += 100
+        position.save()
+        obstacle = MovingObstacle.objects.get(pk=obstacle.pk)
+        self.assertEqual(self.single_wpt_alt + 100,
+                         obstacle.get_position()[2])
+
     def test_get_position_waypoints_plot(self):
         """Tests position calculation by saving plots of calculation.
 
@@ -431,6 +506,47 @@ class TestMovingObstacle(TestCase):
                 self.assertEqual(obst.evaluate_collision_with_uas([log]),
                                  inside)
 
+    def test_evaluate_collision_with_flight(self):
+        """Tests the collision evaluation over a flight's arrays."""
+        (obst_rad, obst_speed, obst_pos, log_details) = \
+            TESTDATA_MOVOBST_EVALCOLLISION
+        obst = MovingObstacle()
+        obst.speed_avg = obst_speed
+        obst.sphere_radius = obst_rad
+        obst.save()
+        for pos_id, (lat, lon, alt) in enumerate(obst_pos):
+            gpos = GpsPosition(latitude=lat, longitude=lon)
+            gpos.save()
+            apos = AerialPosition(gps_position=gpos, altitude_msl=alt)
+            apos.save()
+            wpt = Waypoint(order=pos_id, position=apos)
+            wpt.save()
+            obst.waypoints.add(wpt)
+        obst.save()
+
+        # Flight which passes 50ft above the obstacle at the second time.
+        (lat, lon, alt) = obst_pos[1]
+        times = np.array([0.0, log_details[1][0], 500.0])
+        positions = np.array([(38.002, -76.002, 100), (lat, lon, alt + 50),
+                              (38.002, -76.002, 100)])
+        (collision, min_separation, min_time) = \
+            obst.evaluate_collision_with_flight(times, positions)
+        self.assertTrue(collision)
+        self.assertAlmostEqual(min_separation, -50, delta=2)
+        self.assertEqual(min_time, log_details[1][0])
+
+        # Flight which passes 50ft outside of the obstacle.
+        positions[1][2] = alt + 150
+        (collision, min_separation, min_time) = \
+            obst.evaluate_collision_with_flight(times, positions)
+        self.assertFalse(collision)
+        self.assertAlmostEqual(min_separation, 50, delta=2)
+        self.assertEqual(min_time, log_details[1][0])
+
+        # Empty flight
+        self.assertEqual(obst.evaluate_collision_with_flight(
+            np.array([]), np.zeros((0, 3))), (False, None, None))
+
     def test_json(self):
         """Tests the JSON serialization method."""
         for cur_obst in self.obstacles:
@@ -1,7 +1,10 @@
 """Obstacle access log model."""
 
-from access_log import AccessLog
+from access_log import AbstractAccessLog
 
 
-class ObstacleAccessLog(AccessLog):
+class ObstacleAccessLog(AbstractAccessLog):
     """Log of access to the Obstacle objects used to evaulate teams."""
+
+    class Meta:
+        index_together = [('user', 'timestamp')]
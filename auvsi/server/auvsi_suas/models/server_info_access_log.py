@@ -1,7 +1,10 @@
 """Server information access log model."""
 
-from access_log import AccessLog
+from access_log import AbstractAccessLog
 
 
-class ServerInfoAccessLog(AccessLog):
+class ServerInfoAccessLog(AbstractAccessLog):
     """Log of access to the ServerInfo objects used to evaluate teams."""
+
+    class Meta:
+        index_together = [('user', 'timestamp')]
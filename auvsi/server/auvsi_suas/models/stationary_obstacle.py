@@ -1,8 +1,18 @@
 """Stationary obstacle model."""
 
+import numpy as np
+from auvsi_suas.models import distance
+from auvsi_suas.models import units
 from gps_position import GpsPosition
+from uas_telemetry import UasTelemetry
 from django.db import models
 
+# Feet per degree of latitude, as measured by the distance module.
+FEET_PER_DEGREE_LATITUDE = units.kilometers_to_feet(distance.haversine(0, 0, 0,
+                                                                       1))
+# Margin on the bounding box so it always contains the cylinder.
+BOUNDING_BOX_MARGIN = 1.01
+
 
 class StationaryObstacle(models.Model):
     """A stationary obstacle that teams must avoid."""
@@ -33,12 +43,48 @@ class StationaryObstacle(models.Model):
         if (aerial_alt < 0 or aerial_alt > self.cylinder_height):
             return False
         # Check lat/lon of position
-        dist_to_center = self.gps_position.distance_to(aerial_pos.gps_position)
+        dist_to_center = distance.distance_to(
+            self.gps_position.latitude, self.gps_position.longitude, 0,
+            aerial_pos.gps_position.latitude,
+            aerial_pos.gps_position.longitude, 0)
         if dist_to_center > self.cylinder_radius:
             return False
         # Both within altitude and radius bounds, inside cylinder
         return True
 
+    def contains_positions(self, latitudes, longitudes, altitudes):
+        """Whether each of the positions is contained within the obstacle.
+
+        Args:
+            latitudes: An array of the latitudes of the positions.
+            longitudes: An array of the longitudes of the positions.
+            altitudes: An array of the altitudes (MSL) of the positions.
+        Returns:
+            A numpy array of whether each position is inside the obstacle.
+        """
+        latitudes = np.asarray(latitudes, dtype=np.float64)
+        longitudes = np.asarray(longitudes, dtype=np.float64)
+        altitudes = np.asarray(altitudes, dtype=np.float64)
+        center_lat = self.gps_position.latitude
+        center_lon = self.gps_position.longitude
+
+        # Reject positions outside the altitude bounds or the bounding box
+        lat_delta = (self.cylinder_radius / FEET_PER_DEGREE_LATITUDE *
+                     BOUNDING_BOX_MARGIN)
+        lon_delta = lat_delta / max(np.cos(np.radians(center_lat)), 1e-6)
+        candidates = ((altitudes >= 0) & (altitudes <= self.cylinder_height) &
+                      (np.abs(latitudes - center_lat) <= lat_delta) &
+                      (np.abs(longitudes - center_lon) <= lon_delta))
+
+        # Check lat/lon of the remaining positions
+        candidate_ids = np.flatnonzero(candidates)
+        dists_to_center = distance.distance_to_many(
+            center_lat, center_lon, 0, latitudes[candidate_ids],
+            longitudes[candidate_ids], np.zeros(len(candidate_ids)))
+        inside = np.zeros(len(altitudes), dtype=bool)
+        inside[candidate_ids] = dists_to_center <= self.cylinder_radius
+        return inside
+
     def evaluate_collision_with_uas(self, uas_telemetry_logs):
         """Evaluates whether the Uas logs indicate a collision.
 
@@ -49,10 +95,32 @@ class StationaryObstacle(models.Model):
             Whether a UAS telemetry log reported indicates a collision with the
             obstacle.
         """
-        for cur_log in uas_telemetry_logs:
-            if self.contains_pos(cur_log.uas_position):
-                return True
-        return False
+        (times, positions) = UasTelemetry.arrays(uas_telemetry_logs)
+        return bool(self.evaluate_collision_with_flight(times, positions))
+
+    def evaluate_collision_with_flight(self, times, positions):
+        """Evaluates a whole flight for collision with the obstacle.
+
+        Args:
+            times: A numpy array of the flight's times as seconds since the
+                obstacle path epoch.
+            positions: A numpy array with a (latitude, longitude, altitude_msl)
+                row for the UAS at each of the times.
+        Returns:
+            A list of (entry, exit) tuples of float seconds, one for each run
+            of consecutive positions inside the obstacle. The interval spans
+            the first and last positions inside, not the boundary crossings
+            between positions.
+        """
+        inside = self.contains_positions(positions[:, 0], positions[:, 1],
+                                         positions[:, 2])
+
+        # Runs of inside positions start at a rise and end before a fall
+        edges = np.diff(np.concatenate(([0], inside.astype(np.int8), [0])))
+        entries = np.flatnonzero(edges == 1)
+        exits = np.flatnonzero(edges == -1) - 1
+        return [(float(times[entry]), float(times[exit]))
+                for (entry, exit) in zip(entries, exits)]
 
     def json(self):
         """Obtain a JSON style representation of object."""
@@ -1,5 +1,6 @@
 """Tests for the stationary_obstacle module."""
 
+import numpy as np
 from auvsi_suas.models import AerialPosition
 from auvsi_suas.models import GpsPosition
 from auvsi_suas.models import StationaryObstacle
@@ -75,6 +76,24 @@ class TestStationaryObstacleModel(TestCase):
                 apos = AerialPosition(gps_position=pos, altitude_msl=alt)
                 self.assertEqual(obst.contains_pos(apos), cur_contains)
 
+    def test_contains_positions(self):
+        """Tests the inside obstacle method over arrays of positions."""
+        pos = GpsPosition(latitude=TESTDATA_STATOBST_CONTAINSPOS_OBJ[0],
+                          longitude=TESTDATA_STATOBST_CONTAINSPOS_OBJ[1])
+        pos.save()
+        obst = StationaryObstacle(
+            gps_position=pos,
+            cylinder_radius=TESTDATA_STATOBST_CONTAINSPOS_OBJ[2],
+            cylinder_height=TESTDATA_STATOBST_CONTAINSPOS_OBJ[3])
+
+        positions = np.array(TESTDATA_STATOBST_CONTAINSPOS_INSIDE +
+                             TESTDATA_STATOBST_CONTAINSPOS_OUTSIDE)
+        expected = ([True] * len(TESTDATA_STATOBST_CONTAINSPOS_INSIDE) +
+                    [False] * len(TESTDATA_STATOBST_CONTAINSPOS_OUTSIDE))
+        inside = obst.contains_positions(positions[:, 0], positions[:, 1],
+                                         positions[:, 2])
+        self.assertEqual(inside.tolist(), expected)
+
     def test_evaluate_collision_with_uas(self):
         """Tests the collision with UAS method."""
         # Create testing data
@@ -118,6 +137,46 @@ class TestStationaryObstacleModel(TestCase):
                 self.assertEqual(obst.evaluate_collision_with_uas([log]),
                                  inside)
 
+    def test_evaluate_collision_with_flight(self):
+        """Tests the collision intervals over a flight's arrays."""
+        gpos = GpsPosition(latitude=38, longitude=-76)
+        gpos.save()
+        obst = StationaryObstacle(gps_position=gpos,
+                                  cylinder_radius=100,
+                                  cylinder_height=200)
+        obst.save()
+
+        # Enters twice, the second time until the end of the flight
+        times = np.array([0.0, 1.0, 2.0, 3.0, 4.0, 5.0, 6.0])
+        positions = np.array([
+            (38.01, -76, 100),
+            (38, -76, 100),
+            (38, -76, 150),
+            (38, -76, 250),
+            (38.01, -76.01, 100),
+            (38, -76.0001, 0),
+            (38, -76, 200),
+        ])  # yapf: disable
+        self.assertEqual(obst.evaluate_collision_with_flight(times, positions),
+                         [(1.0, 2.0), (5.0, 6.0)])
+
+        # Positions just inside and outside the radius, due north and east
+        deg = 100 / 364000.0  # Roughly 100ft of latitude
+        positions = np.array([
+            (38 + 0.98 * deg, -76, 100),
+            (38 + 1.02 * deg, -76, 100),
+            (38, -76 + 0.98 * deg / np.cos(np.radians(38)), 100),
+            (38, -76 + 1.02 * deg / np.cos(np.radians(38)), 100),
+        ])  # yapf: disable
+        self.assertEqual(
+            obst.contains_positions(positions[:, 0], positions[:, 1],
+                                    positions[:, 2]).tolist(),
+            [True, False, True, False])
+
+        # Empty flight
+        self.assertEqual(obst.evaluate_collision_with_flight(
+            np.array([]), np.zeros((0, 3))), [])
+
     def test_json(self):
         """Tests the JSON serialization method."""
         TEST_LAT = 100.10
@@ -1,8 +1,13 @@
 """Takeoff or landing event model."""
 
+import collections
 from access_log import AccessLog
-from time_period import TimePeriod
+from cached_artifact import CachedArtifact
+from flight_index import FlightIndex
+from django.conf import settings
 from django.db import models
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
 from django.utils import timezone
 
 
@@ -18,6 +23,65 @@ class TakeoffOrLandingEvent(AccessLog):
                        (str(self.pk), self.user.__unicode__(),
                         str(self.timestamp), str(self.uas_in_air)))
 
+    @classmethod
+    def flight_index(cls, user):
+        """Gets the FlightIndex of the given user's events.
+
+        The index is cached in a shared cache, and evicted as the user's
+        events change. With a cache per process, one process would miss the
+        events saved by the others, so the index is built from the database.
+
+        Args:
+            user: The user to get the index for.
+        Returns:
+            The user's FlightIndex.
+        """
+        if not settings.SHARED_CACHE:
+            return cls.compile_flight_index(user.pk)
+        return flight_index_cache.get_or_compute(
+            lambda: cls.compile_flight_index(user.pk), user.pk)
+
+    @classmethod
+    def flight_indexes(cls, users, cached=True):
+        """Gets the FlightIndex of each of the given users' events.
+
+        Indexes are cached as described by flight_index(). Indexes which
+        aren't cached are built with a single query.
+
+        Args:
+            users: The users to get indexes for.
+            cached: Optional. Whether cached indexes may be used. Scoring reads
+                the database, so it never depends on the cache.
+        Returns:
+            A dict from user ID to FlightIndex.
+        """
+        cached = cached and settings.SHARED_CACHE
+        user_pks = [user.pk for user in users]
+        indexes = {}
+        if cached:
+            indexes = flight_index_cache.get_many(user_pks)
+
+        missing = [pk for pk in user_pks if pk not in indexes]
+        if missing:
+            user_events = collections.defaultdict(list)
+            events = cls.objects.filter(user__in=missing).order_by(
+                'user', 'timestamp').values_list('user_id', 'timestamp',
+                                                 'uas_in_air')
+            for (user_pk, timestamp, uas_in_air) in events:
+                user_events[user_pk].append((timestamp, uas_in_air))
+            compiled = dict((pk, FlightIndex(user_events[pk]))
+                            for pk in missing)
+            if cached:
+                flight_index_cache.set_many(compiled)
+            indexes.update(compiled)
+        return indexes
+
+    @classmethod
+    def compile_flight_index(cls, user_pk):
+        """Builds the FlightIndex of a user's events from the database."""
+        events = cls.objects.filter(user=user_pk).order_by('timestamp')
+        return FlightIndex(events.values_list('timestamp', 'uas_in_air'))
+
     @classmethod
     def flights(cls, user):
         """Gets the time periods for which the given user was in flight.
@@ -29,36 +93,20 @@ class TakeoffOrLandingEvent(AccessLog):
         Returns:
             A list of TimePeriod objects corresponding to individual flights.
         """
-        # Get the access logs for the user
-        access_logs = TakeoffOrLandingEvent.by_user(user)
-
-        time_periods = []
+        return cls.flight_index(user).flights()
 
-        # If UAS landing at start, assume forgot to log takeoff, assign infinity
-        if len(access_logs) > 0 and not access_logs[0].uas_in_air:
-            time_periods.append(TimePeriod(None, access_logs[0].timestamp))
-
-        # Use transition from ground to air and air to ground for flight periods
-        takeoff_time = None
-        landing_time = None
-        uas_in_air = False
-        for log in access_logs:
-            # Check for transition from ground to air
-            if not uas_in_air and log.uas_in_air:
-                takeoff_time = log.timestamp
-                uas_in_air = log.uas_in_air
-            # Check for transition from air to ground
-            if uas_in_air and not log.uas_in_air:
-                landing_time = log.timestamp
-                uas_in_air = log.uas_in_air
-
-                time_periods.append(TimePeriod(takeoff_time, landing_time))
-
-        # If UAS in air at end, assume forgot to log landing, assign infinity
-        if uas_in_air:
-            time_periods.append(TimePeriod(access_logs.last().timestamp, None))
+    @classmethod
+    def flights_overlapping(cls, user, start, end):
+        """Gets the given user's flights which overlap a period.
 
-        return time_periods
+        Args:
+            user: The user for which to get flight periods for.
+            start: The start of the period, or None if unbounded.
+            end: The end of the period, or None if unbounded.
+        Returns:
+            A list of TimePeriod objects corresponding to individual flights.
+        """
+        return cls.flight_index(user).flights_overlapping(start, end)
 
     @classmethod
     def user_in_air(cls, user, time=None):
@@ -73,13 +121,35 @@ class TakeoffOrLandingEvent(AccessLog):
         if time is None:
             time = timezone.now()
 
-        event = cls.objects \
-            .filter(user=user.pk) \
-            .filter(timestamp__lt=time) \
-            .order_by('timestamp') \
-            .last()
+        return cls.flight_index(user).in_air(time)
+
+
+# The FlightIndex of each user's events, by user, when SHARED_CACHE is set.
+# A deleted user's events are deleted with them, evicting their index before
+# a new user may reuse the ID.
+flight_index_cache = CachedArtifact('TakeoffOrLandingEvent/flight_index', [])
+
+
+def event_saved(sender, instance, created, **kwargs):
+    """Evicts the cached FlightIndex of a created event's user.
+
+    Changed events may have moved between users, so all indexes are
+    invalidated instead.
+    """
+    if created:
+        flight_index_cache.delete(instance.user_id)
+    else:
+        flight_index_cache.invalidate()
+
+
+def event_deleted(sender, instance, **kwargs):
+    """Evicts the cached FlightIndex of a deleted event's user."""
+    flight_index_cache.delete(instance.user_id)
+
 
-        if event:
-            return event.uas_in_air
-        else:
-            return False
+post_save.connect(event_saved,
+                  sender=TakeoffOrLandingEvent,
+                  dispatch_uid='TakeoffOrLandingEvent.event_saved')
+post_delete.connect(event_deleted,
+                    sender=TakeoffOrLandingEvent,
+                    dispatch_uid='TakeoffOrLandingEvent.event_deleted')
@@ -4,6 +4,8 @@ import datetime
 from auvsi_suas.models import TakeoffOrLandingEvent
 from auvsi_suas.models import TimePeriod
 from auvsi_suas.models.access_log_test import TestAccessLogCommon
+from django.core.cache import cache
+from django.test.utils import override_settings
 from django.utils import timezone
 
 
@@ -12,6 +14,7 @@ class TestTakeoffOrLandingEventModel(TestAccessLogCommon):
 
     def setUp(self):
         super(TestTakeoffOrLandingEventModel, self).setUp()
+        cache.clear()
 
         self.ten_minutes = datetime.timedelta(minutes=10)
 
@@ -171,3 +174,71 @@ class TestTakeoffOrLandingEventModel(TestAccessLogCommon):
 
         self.assertTrue(TakeoffOrLandingEvent.user_in_air(self.user1,
                                                           time=time))
+
+    def test_flights_overlapping(self):
+        """Flights overlapping a period."""
+        self.create_event(self.year2000, True)
+        self.create_event(self.year2000 + self.ten_minutes, False)
+        self.create_event(self.year2001, True)
+        self.create_event(self.year2001 + self.ten_minutes, False)
+
+        self.assertSequenceEqual(
+            [TimePeriod(self.year2001, self.year2001 + self.ten_minutes)],
+            TakeoffOrLandingEvent.flights_overlapping(self.user1,
+                                                      self.year2001, None))
+
+    @override_settings(SHARED_CACHE=True)
+    def test_flight_index_cached(self):
+        """Lookups are cached, and changed events evict the cache."""
+        self.create_event(self.year2000, True)
+        TakeoffOrLandingEvent.flights(self.user1)
+
+        with self.assertNumQueries(0):
+            self.assertTrue(TakeoffOrLandingEvent.user_in_air(self.user1))
+            self.assertEqual(1, len(TakeoffOrLandingEvent.flights(self.user1)))
+
+        landing = TakeoffOrLandingEvent(user=self.user1, uas_in_air=False)
+        landing.save()
+        self.assertFalse(TakeoffOrLandingEvent.user_in_air(self.user1))
+
+        # Changed events are found.
+        event = self.create_event(self.year2001, False)
+        self.assertFalse(TakeoffOrLandingEvent.user_in_air(
+            self.user1, time=self.year2001 + self.ten_minutes))
+        event.uas_in_air = True
+        event.save()
+        self.assertTrue(TakeoffOrLandingEvent.user_in_air(
+            self.user1, time=self.year2001 + self.ten_minutes))
+
+        # Deleted events are forgotten.
+        landing.delete()
+        self.assertTrue(TakeoffOrLandingEvent.user_in_air(self.user1))
+
+    @override_settings(SHARED_CACHE=False)
+    def test_flight_index_uncached(self):
+        """Without a shared cache, lookups read the database."""
+        self.create_event(self.year2000, True)
+        TakeoffOrLandingEvent.flights(self.user1)
+
+        with self.assertNumQueries(1):
+            self.assertTrue(TakeoffOrLandingEvent.user_in_air(self.user1))
+        with self.assertNumQueries(1):
+            TakeoffOrLandingEvent.flight_indexes([self.user1, self.user2])
+
+    @override_settings(SHARED_CACHE=True)
+    def test_flight_indexes(self):
+        """Indexes of several users are found together."""
+        self.create_event(self.year2000, True)
+        self.create_event(self.year2000 + self.ten_minutes, False)
+
+        indexes = TakeoffOrLandingEvent.flight_indexes([self.user1,
+                                                        self.user2])
+        self.assertEqual(TakeoffOrLandingEvent.flights(self.user1),
+                         indexes[self.user1.pk].flights())
+        self.assertEqual([], indexes[self.user2.pk].flights())
+
+        with self.assertNumQueries(0):
+            TakeoffOrLandingEvent.flight_indexes([self.user1, self.user2])
+        with self.assertNumQueries(1):
+            TakeoffOrLandingEvent.flight_indexes([self.user1, self.user2],
+                                                 cached=False)
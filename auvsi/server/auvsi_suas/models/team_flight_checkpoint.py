@@ -0,0 +1,56 @@
+"""Team flight checkpoint model."""
+
+from django.conf import settings
+from django.db import models
+from django.utils.six.moves import cPickle as pickle
+
+# The version of the pickled checkpoint. Changed with FlightCheckpoint's
+# format, so checkpoints saved by older servers are rebuilt rather than
+# misread.
+CHECKPOINT_VERSION = 1
+
+
+class TeamFlightCheckpoint(models.Model):
+    """The saved evaluation checkpoint of a team's flight in a mission.
+
+    Saved by MissionConfig.team_evaluations() after each team is scored, so
+    later evaluations, in any server process, fold in only the logs uploaded
+    since. The checkpoints are deleted when the logs folded into them or the
+    mission's waypoints or geometry change.
+    """
+    # The mission the flight was evaluated against.
+    mission = models.ForeignKey('MissionConfig')
+    # The team which flew.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL)
+    # The start of the flight, or None if its takeoff is unknown.
+    flight_start = models.DateTimeField(null=True, blank=True)
+    # The flight's FlightCheckpoint, pickled.
+    pickled_checkpoint = models.BinaryField()
+    # The CHECKPOINT_VERSION the checkpoint was pickled with.
+    version = models.IntegerField(default=CHECKPOINT_VERSION)
+
+    class Meta:
+        index_together = [('mission', 'user')]
+
+    def __unicode__(self):
+        """Descriptive text for use in displays."""
+        return unicode('TeamFlightCheckpoint (pk:%s, mission:%s, user:%s, '
+                       'flight_start:%s)' %
+                       (str(self.pk), str(self.mission_id), str(self.user_id),
+                        str(self.flight_start)))
+
+    @property
+    def checkpoint(self):
+        """The FlightCheckpoint, as a copy, or None if of another version.
+
+        Changes to the copy are stored by setting the property again.
+        """
+        if self.version != CHECKPOINT_VERSION:
+            return None
+        return pickle.loads(bytes(self.pickled_checkpoint))
+
+    @checkpoint.setter
+    def checkpoint(self, checkpoint):
+        self.pickled_checkpoint = pickle.dumps(checkpoint,
+                                               pickle.HIGHEST_PROTOCOL)
+        self.version = CHECKPOINT_VERSION
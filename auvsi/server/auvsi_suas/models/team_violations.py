@@ -0,0 +1,52 @@
+"""Team violations model."""
+
+from violation_monitor import empty_violations
+from django.conf import settings
+from django.db import models
+from django.utils.six.moves import cPickle as pickle
+
+# The version of the pickled state. Changed with the state's format, so
+# states stored by older servers are started over rather than misread.
+STATE_VERSION = 1
+
+
+class TeamViolations(models.Model):
+    """A team's running violation state for a mission.
+
+    Updated by MissionConfig.monitor_telemetry() as telemetry is uploaded.
+    The state is kept in the database, so every server process updates the
+    same state, and it lasts until the mission's geometry changes.
+    """
+    # The mission the state is for.
+    mission = models.ForeignKey('MissionConfig')
+    # The team the state is for.
+    user = models.ForeignKey(settings.AUTH_USER_MODEL)
+    # The state described by violation_monitor.empty_violations(), pickled.
+    pickled_state = models.BinaryField()
+    # The STATE_VERSION the state was pickled with.
+    version = models.IntegerField(default=STATE_VERSION)
+
+    class Meta:
+        unique_together = [('mission', 'user')]
+
+    def __unicode__(self):
+        """Descriptive text for use in displays."""
+        return unicode('TeamViolations (pk:%s, mission:%s, user:%s)' %
+                       (str(self.pk), str(self.mission_id),
+                        str(self.user_id)))
+
+    @property
+    def state(self):
+        """The violation state, as a copy.
+
+        Changes to the copy are stored by setting the property again. A state
+        of another version is started over with an empty state.
+        """
+        if self.version != STATE_VERSION:
+            return empty_violations()
+        return pickle.loads(bytes(self.pickled_state))
+
+    @state.setter
+    def state(self, state):
+        self.pickled_state = pickle.dumps(state, pickle.HIGHEST_PROTOCOL)
+        self.version = STATE_VERSION
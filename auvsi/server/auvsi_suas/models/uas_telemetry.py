@@ -1,49 +1,87 @@
 """UAS Telemetry model."""
 
-from access_log import AccessLog
+import numpy as np
+import operator
+from access_log import AbstractAccessLog
 from aerial_position import AerialPosition
+from cached_artifact import CachedArtifact
+from gps_position import GpsPosition
 from takeoff_or_landing_event import TakeoffOrLandingEvent
 from auvsi_suas.models.moving_obstacle import MovingObstacle
+from auvsi_suas.models.epoch import seconds_since_epoch
+from auvsi_suas.shared_cache import locked
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.db import models
+from django.db.models.signals import post_delete
+from django.db.models.signals import post_save
 from django.utils import timezone
 from auvsi_suas.patches.simplekml_patch import AltitudeMode
 from auvsi_suas.patches.simplekml_patch import Color
 
 
-class UasTelemetry(AccessLog):
-    """UAS telemetry reported by teams."""
-    # The position of the UAS
-    uas_position = models.ForeignKey(AerialPosition)
+class UasTelemetry(AbstractAccessLog):
+    """UAS telemetry reported by teams.
+
+    The position is stored inline rather than as an AerialPosition, so each
+    log is a single row which can be read without joins.
+    """
+    # Latitude of the UAS in degrees
+    latitude = models.FloatField()
+    # Longitude of the UAS in degrees
+    longitude = models.FloatField()
+    # Altitude (MSL) of the UAS in feet
+    altitude_msl = models.FloatField()
     # The heading of the UAS in degrees (e.g. 0=north, 90=east)
     uas_heading = models.FloatField()
 
+    class Meta:
+        index_together = [('user', 'timestamp')]
+
     def __unicode__(self):
         """Descriptive text for use in displays."""
         return unicode("UasTelemetry (pk:%s, user:%s, timestamp:%s, "
-                       "heading:%s, pos:%s)" %
+                       "heading:%s, lat:%s, lon:%s, alt:%s)" %
                        (str(self.pk), self.user.__unicode__(),
                         str(self.timestamp), str(self.uas_heading),
-                        self.uas_position.__unicode__()))
+                        str(self.latitude), str(self.longitude),
+                        str(self.altitude_msl)))
 
-    @classmethod
-    def by_user(cls, user):
-        """Gets the time-sorted list of access log for the given user.
+    @property
+    def uas_position(self):
+        """The position of the UAS as an unsaved AerialPosition.
+
+        Setting this copies the values of the given AerialPosition.
+        """
+        gps_position = GpsPosition(latitude=self.latitude,
+                                   longitude=self.longitude)
+        return AerialPosition(gps_position=gps_position,
+                              altitude_msl=self.altitude_msl)
 
-        Note: This prefetches the related AerialPosition and GpsPosition
-        for each entry.  Thus, any subsequent changes to those entries in
-        the database after fetch may not be reflected in the objects.
+    @uas_position.setter
+    def uas_position(self, aerial_pos):
+        self.latitude = aerial_pos.gps_position.latitude
+        self.longitude = aerial_pos.gps_position.longitude
+        self.altitude_msl = aerial_pos.altitude_msl
+
+    @classmethod
+    def arrays(cls, logs):
+        """Gets the times and positions of the logs as numpy arrays.
 
         Args:
-            user: The user to get the access log for.
+            logs: A list of UasTelemetry logs.
         Returns:
-            A list of access log objects for the given user sorted by timestamp.
+            A tuple (times, positions) where times is an array of the log
+            times as seconds since the obstacle path epoch, and positions is
+            an array with a (latitude, longitude, altitude_msl) row for each
+            log.
         """
-        # Almost every user of UasTelemetry.by_user wants to use
-        # the related AerialPosition and GpsPosition.  To avoid excessive
-        # database queries, we select these values from the database up front.
-        return super(UasTelemetry, cls).by_user(user) \
-                .select_related('uas_position__gps_position')
+        times = seconds_since_epoch([log.timestamp for log in logs])
+        positions = np.array([(log.latitude, log.longitude, log.altitude_msl)
+                              for log in logs],
+                             dtype=np.float64).reshape(-1, 3)
+        return (times, positions)
 
     @classmethod
     def dedupe(cls, logs):
@@ -86,22 +124,146 @@ class UasTelemetry(AccessLog):
         Returns:
             True if they are equal.
         """
-        return (self.uas_position.duplicate(other.uas_position) and
+        return (self.latitude == other.latitude and
+                self.longitude == other.longitude and
+                self.altitude_msl == other.altitude_msl and
                 self.uas_heading == other.uas_heading)
 
     def json(self):
         ret = {
             'id': self.pk,
-            'user': self.user.pk,
+            'user': self.user_id,
             'timestamp': self.timestamp.isoformat(),
-            'latitude': self.uas_position.gps_position.latitude,
-            'longitude': self.uas_position.gps_position.longitude,
-            'altitude_msl': self.uas_position.altitude_msl,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'altitude_msl': self.altitude_msl,
             'heading': self.uas_heading,
         }
 
         return ret
 
+    @classmethod
+    def json_values(cls, query):
+        """Serializes the telemetry in a query without creating models.
+
+        Args:
+            query: A UasTelemetry QuerySet.
+        Returns:
+            A list of the telemetry as returned by json(), in query order.
+        """
+        rows = query.values('id', 'user_id', 'timestamp', 'latitude',
+                            'longitude', 'altitude_msl', 'uas_heading')
+        return [{
+            'id': row['id'],
+            'user': row['user_id'],
+            'timestamp': row['timestamp'].isoformat(),
+            'latitude': row['latitude'],
+            'longitude': row['longitude'],
+            'altitude_msl': row['altitude_msl'],
+            'heading': row['uas_heading'],
+        } for row in rows]
+
+    @classmethod
+    def last_known(cls, users):
+        """Gets the last known telemetry of the given users.
+
+        With a shared cache (SHARED_CACHE), the last known telemetry is kept
+        in the cache, updated as telemetry is uploaded, and users missing
+        from it are seeded from the database. A cache private to each process
+        would miss the telemetry uploaded to the others, so without one it is
+        read from the database. Either way a constant number of queries is
+        used.
+
+        Args:
+            users: The users to get the telemetry of.
+        Returns:
+            A dict from user ID to a dict with the 'timestamp', 'latitude',
+            'longitude', 'altitude_msl' and 'uas_heading' of the user's
+            latest telemetry, and the 'rate' in Hz given by the time since
+            the telemetry before it, or None if unknown. The value is None
+            for users without telemetry.
+        """
+        user_pks = [user.pk for user in users]
+        if not settings.SHARED_CACHE:
+            states = cls.query_last_known(user_pks)
+        else:
+            states = last_known_cache.get_many(user_pks)
+            missing = [pk for pk in user_pks if pk not in states]
+            if missing:
+                # No telemetry is cached as an empty state, so it isn't
+                # seeded again.
+                seeded = cls.query_last_known(missing)
+                last_known_cache.set_many(seeded)
+                states.update(seeded)
+
+        return dict((pk, state or None) for (pk, state) in states.items())
+
+    @classmethod
+    def query_last_known(cls, user_pks):
+        """Reads the last known telemetry of users from the database.
+
+        Uses at most three queries, each finding a row per user with the
+        (user, timestamp) index.
+
+        Args:
+            user_pks: The IDs of the users to get the telemetry of.
+        Returns:
+            A dict from user ID to the state described by last_known(), or
+            an empty dict for users without telemetry.
+        """
+        states = dict((pk, {}) for pk in user_pks)
+
+        latest = cls.objects.filter(user__in=user_pks).values(
+            'user_id').annotate(latest=models.Max('timestamp'))
+        latest = dict((row['user_id'], row['latest']) for row in latest)
+        if not latest:
+            return states
+
+        previous = cls.objects.filter(reduce(operator.or_, [
+            models.Q(user_id=pk, timestamp__lt=timestamp)
+            for (pk, timestamp) in latest.items()
+        ])).values('user_id').annotate(previous=models.Max('timestamp'))
+        previous = dict((row['user_id'], {'timestamp': row['previous']})
+                        for row in previous)
+
+        logs = cls.objects.filter(reduce(operator.or_, [
+            models.Q(user_id=pk, timestamp=timestamp)
+            for (pk, timestamp) in latest.items()
+        ]))
+        for log in logs.order_by('pk'):
+            states[log.user_id] = last_known_state(log,
+                                                   previous.get(log.user_id))
+        return states
+
+    @classmethod
+    def update_last_known(cls, logs):
+        """Updates the cached last known telemetry with uploaded telemetry.
+
+        Only used with a shared cache. The update holds the cache's lock, so
+        concurrent uploads don't lose each other's updates. Users missing
+        from the cache are left to be seeded by last_known(), as the
+        uploaded telemetry may be older than what's stored.
+
+        Args:
+            logs: A list of UasTelemetry logs.
+        """
+        if not settings.SHARED_CACHE:
+            return
+
+        user_logs = {}
+        for log in logs:
+            user_logs.setdefault(log.user_id, []).append(log)
+        keys = dict((last_known_cache.key(pk), pk) for pk in user_logs)
+
+        with locked(cache):
+            states = cache.get_many(keys.keys())
+            for (key, state) in states.items():
+                for log in sorted(user_logs[keys[key]],
+                                  key=lambda l: l.timestamp):
+                    state = last_known_state(log, state)
+                states[key] = state
+            cache.set_many(states)
+
     @classmethod
     def kml(cls, user, logs, kml, kml_doc):
         """
@@ -116,62 +278,88 @@ class UasTelemetry(AccessLog):
         Returns:
             None
         """
-        # KML Compliant Datetime Formatter
-        kml_datetime_format = "%Y-%m-%dT%H:%M:%S.%fZ"
-        icon = 'http://maps.google.com/mapfiles/kml/shapes/airports.png'
-        threshold = 1  # Degrees
-
         kml_folder = kml.newfolder(name=user.username)
 
         flights = TakeoffOrLandingEvent.flights(user)
         if len(flights) == 0:
             return
 
-        logs = filter(lambda log: cls._is_bad_position(log, threshold), logs)
+        logs = cls.kml_filter(logs)
+        obstacles = list(MovingObstacle.objects.all())
         for i, flight in enumerate(flights):
             label = 'Flight {}'.format(i + 1)  # Flights are one-indexed
             kml_flight = kml_folder.newfolder(name=label)
 
             flight_logs = filter(lambda x: flight.within(x.timestamp), logs)
-            if len(flight_logs) < 2:
-                continue
+            cls.kml_flight(flight_logs, obstacles, kml_flight, kml_doc)
 
-            coords = []
-            angles = []
-            when = []
-            for entry in flight_logs:
-                pos = entry.uas_position.gps_position
-                # Spatial Coordinates
-                coord = (
-                    pos.longitude, pos.latitude,
-                    entry.uas_position.altitude_msl, )
-                coords.append(coord)
+    @classmethod
+    def kml_filter(cls, logs):
+        """Filters the logs which are too near latitude and longitude 0,0.
+
+        Args:
+            logs: An iterable of UasTelemetry elements.
+        Returns:
+            A list of the logs with valid positions.
+        """
+        threshold = 1  # Degrees
+        return filter(lambda log: cls._is_bad_position(log, threshold), logs)
+
+    @classmethod
+    def kml_flight(cls, flight_logs, obstacles, kml, kml_doc):
+        """
+        Appends kml nodes describing a flight, and the moving obstacles
+        during the flight. No nodes are added if less than two log entries
+        are given.
 
-                # Time Elements
-                time = entry.timestamp.strftime(kml_datetime_format)
-                when.append(time)
+        Args:
+            flight_logs: A list of the UasTelemetry elements of the flight.
+            obstacles: A list of the MovingObstacles to add paths for.
+            kml: A simpleKML Container to which the flight data will be added
+            kml_doc: The simpleKML Document to which schemas will be added
+        Returns:
+            None
+        """
+        # KML Compliant Datetime Formatter
+        kml_datetime_format = "%Y-%m-%dT%H:%M:%S.%fZ"
+        icon = 'http://maps.google.com/mapfiles/kml/shapes/airports.png'
+
+        if len(flight_logs) < 2:
+            return
 
-                # Degrees heading, tilt, and roll
-                angle = (entry.uas_heading, 0.0, 0.0)
-                angles.append(angle)
+        coords = []
+        angles = []
+        when = []
+        for entry in flight_logs:
+            # Spatial Coordinates
+            coord = (entry.longitude, entry.latitude, entry.altitude_msl)
+            coords.append(coord)
 
-            # Create a new track in the folder
-            trk = kml_flight.newgxtrack(name='Flight Path')
-            trk.altitudemode = AltitudeMode.absolute
+            # Time Elements
+            time = entry.timestamp.strftime(kml_datetime_format)
+            when.append(time)
 
-            # Append flight data
-            trk.newwhen(when)
-            trk.newgxcoord(coords)
-            trk.newgxangle(angles)
+            # Degrees heading, tilt, and roll
+            angle = (entry.uas_heading, 0.0, 0.0)
+            angles.append(angle)
 
-            # Set styling
-            trk.extrude = 1  # Extend path to ground
-            trk.style.linestyle.width = 2
-            trk.style.linestyle.color = Color.blue
-            trk.iconstyle.icon.href = icon
+        # Create a new track in the folder
+        trk = kml.newgxtrack(name='Flight Path')
+        trk.altitudemode = AltitudeMode.absolute
 
-            for obstacle in MovingObstacle.objects.all():
-                obstacle.kml(path=flight_logs, kml=kml_flight, kml_doc=kml_doc)
+        # Append flight data
+        trk.newwhen(when)
+        trk.newgxcoord(coords)
+        trk.newgxangle(angles)
+
+        # Set styling
+        trk.extrude = 1  # Extend path to ground
+        trk.style.linestyle.width = 2
+        trk.style.linestyle.color = Color.blue
+        trk.iconstyle.icon.href = icon
+
+        for obstacle in obstacles:
+            obstacle.kml(path=flight_logs, kml=kml, kml_doc=kml_doc)
 
     @classmethod
     def live_kml(cls, kml, timespan):
@@ -186,11 +374,8 @@ class UasTelemetry(AccessLog):
             linestring = kml.newlinestring(name=user.username)
             coords = []
             for entry in period_logs:
-                pos = entry.uas_position.gps_position
                 # Spatial Coordinates
-                coord = (
-                    pos.longitude, pos.latitude,
-                    entry.uas_position.altitude_msl, )
+                coord = (entry.longitude, entry.latitude, entry.altitude_msl)
                 coords.append(coord)
             linestring.coords = coords
             linestring.altitudemode = AltitudeMode.absolute
@@ -209,7 +394,63 @@ class UasTelemetry(AccessLog):
         Returns:
             Boolean: True if position is not near 0,0, else False
         """
-        pos = log.uas_position.gps_position
-        if max(abs(pos.latitude), abs(pos.longitude)) < threshold:
+        if max(abs(log.latitude), abs(log.longitude)) < threshold:
             return False
         return True
+
+
+def last_known_state(log, previous=None):
+    """Gets the last known telemetry state given by a log.
+
+    Args:
+        log: The UasTelemetry log.
+        previous: The state before the log, if known.
+    Returns:
+        The state described by UasTelemetry.last_known(), which is the
+        previous state if it is newer than the log.
+    """
+    rate = None
+    if previous:
+        gap = (log.timestamp - previous['timestamp']).total_seconds()
+        if gap < 0:
+            return previous
+        if gap > 0:
+            rate = 1 / gap
+    return {
+        'timestamp': log.timestamp,
+        'latitude': log.latitude,
+        'longitude': log.longitude,
+        'altitude_msl': log.altitude_msl,
+        'uas_heading': log.uas_heading,
+        'rate': rate,
+    }
+
+
+# The last known telemetry state of each user, by user, with SHARED_CACHE. A
+# deleted user's telemetry is deleted with it, which evicts the user's state.
+last_known_cache = CachedArtifact('UasTelemetry/last_known', [])
+
+
+def telemetry_saved(sender, instance, created, **kwargs):
+    """Updates the last known telemetry with saved telemetry.
+
+    Changed telemetry may have moved back in time, so the user's state is
+    seeded again instead.
+    """
+    if created:
+        UasTelemetry.update_last_known([instance])
+    else:
+        cache.delete(last_known_cache.key(instance.user_id))
+
+
+def telemetry_deleted(sender, instance, **kwargs):
+    """Seeds the last known telemetry again when telemetry is deleted."""
+    cache.delete(last_known_cache.key(instance.user_id))
+
+
+post_save.connect(telemetry_saved,
+                  sender=UasTelemetry,
+                  dispatch_uid='UasTelemetry.telemetry_saved')
+post_delete.connect(telemetry_deleted,
+                    sender=UasTelemetry,
+                    dispatch_uid='UasTelemetry.telemetry_deleted')
@@ -7,7 +7,9 @@ from auvsi_suas.models import TakeoffOrLandingEvent
 from auvsi_suas.models import UasTelemetry
 import datetime
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.test import TestCase
+from django.test.utils import override_settings
 from django.utils import timezone
 from simplekml import Kml
 
@@ -112,6 +114,113 @@ class TestUasTelemetry(TestUasTelemetryBase):
         self.assertEqual(200, data['altitude_msl'])
         self.assertEqual(90, data['heading'])
 
+    def test_json_values(self):
+        """Tests JSON-style output from a query matches the models."""
+        self.assertEqual([self.log.json()],
+                         UasTelemetry.json_values(UasTelemetry.objects.all()))
+
+
+@override_settings(SHARED_CACHE=True)
+class TestUasTelemetryLastKnown(TestUasTelemetryBase):
+    """Tests UasTelemetry.last_known() with a shared cache."""
+
+    def setUp(self):
+        super(TestUasTelemetryLastKnown, self).setUp()
+        cache.clear()
+
+        self.user2 = User.objects.create_user('testuser2', 'testemail@x.com',
+                                              'testpass')
+        self.year2000 = datetime.datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+    def create_log(self, seconds, user=None, latitude=38):
+        log = UasTelemetry(
+            user=user or self.user,
+            timestamp=self.year2000 + datetime.timedelta(seconds=seconds),
+            latitude=latitude,
+            longitude=-76,
+            altitude_msl=100,
+            uas_heading=90)
+        log.save()
+        return log
+
+    def last_known(self, user=None):
+        user = user or self.user
+        return UasTelemetry.last_known([user])[user.pk]
+
+    def test_no_telemetry(self):
+        """Users without telemetry have no state."""
+        self.assertEqual({self.user.pk: None,
+                          self.user2.pk: None},
+                         UasTelemetry.last_known([self.user, self.user2]))
+
+    def test_seeded(self):
+        """State is seeded from the database, with a constant of queries."""
+        self.create_log(0, latitude=10)
+        self.create_log(1, latitude=20)
+        self.create_log(5, user=self.user2, latitude=30)
+        cache.clear()
+
+        with self.assertNumQueries(3):
+            states = UasTelemetry.last_known([self.user, self.user2])
+        self.assertEqual(20, states[self.user.pk]['latitude'])
+        self.assertEqual(self.year2000 + datetime.timedelta(seconds=1),
+                         states[self.user.pk]['timestamp'])
+        self.assertAlmostEqual(1, states[self.user.pk]['rate'])
+        self.assertEqual(30, states[self.user2.pk]['latitude'])
+        self.assertIsNone(states[self.user2.pk]['rate'])
+
+        with self.assertNumQueries(0):
+            UasTelemetry.last_known([self.user, self.user2])
+
+    def test_updated(self):
+        """State is updated as telemetry is saved, with the rate."""
+        self.assertIsNone(self.last_known())
+
+        self.create_log(0, latitude=10)
+        self.create_log(0.5, latitude=20)
+
+        state = self.last_known()
+        self.assertEqual(20, state['latitude'])
+        self.assertAlmostEqual(2, state['rate'])
+        self.assertIsNone(self.last_known(self.user2))
+
+    def test_older_ignored(self):
+        """Older telemetry doesn't replace the state."""
+        self.last_known()
+        self.create_log(10, latitude=10)
+        self.create_log(5, latitude=20)
+
+        self.assertEqual(10, self.last_known()['latitude'])
+
+    def test_edit_and_delete(self):
+        """State is seeded again after telemetry is edited or deleted."""
+        self.last_known()
+        first = self.create_log(0, latitude=10)
+        last = self.create_log(1, latitude=20)
+
+        last.latitude = 30
+        last.save()
+        self.assertEqual(30, self.last_known()['latitude'])
+
+        last.delete()
+        self.assertEqual(10, self.last_known()['latitude'])
+
+        first.delete()
+        self.assertIsNone(self.last_known())
+
+    @override_settings(SHARED_CACHE=False)
+    def test_uncached(self):
+        """Without a shared cache, state is read from the database."""
+        self.create_log(0, latitude=10)
+        self.create_log(0.5, latitude=20)
+        self.last_known()
+
+        self.create_log(1, latitude=30)
+        with self.assertNumQueries(3):
+            state = self.last_known()
+        self.assertEqual(30, state['latitude'])
+        self.assertAlmostEqual(2, state['rate'])
+
 
 class TestUasTelemetryDedupe(TestUasTelemetryBase):
     def setUp(self):
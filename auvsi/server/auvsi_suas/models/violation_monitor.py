@@ -0,0 +1,213 @@
+"""Monitor of obstacle collisions and fly zone violations during flights."""
+
+import numpy as np
+from auvsi_suas.models import distance
+from fly_zone_geometry import FlyZoneGeometry
+from stationary_obstacle import BOUNDING_BOX_MARGIN
+from stationary_obstacle import FEET_PER_DEGREE_LATITUDE
+
+
+def empty_violations():
+    """Gets the violation state of a team with no telemetry checked.
+
+    Returns:
+        A dict with the keys 'flight', the start of the flight of the last
+        telemetry checked, 'last', a (time, latitude, longitude, altitude_msl,
+        in_bounds) tuple for the last telemetry checked in that flight or None,
+        'last_out', whether the UAS was out of bounds at any point since the
+        telemetry before it, 'out_of_bounds_time', 'out_of_bounds_violations',
+        'stationary_obst_collision' and 'moving_obst_collision', as described
+        by MissionConfig.evaluate_teams(), with only collisions present.
+    """
+    return {
+        'flight': None,
+        'last': None,
+        'last_out': False,
+        'out_of_bounds_time': 0.0,
+        'out_of_bounds_violations': 0,
+        'stationary_obst_collision': {},
+        'moving_obst_collision': {},
+    }
+
+
+def path_bounds(path):
+    """Gets a box containing every position inside a moving obstacle.
+
+    A spline curve lies within the convex hull of its coefficients, so the
+    box of the coefficients, grown by the sphere radius, holds the obstacle
+    at all times.
+
+    Args:
+        path: The MovingObstaclePath of the obstacle.
+    Returns:
+        A tuple (bounds_min, bounds_max) of numpy arrays of the least and
+        greatest (latitude, longitude, altitude_msl) in the box.
+    """
+    if path.fixed_position is not None:
+        points = path.fixed_position.reshape(1, 3)
+    else:
+        # Coefficients past the number of basis functions are padding.
+        num_coefficients = path.knots.shape[1] - path.degree - 1
+        points = path.coefficients[:, :num_coefficients].T
+    bounds_min = points.min(axis=0)
+    bounds_max = points.max(axis=0)
+
+    lat_delta = (path.sphere_radius / FEET_PER_DEGREE_LATITUDE *
+                 BOUNDING_BOX_MARGIN)
+    max_abs_lat = min(max(abs(bounds_min[0]), abs(bounds_max[0])) + lat_delta,
+                      90)
+    lon_delta = lat_delta / max(np.cos(np.radians(max_abs_lat)), 1e-6)
+    margin = np.array([lat_delta, lon_delta, path.sphere_radius])
+    return (bounds_min - margin, bounds_max + margin)
+
+
+class ViolationMonitor(object):
+    """The obstacles and fly zones of a mission, ready to check telemetry.
+
+    Holds the fly zone geometry, the stationary obstacle cylinders as numpy
+    arrays and the moving obstacle paths, so each uploaded position is checked
+    without touching the database. Positions are folded into a team's running
+    violation state in the same way MissionConfig.evaluate_teams() scores a
+    whole flight.
+    """
+
+    def __init__(self, fly_zones, stationary_obstacles, moving_obstacles):
+        """Compiles the monitor.
+
+        Args:
+            fly_zones: A list of FlyZoneGeometry that the UAS must be in.
+            stationary_obstacles: A list of (pk, latitude, longitude,
+                cylinder_radius, cylinder_height) tuples for the stationary
+                obstacles.
+            moving_obstacles: A list of (pk, MovingObstaclePath) tuples for the
+                moving obstacles.
+        """
+        self.fly_zones = fly_zones
+        stationary = np.array([obst[1:] for obst in stationary_obstacles],
+                              dtype=np.float64).reshape(-1, 4)
+        self.stationary_pks = [obst[0] for obst in stationary_obstacles]
+        self.stationary_latitudes = stationary[:, 0]
+        self.stationary_longitudes = stationary[:, 1]
+        self.stationary_radii = stationary[:, 2]
+        self.stationary_heights = stationary[:, 3]
+        self.moving_obstacles = moving_obstacles
+        self.moving_bounds = [path_bounds(path)
+                              for (_, path) in moving_obstacles]
+
+    def in_bounds(self, positions):
+        """Whether each of the positions is inside any of the fly zones.
+
+        Args:
+            positions: A numpy array with a (latitude, longitude,
+                altitude_msl) row for each position.
+        Returns:
+            A numpy array of whether each position is in bounds.
+        """
+        inside = np.zeros(len(positions), dtype=bool)
+        for zone in self.fly_zones:
+            inside |= zone.contains(positions[:, 0], positions[:, 1],
+                                    positions[:, 2])
+        return inside
+
+    def collisions(self, time, latitude, longitude, altitude_msl):
+        """Finds the obstacles a position collides with.
+
+        Args:
+            time: The time of the position as seconds since the obstacle path
+                epoch.
+            latitude: The latitude of the position.
+            longitude: The longitude of the position.
+            altitude_msl: The altitude (MSL) of the position.
+        Returns:
+            A tuple (stationary_pks, moving_pks) of lists of the IDs of the
+            stationary and moving obstacles the position is inside.
+        """
+        dists = distance.distance_to_many(
+            latitude, longitude, 0, self.stationary_latitudes,
+            self.stationary_longitudes, np.zeros(len(self.stationary_pks)))
+        inside = ((altitude_msl >= 0) &
+                  (altitude_msl <= self.stationary_heights) &
+                  (dists <= self.stationary_radii))
+        stationary_pks = [self.stationary_pks[i]
+                          for i in np.flatnonzero(inside)]
+
+        moving_pks = []
+        for ((pk, path), (bounds_min, bounds_max)) in zip(
+                self.moving_obstacles, self.moving_bounds):
+            if (latitude < bounds_min[0] or latitude > bounds_max[0] or
+                    longitude < bounds_min[1] or longitude > bounds_max[1] or
+                    altitude_msl < bounds_min[2] or
+                    altitude_msl > bounds_max[2]):
+                continue
+            position = path.positions([time])[0]
+            dist = distance.distance_to(position[0], position[1], position[2],
+                                        latitude, longitude, altitude_msl)
+            if dist <= path.sphere_radius:
+                moving_pks.append(pk)
+
+        return (stationary_pks, moving_pks)
+
+    def update(self, state, flight, time, latitude, longitude, altitude_msl):
+        """Folds a position during a flight into a team's violation state.
+
+        The time out of bounds is found for the segment from the last position
+        in the same flight, so positions must be checked in time order to be
+        counted out of bounds. Positions older than the last are only checked
+        for collisions.
+
+        Args:
+            state: The team's state from empty_violations(), updated in
+                place.
+            flight: The start of the flight the position is in.
+            time: The time of the position as seconds since the obstacle path
+                epoch.
+            latitude: The latitude of the position.
+            longitude: The longitude of the position.
+            altitude_msl: The altitude (MSL) of the position.
+        Returns:
+            A list of alerts for the violations started by the position, as
+            dicts with the 'violation', one of 'out_of_bounds',
+            'stationary_obst_collision' or 'moving_obst_collision', and the
+            'id' of the obstacle collided with, or None.
+        """
+        alerts = []
+
+        (stationary_pks, moving_pks) = self.collisions(time, latitude,
+                                                       longitude, altitude_msl)
+        for (violation, pks) in [('stationary_obst_collision', stationary_pks),
+                                 ('moving_obst_collision', moving_pks)]:
+            for pk in pks:
+                if pk not in state[violation]:
+                    state[violation][pk] = True
+                    alerts.append({'violation': violation, 'id': pk})
+
+        last = state['last']
+        if last is not None and time < last[0]:
+            return alerts
+
+        position = np.array([[latitude, longitude, altitude_msl]])
+        in_bounds = bool(self.in_bounds(position)[0])
+        if last is not None and state['flight'] == flight:
+            # Out of bounds time of the segment from the last position, which
+            # starts a violation unless it continues one.
+            last_out = not (last[4] and in_bounds)
+            if last_out:
+                # Only segments crossing the boundary need bisecting.
+                segment_time = time - last[0]
+                if last[4] or in_bounds:
+                    times = np.array([last[0], time], dtype=np.float64)
+                    (segment_time,
+                     _) = FlyZoneGeometry.out_of_bounds_intervals(
+                         self.fly_zones, times, np.vstack((last[1:4],
+                                                           position)))
+                state['out_of_bounds_time'] += segment_time
+                if last[4] or not state['last_out']:
+                    state['out_of_bounds_violations'] += 1
+                    alerts.append({'violation': 'out_of_bounds', 'id': None})
+            state['last_out'] = last_out
+        else:
+            state['flight'] = flight
+            state['last_out'] = False
+
+        state['last'] = (time, latitude, longitude, altitude_msl, in_bounds)
+        return alerts
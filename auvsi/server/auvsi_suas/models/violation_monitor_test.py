@@ -0,0 +1,124 @@
+"""Tests for the violation_monitor module."""
+
+import numpy as np
+from auvsi_suas.models.fly_zone_geometry import FlyZoneGeometry
+from auvsi_suas.models.moving_obstacle_path import MovingObstaclePath
+from auvsi_suas.models.violation_monitor import ViolationMonitor
+from auvsi_suas.models.violation_monitor import empty_violations
+from auvsi_suas.models.violation_monitor import path_bounds
+from django.test import TestCase
+from scipy.interpolate import splrep
+
+
+class TestPathBounds(TestCase):
+    """Tests the path_bounds function."""
+
+    def test_fixed(self):
+        """A fixed obstacle's box is its sphere."""
+        (bounds_min, bounds_max) = path_bounds(
+            MovingObstaclePath(100, fixed_position=[38, -76, 200]))
+        self.assertAlmostEqual(100, bounds_max[2] - 200)
+        self.assertAlmostEqual(100, 200 - bounds_min[2])
+        self.assertLess(bounds_min[0], 38)
+        self.assertGreater(bounds_max[1], -76)
+
+    def test_contains_path(self):
+        """The box contains the obstacle along its path."""
+        times = np.linspace(0, 100, 6)
+        spline_reps = [splrep(times, 38 + 0.01 * np.sin(times)),
+                       splrep(times, -76 + 0.01 * np.cos(times)),
+                       splrep(times, 100 + times)]
+        path = MovingObstaclePath(50,
+                                  total_travel_time=100,
+                                  spline_reps=spline_reps)
+        (bounds_min, bounds_max) = path_bounds(path)
+
+        positions = path.positions(np.linspace(0, 100, 1000))
+        self.assertTrue(np.all(positions >= bounds_min))
+        self.assertTrue(np.all(positions <= bounds_max))
+
+
+class TestViolationMonitor(TestCase):
+    """Tests the ViolationMonitor class."""
+
+    def setUp(self):
+        """Creates a monitor for a zone from 0,0 to 1,1."""
+        self.monitor = ViolationMonitor(
+            [FlyZoneGeometry([(0, 0), (0, 1), (1, 1), (1, 0)], 0, 1000)],
+            [(1, 0.5, 0.5, 100, 200), (2, 0.9, 0.9, 100, 200)],
+            [(3, MovingObstaclePath(50, fixed_position=[0.2, 0.2, 500]))])
+        self.state = empty_violations()
+
+    def update(self, time, latitude, longitude, altitude_msl, flight=0):
+        return self.monitor.update(self.state, flight, time, latitude,
+                                   longitude, altitude_msl)
+
+    def test_collisions(self):
+        """Positions are checked against each obstacle."""
+        self.assertEqual(([1], []),
+                         self.monitor.collisions(0, 0.5, 0.5, 100))
+        self.assertEqual(([], []),
+                         self.monitor.collisions(0, 0.5, 0.5, 300))
+        self.assertEqual(([], [3]),
+                         self.monitor.collisions(0, 0.2, 0.2, 520))
+        self.assertEqual(([], []),
+                         self.monitor.collisions(0, 0.2, 0.2, 600))
+
+    def test_no_obstacles(self):
+        """Positions can be checked without obstacles or zones."""
+        monitor = ViolationMonitor([], [], [])
+        self.assertEqual(([], []), monitor.collisions(0, 0.5, 0.5, 100))
+        self.assertEqual([{'violation': 'out_of_bounds', 'id': None}],
+                         monitor.update(self.state, 0, 0, 0.5, 0.5, 100) +
+                         monitor.update(self.state, 0, 1, 0.5, 0.5, 100))
+
+    def test_collision_alerts(self):
+        """Each collision is alerted once."""
+        self.assertEqual([], self.update(0, 0.1, 0.5, 100))
+        self.assertEqual(
+            [{'violation': 'stationary_obst_collision', 'id': 1}],
+            self.update(1, 0.5, 0.5, 100))
+        self.assertEqual([], self.update(2, 0.5, 0.5, 100))
+        self.assertEqual({1: True}, self.state['stationary_obst_collision'])
+
+    def test_out_of_bounds(self):
+        """Time out of bounds matches the evaluation of the flight."""
+        times = np.arange(6, dtype=np.float64)
+        positions = np.array([(0.5, 0.1, 100), (0.5, 1.5, 100),
+                              (0.5, 2.5, 100), (0.5, 0.1, 100),
+                              (0.5, 1.5, 100), (0.5, 0.1, 100)])
+
+        alerts = []
+        for (time, position) in zip(times, positions):
+            alerts += self.update(time, *position)
+
+        (total_time, intervals) = FlyZoneGeometry.out_of_bounds_intervals(
+            self.monitor.fly_zones, times, positions)
+        self.assertAlmostEqual(total_time, self.state['out_of_bounds_time'])
+        self.assertEqual(len(intervals),
+                         self.state['out_of_bounds_violations'])
+        self.assertEqual(2, len(alerts))
+
+    def test_older_positions(self):
+        """Positions older than the last are only checked for collisions."""
+        self.update(10, 0.5, 0.1, 100)
+        self.assertEqual(
+            [{'violation': 'stationary_obst_collision', 'id': 1}],
+            self.update(5, 0.5, 0.5, 100))
+        self.assertEqual([], self.update(0, 0.5, 5, 100))
+        self.assertEqual(0, self.state['out_of_bounds_violations'])
+        self.assertEqual(10, self.state['last'][0])
+
+    def test_flights(self):
+        """Time between flights isn't out of bounds."""
+        self.update(0, 0.5, 0.1, 100, flight=0)
+        self.update(1, 0.5, 5, 100, flight=0)
+        self.assertAlmostEqual(0.816, self.state['out_of_bounds_time'], 2)
+
+        self.update(100, 0.5, 5, 100, flight=100)
+        self.assertAlmostEqual(0.816, self.state['out_of_bounds_time'], 2)
+        self.assertEqual(1, self.state['out_of_bounds_violations'])
+
+        self.update(101, 0.5, 5, 100, flight=100)
+        self.assertAlmostEqual(1.816, self.state['out_of_bounds_time'], 2)
+        self.assertEqual(2, self.state['out_of_bounds_violations'])
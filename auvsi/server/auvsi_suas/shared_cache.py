@@ -0,0 +1,106 @@
+"""Cache backend shared by the server processes on one machine."""
+
+import contextlib
+import fcntl
+import io
+import os
+import tempfile
+import threading
+import zlib
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.cache.backends.filebased import FileBasedCache
+from django.core.files.move import file_move_safe
+from django.utils.six.moves import cPickle as pickle
+
+# Name of the file locked for atomic operations, in the cache directory. It
+# lacks the cache suffix so clearing and culling the cache leave it alone.
+LOCK_FILE_NAME = 'lock'
+
+# Lock for atomic updates of caches private to this process.
+PROCESS_LOCK = threading.RLock()
+
+
+def locked(cache):
+    """Holds a lock making a sequence of cache operations atomic.
+
+    Args:
+        cache: The cache operated on.
+    Returns:
+        A context manager holding the lock of a SharedFileCache, excluding
+        other processes, or for other caches, which are private to each
+        process, a lock of this process.
+    """
+    lock = getattr(cache, 'locked', None)
+    if lock is None:
+        return PROCESS_LOCK
+    return lock()
+
+
+class SharedFileCache(FileBasedCache):
+    """A file based cache which can be shared by processes on one machine.
+
+    Every process using the same directory sees the same values, so a value
+    computed by one worker is used by all of them, and invalidating a value
+    in one worker invalidates it in all of them.
+
+    Django's file based cache writes each value atomically, but add() checks
+    then sets and incr() gets then sets, so processes could both add a key or
+    lose increments. Here these hold an exclusive lock on a file in the cache
+    directory, making them atomic across processes. Values are pickled with
+    the highest protocol, which keeps numpy arrays compact.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(SharedFileCache, self).__init__(*args, **kwargs)
+        self.lock_holder = threading.local()
+
+    @contextlib.contextmanager
+    def locked(self):
+        """Holds the cache's lock, excluding other processes and threads.
+
+        A thread holding the lock may take it again, so locked operations
+        may be used while holding it.
+        """
+        if getattr(self.lock_holder, 'depth', 0):
+            self.lock_holder.depth += 1
+            try:
+                yield
+            finally:
+                self.lock_holder.depth -= 1
+            return
+
+        self._createdir()
+        with open(os.path.join(self._dir, LOCK_FILE_NAME), 'a') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            self.lock_holder.depth = 1
+            try:
+                yield
+            finally:
+                self.lock_holder.depth = 0
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        with self.locked():
+            return super(SharedFileCache, self).add(key, value, timeout,
+                                                    version)
+
+    def incr(self, key, delta=1, version=None):
+        with self.locked():
+            return super(SharedFileCache, self).incr(key, delta, version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._createdir()  # Cache dir can be deleted at any time.
+        fname = self._key_to_file(key, version)
+        self._cull()  # make some room if necessary
+        fd, tmp_path = tempfile.mkstemp(dir=self._dir)
+        renamed = False
+        try:
+            with io.open(fd, 'wb') as f:
+                expiry = self.get_backend_timeout(timeout)
+                f.write(pickle.dumps(expiry, -1))
+                f.write(zlib.compress(pickle.dumps(value, -1)))
+            file_move_safe(tmp_path, fname, allow_overwrite=True)
+            renamed = True
+        finally:
+            if not renamed:
+                os.remove(tmp_path)
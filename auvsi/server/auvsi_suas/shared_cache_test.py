@@ -0,0 +1,138 @@
+"""Tests for the shared_cache module."""
+
+import multiprocessing
+import numpy as np
+import shutil
+import tempfile
+import time
+from auvsi_suas.shared_cache import PROCESS_LOCK
+from auvsi_suas.shared_cache import SharedFileCache
+from auvsi_suas.shared_cache import locked
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.test import TestCase
+
+# Number of worker processes sharing the cache in tests.
+NUM_WORKERS = 4
+
+
+def shared_cache(cache_dir):
+    """Creates a SharedFileCache in the directory."""
+    return SharedFileCache(cache_dir, {'TIMEOUT': 30})
+
+
+def add_and_incr(cache_dir):
+    """Adds and increments keys, as a worker process.
+
+    Returns:
+        Whether the worker added the key.
+    """
+    cache = shared_cache(cache_dir)
+    added = cache.add('added', True)
+    cache.add('counter', 0)
+    for _ in xrange(100):
+        cache.incr('counter')
+    return added
+
+
+def serve_requests(args):
+    """Serves requests for a value computed from the models, as a worker.
+
+    Args:
+        args: A tuple (cache_dir, num_requests). Without a cache directory
+            the worker uses its own in-memory cache.
+    Returns:
+        A tuple (computations, total_time) of the number of times the worker
+        computed the value, and the seconds taken to serve the requests.
+    """
+    (cache_dir, num_requests) = args
+    if cache_dir is None:
+        cache = LocMemCache('serve_requests', {'TIMEOUT': 30})
+    else:
+        cache = shared_cache(cache_dir)
+
+    computations = 0
+    start = time.time()
+    for _ in xrange(num_requests):
+        value = cache.get('value')
+        while value is None:
+            # Only the worker holding the lease computes the value.
+            if cache.add('value/lease', True):
+                # Stands in for computing obstacle splines or mission data.
+                time.sleep(0.05)
+                value = np.arange(1000, dtype=np.float64)
+                cache.set('value', value)
+                computations += 1
+            else:
+                time.sleep(0.005)
+                value = cache.get('value')
+    return (computations, time.time() - start)
+
+
+class TestSharedFileCache(TestCase):
+    """Tests the SharedFileCache."""
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.cache = shared_cache(self.cache_dir)
+        self.pool = multiprocessing.Pool(NUM_WORKERS)
+
+    def tearDown(self):
+        self.pool.close()
+        self.pool.join()
+        shutil.rmtree(self.cache_dir)
+
+    def test_shared(self):
+        """Values are shared between cache instances."""
+        self.cache.set('key', np.arange(3))
+        np.testing.assert_array_equal([0, 1, 2],
+                                      shared_cache(self.cache_dir).get('key'))
+
+        self.cache.clear()
+        self.assertIsNone(shared_cache(self.cache_dir).get('key'))
+
+    def test_atomic(self):
+        """Adding and incrementing keys is atomic across processes."""
+        added = self.pool.map(add_and_incr, [self.cache_dir] * NUM_WORKERS)
+
+        self.assertEqual(1, added.count(True))
+        self.assertEqual(NUM_WORKERS * 100, self.cache.get('counter'))
+
+    def test_locked(self):
+        """The lock may be taken again by the thread holding it."""
+        with locked(self.cache):
+            with locked(self.cache):
+                self.assertTrue(self.cache.add('key', 1))
+            self.assertEqual(2, self.cache.incr('key'))
+        self.assertTrue(self.cache.add('other', 1))
+
+        # Caches private to the process use a lock of the process.
+        self.assertIs(PROCESS_LOCK, locked(LocMemCache('test', {})))
+
+    def test_computed_once(self):
+        """Workers sharing the cache don't each compute the value."""
+        self.cache.set('value', np.zeros(1))
+        results = self.pool.map(serve_requests,
+                                [(self.cache_dir, 10)] * NUM_WORKERS)
+        self.assertEqual(0, sum(computations
+                                for (computations, _) in results))
+
+        results = self.pool.map(serve_requests, [(None, 10)] * NUM_WORKERS)
+        self.assertEqual(NUM_WORKERS, sum(computations
+                                          for (computations, _) in results))
+
+    def test_loadtest(self):
+        """Compares workers with their own caches and with a shared cache."""
+        if not settings.TEST_ENABLE_LOADTEST:
+            return
+
+        num_requests = 1000
+        for (name, cache_dir) in [('Per worker', None),
+                                  ('Shared', self.cache_dir)]:
+            results = self.pool.map(serve_requests,
+                                    [(cache_dir, num_requests)] * NUM_WORKERS)
+            computations = sum(computations for (computations, _) in results)
+            rate = sum(num_requests / total_time
+                       for (_, total_time) in results)
+            print '%s cache: %d computations, Request Rate (%f)' % (
+                name, computations, rate)
@@ -26,6 +26,10 @@ class AuvsiSuasTestRunner(runner.DiscoverRunner):
         self.sendfile_backend = settings.SENDFILE_BACKEND
         settings.SENDFILE_BACKEND = 'sendfile.backends.development'
 
+        # Write access logs as they are made, so tests can check them.
+        self.access_log_buffer_max_logs = settings.ACCESS_LOG_BUFFER_MAX_LOGS
+        settings.ACCESS_LOG_BUFFER_MAX_LOGS = 1
+
         # Disable logging
         logging.disable(logging.CRITICAL)
 
@@ -34,6 +38,7 @@ class AuvsiSuasTestRunner(runner.DiscoverRunner):
 
         settings.MEDIA_ROOT = self.media_root
         settings.SENDFILE_BACKEND = self.sendfile_backend
+        settings.ACCESS_LOG_BUFFER_MAX_LOGS = self.access_log_buffer_max_logs
 
         logging.disable(logging.NOTSET)
 
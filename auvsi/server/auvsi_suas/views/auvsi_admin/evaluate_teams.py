@@ -1,18 +1,102 @@
 """Admin automatic evaluation of teams view."""
 
 import copy
-import cStringIO
 import csv
-from auvsi_suas.models import MissionConfig
+from auvsi_suas.models.mission_config import empty_team_data
+from auvsi_suas.models.mission_config import evaluate_team
 from auvsi_suas.views import logger
 from auvsi_suas.views.decorators import require_superuser
 from auvsi_suas.views.missions import mission_for_request
-from django.http import HttpResponse
+from django.contrib.auth.models import User
 from django.http import HttpResponseServerError
+from django.http import StreamingHttpResponse
 from django.utils.decorators import method_decorator
 from django.views.generic import View
 
 
+def flatten_evaluation(eval_data):
+    """Flattens a team's evaluation data into CSV columns.
+
+    Args:
+        eval_data: The evaluation data of a team, as given by
+            MissionConfig.evaluate_teams().
+    Returns:
+        A dict from column name to value, where nested keys are joined with
+        dots.
+    """
+    col_data = {}
+    work_queue = [([], eval_data)]
+    while len(work_queue) > 0:
+        (cur_prefixes, cur_map) = work_queue.pop()
+        for (key, val) in cur_map.iteritems():
+            new_prefixes = copy.copy(cur_prefixes)
+            new_prefixes.append(str(key))
+            if isinstance(val, dict):
+                work_queue.append((new_prefixes, val))
+            else:
+                column_key = '.'.join(new_prefixes)
+                col_data[column_key] = val
+    return col_data
+
+
+def evaluation_columns(mission_data):
+    """Gets the CSV columns for the evaluations of teams in a mission.
+
+    Every team is evaluated against the same waypoints and obstacles, so the
+    columns are those of a team which never flew.
+
+    Args:
+        mission_data: The mission data from MissionConfig.evaluation_data().
+    Returns:
+        The sorted list of column names.
+    """
+    eval_data = evaluate_team(mission_data, empty_team_data())
+    return sorted(['username'] + flatten_evaluation(eval_data).keys())
+
+
+class Echo(object):
+    """A file-like object which returns what is written to it."""
+
+    def write(self, value):
+        return value
+
+
+def evaluation_csv_lines(col_headers, team_evaluations):
+    """Formats team evaluation data as CSV lines, one at a time.
+
+    Args:
+        col_headers: The list of column names.
+        team_evaluations: An iterable of (user, evaluation data) tuples, as
+            given by MissionConfig.team_evaluations().
+    Yields:
+        The CSV header line, then a line for each user with a column for
+        each evaluation value.
+    """
+    writer = csv.DictWriter(Echo(), fieldnames=col_headers)
+    yield writer.writerow(dict(zip(col_headers, col_headers)))
+    for (user, eval_data) in team_evaluations:
+        col_data = flatten_evaluation(eval_data)
+        col_data['username'] = user.username
+        yield writer.writerow(col_data)
+
+
+def evaluation_csv(user_eval_data):
+    """Formats team evaluation data as CSV.
+
+    Args:
+        user_eval_data: The map from user to evaluation data given by
+            MissionConfig.evaluate_teams().
+    Returns:
+        The CSV as a string, with a row for each user and a column for each
+        evaluation value.
+    """
+    col_headers = set(['username'])
+    for eval_data in user_eval_data.values():
+        col_headers.update(flatten_evaluation(eval_data).keys())
+    return ''.join(evaluation_csv_lines(sorted(col_headers),
+                                        user_eval_data.iteritems()))
+
+
 class EvaluateTeams(View):
     """Evaluates the teams by forming a CSV containing useful stats."""
 
@@ -21,6 +105,7 @@ class EvaluateTeams(View):
         return super(EvaluateTeams, self).dispatch(*args, **kwargs)
 
     def get(self, request):
+        """Streams the evaluation CSV, a row at a time as teams are scored."""
         logger.info('Admin downloaded team evaluation.')
 
         # Get the mission to evaluate a team for.
@@ -29,42 +114,16 @@ class EvaluateTeams(View):
             logger.warning('Could not get mission to evaluate teams.')
             return error
 
-        # Get the eval data for the teams
-        user_eval_data = mission.evaluate_teams()
-        if not user_eval_data:
+        if not User.objects.filter(is_superuser=False).exists():
             logger.warning('No data for team evaluation.')
             return HttpResponseServerError(
                 'Could not get user evaluation data.')
 
-        # Reformat to column oriented
-        user_col_data = {}
-        for (user, eval_data) in user_eval_data.iteritems():
-            col_data = user_col_data.setdefault(user, {})
-            col_data['username'] = user.username
-            work_queue = [([], eval_data)]
-            while len(work_queue) > 0:
-                (cur_prefixes, cur_map) = work_queue.pop()
-                for (key, val) in cur_map.iteritems():
-                    new_prefixes = copy.copy(cur_prefixes)
-                    new_prefixes.append(str(key))
-                    if isinstance(val, dict):
-                        work_queue.append((new_prefixes, val))
-                    else:
-                        column_key = '.'.join(new_prefixes)
-                        col_data[column_key] = val
-        # Get column headers
-        col_headers = set()
-        for col_data in user_col_data.values():
-            for header in col_data.keys():
-                col_headers.add(header)
-        col_headers = sorted(col_headers)
-
-        # Write output
-        csv_output = cStringIO.StringIO()
-        writer = csv.DictWriter(csv_output, fieldnames=col_headers)
-        writer.writeheader()
-        for col_data in user_col_data.values():
-            writer.writerow(col_data)
-        output = csv_output.getvalue()
-        csv_output.close()
-        return HttpResponse(output)
+        # Get the eval data for the teams as the CSV is sent. Teams are scored
+        # in this process, as a worker pool must not be forked by a request.
+        mission_data = mission.evaluation_data()
+        team_evaluations = mission.team_evaluations(processes=1,
+                                                    mission_data=mission_data)
+        lines = evaluation_csv_lines(evaluation_columns(mission_data),
+                                     team_evaluations)
+        return StreamingHttpResponse(lines)
@@ -1,6 +1,9 @@
 """Tests for the evaluate_teams module."""
 
 import logging
+from auvsi_suas.models import MissionConfig
+from auvsi_suas.views.auvsi_admin.evaluate_teams import evaluation_columns
+from auvsi_suas.views.auvsi_admin.evaluate_teams import flatten_evaluation
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
 from django.test import TestCase
@@ -61,7 +64,7 @@ class TestEvaluateTeams(TestCase):
                      'password': 'testpass'})
         response = client.get(eval_url)
         self.assertEqual(response.status_code, 200)
-        csv_data = response.content
+        csv_data = ''.join(response.streaming_content)
         # Check correct number of rows
         self.assertEqual(len(csv_data.split('\n')), 5)
         # Check some headers
@@ -70,3 +73,13 @@ class TestEvaluateTeams(TestCase):
         # Check username fields
         self.assertTrue('user0' in csv_data)
         self.assertTrue('user1' in csv_data)
+
+    def test_evaluation_columns(self):
+        """The columns are computed before evaluating teams."""
+        mission = MissionConfig.objects.get()
+        columns = set(['username'])
+        for eval_data in mission.evaluate_teams().values():
+            columns.update(flatten_evaluation(eval_data).keys())
+
+        self.assertEqual(sorted(columns),
+                         evaluation_columns(mission.evaluation_data()))
@@ -1,12 +1,77 @@
 from auvsi_suas.models import FlyZone
 from auvsi_suas.models import MissionConfig
+from auvsi_suas.models import MovingObstacle
+from auvsi_suas.models import TakeoffOrLandingEvent
 from auvsi_suas.models import UasTelemetry
-from auvsi_suas.patches.simplekml_patch import Kml
+from auvsi_suas.patches.simplekml_patch import Document
+from auvsi_suas.patches.simplekml_patch import Folder
 from auvsi_suas.views.decorators import require_superuser
 from django.contrib.auth.models import User
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse
 from django.utils.decorators import method_decorator
 from django.views.generic import View
+from xml.sax.saxutils import escape
+
+# The namespaces of the exported KML.
+KML_NAMESPACES = ('xmlns="http://www.opengis.net/kml/2.2" '
+                  'xmlns:gx="http://www.google.com/kml/ext/2.2"')
+
+
+def flight_logs(user, flight):
+    """Gets the telemetry of a flight for KML.
+
+    Args:
+        user: The user who flew.
+        flight: The TimePeriod of the flight.
+    Returns:
+        A list of the UasTelemetry elements in the flight, without those too
+        near 0,0.
+    """
+    logs = UasTelemetry.by_user(user)
+    if flight.start is not None:
+        logs = logs.filter(timestamp__gte=flight.start)
+    if flight.end is not None:
+        logs = logs.filter(timestamp__lte=flight.end)
+    return UasTelemetry.kml_filter(logs.iterator())
+
+
+def export_kml_parts():
+    """Generates the export KML a part at a time.
+
+    The document is written incrementally, so only a single flight's
+    telemetry and obstacle paths are held at a time. Each flight is a
+    Document, so the schemas of its obstacle paths are kept with it.
+
+    Yields:
+        The parts of the KML, as UTF-8 strings.
+    """
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n'
+    yield '<kml %s><Document><name>AUVSI SUAS Flight Data</name>' % (
+        KML_NAMESPACES)
+
+    yield '<Folder><name>Teams</name>'
+    obstacles = list(MovingObstacle.objects.all())
+    for user in User.objects.filter(is_superuser=False):
+        yield '<Folder><name>%s</name>' % escape(user.username.encode('utf-8'))
+        flights = TakeoffOrLandingEvent.flights(user)
+        for i, flight in enumerate(flights):
+            label = 'Flight {}'.format(i + 1)  # Flights are one-indexed
+            kml_flight = Document(name=label)
+            UasTelemetry.kml_flight(flight_logs(user, flight), obstacles,
+                                    kml_flight, kml_flight)
+            yield unicode(kml_flight).encode('utf-8')
+        yield '</Folder>'
+    yield '</Folder>'
+
+    kml_mission = Folder(name='Missions')
+    MissionConfig.kml_all(kml_mission)
+    yield unicode(kml_mission).encode('utf-8')
+
+    kml_flyzone = Folder(name='Fly Zones')
+    FlyZone.kml_all(kml_flyzone)
+    yield unicode(kml_flyzone).encode('utf-8')
+
+    yield '</Document></kml>\n'
 
 
 class ExportKml(View):
@@ -17,25 +82,8 @@ class ExportKml(View):
         return super(ExportKml, self).dispatch(*args, **kwargs)
 
     def get(self, request):
-        kml = Kml(name='AUVSI SUAS Flight Data')
-        kml_teams = kml.newfolder(name='Teams')
-        kml_mission = kml.newfolder(name='Missions')
-        users = User.objects.all()
-        for user in users:
-            # Ignore admins
-            if user.is_superuser:
-                continue
-            UasTelemetry.kml(user=user,
-                             logs=UasTelemetry.by_user(user),
-                             kml=kml_teams,
-                             kml_doc=kml.document)
-        MissionConfig.kml_all(kml_mission)
-        kml_flyzone = kml.newfolder(name='Fly Zones')
-        FlyZone.kml_all(kml_flyzone)
-
-        response = HttpResponse(kml.kml())
+        response = StreamingHttpResponse(export_kml_parts())
         response['Content-Type'] = 'application/vnd.google-earth.kml+xml'
         response['Content-Disposition'] = \
             'attachment; filename=%s.kml' % 'mission'
-        response['Content-Length'] = str(len(response.content))
         return response
@@ -1,5 +1,7 @@
 """Tests for the evaluate_teams module."""
 
+from auvsi_suas.models import TakeoffOrLandingEvent
+from auvsi_suas.views.auvsi_admin.export_kml import export_kml_parts
 from django.contrib.auth.models import User
 from django.core.urlresolvers import reverse
 from django.test import TestCase
@@ -75,7 +77,7 @@ class TestGenerateKMLNoFixture(TestGenerateKMLCommon):
         response = self.client.get(self.eval_url)
         self.assertEqual(200, response.status_code)
 
-        kml_data = response.content
+        kml_data = ''.join(response.streaming_content)
         self.validate_kml(kml_data, self.folders, self.users, self.coordinates)
 
 
@@ -118,5 +120,19 @@ class TestGenerateKMLWithFixture(TestGenerateKMLCommon):
         response = self.client.get(self.eval_url)
         self.assertEqual(200, response.status_code)
 
-        kml_data = response.content
+        kml_data = ''.join(response.streaming_content)
         self.validate_kml(kml_data, self.folders, self.users, self.coordinates)
+
+    def test_parts_by_flight(self):
+        """Tests the KML is generated a flight at a time."""
+        parts = list(export_kml_parts())
+        ElementTree.fromstring(''.join(parts))
+
+        flight_parts = [p for p in parts if p.startswith('<Document')]
+        num_flights = sum(
+            len(TakeoffOrLandingEvent.flights(user))
+            for user in User.objects.filter(is_superuser=False))
+        self.assertGreater(num_flights, 0)
+        self.assertEqual(num_flights, len(flight_parts))
+        for part in flight_parts:
+            self.assertIn('<name>Flight ', part)
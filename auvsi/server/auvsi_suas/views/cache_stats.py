@@ -0,0 +1,18 @@
+"""Admin view of the cache statistics."""
+
+from auvsi_suas.views.decorators import require_superuser
+from auvsi_suas.views.obstacles import obstacles_cache
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views.generic import View
+
+
+class CacheStats(View):
+    """Gets the hit statistics of the shared response caches."""
+
+    @method_decorator(require_superuser)
+    def dispatch(self, *args, **kwargs):
+        return super(CacheStats, self).dispatch(*args, **kwargs)
+
+    def get(self, request):
+        return JsonResponse({'obstacles': obstacles_cache.stats()})
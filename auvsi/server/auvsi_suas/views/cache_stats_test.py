@@ -0,0 +1,50 @@
+"""Tests for the cache_stats module."""
+
+import json
+from auvsi_suas.views.obstacles import obstacles_cache
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+
+login_url = reverse('auvsi_suas:login')
+cache_stats_url = reverse('auvsi_suas:cache_stats')
+
+
+class TestCacheStats(TestCase):
+    """Tests the cache stats view."""
+
+    def setUp(self):
+        cache.clear()
+
+    def test_nonadmin(self):
+        """Tests the view responds with error for nonadmin."""
+        User.objects.create_user('testuser', 'email@example.com', 'testpass')
+        response = self.client.post(login_url, {
+            'username': 'testuser',
+            'password': 'testpass'
+        })
+        self.assertEqual(200, response.status_code)
+
+        response = self.client.get(cache_stats_url)
+        self.assertGreaterEqual(response.status_code, 300)
+
+    def test_stats(self):
+        """Tests the hit statistics are given."""
+        User.objects.create_superuser('superuser', 'email@example.com',
+                                      'superpass')
+        response = self.client.post(login_url, {
+            'username': 'superuser',
+            'password': 'superpass'
+        })
+        self.assertEqual(200, response.status_code)
+
+        obstacles_cache.count('hits')
+        obstacles_cache.count('misses')
+
+        response = self.client.get(cache_stats_url)
+        self.assertEqual(200, response.status_code)
+        self.assertEqual({'obstacles': {'hits': 1,
+                                        'misses': 1,
+                                        'hit_ratio': 0.5}},
+                         json.loads(response.content))
@@ -1,18 +1,9 @@
 """Admin view to clear the cache."""
 
-import logging
-from auvsi_suas.models import FlyZone
-from auvsi_suas.models import MissionConfig
-from auvsi_suas.models import MovingObstacle
-from auvsi_suas.models import ServerInfo
-from auvsi_suas.models import StationaryObstacle
-from auvsi_suas.models import Waypoint
 from auvsi_suas.views import logger
 from auvsi_suas.views.decorators import require_superuser
 from django.contrib.auth.decorators import user_passes_test
 from django.core.cache import cache
-from django.db.models.signals import post_save
-from django.dispatch import receiver
 from django.http import HttpResponse
 from django.utils.decorators import method_decorator
 from django.views.generic import View
@@ -29,16 +20,3 @@ class ClearCache(View):
         logger.info('Admin requested to clear the cache.')
         cache.clear()
         return HttpResponse("Cache cleared.")
-
-
-@receiver(post_save, sender=FlyZone)
-@receiver(post_save, sender=MissionConfig)
-@receiver(post_save, sender=MovingObstacle)
-@receiver(post_save, sender=ServerInfo)
-@receiver(post_save, sender=StationaryObstacle)
-@receiver(post_save, sender=Waypoint)
-def clear_cache_on_invalidation(sender, **kwargs):
-    """Clears the cache when certain models are updated."""
-    logging.info('Model saved invalidating caches, clearing them. Model: %s.',
-                 sender)
-    cache.clear()
@@ -3,10 +3,10 @@
 import json
 import logging
 from auvsi_suas.models import MissionConfig
+from auvsi_suas.models.cached_artifact import CachedArtifact
 from auvsi_suas.views import logger
 from auvsi_suas.views.decorators import require_superuser
 from django.contrib.auth.models import User
-from django.core.cache import cache
 from django.http import HttpResponse
 from django.http import HttpResponseBadRequest
 from django.http import HttpResponseServerError
@@ -22,14 +22,14 @@ def active_mission():
         mission, or None if there is an error. HttpResponse is None if a config
         could be obtained, or the error message if not.
     """
-    # First check cache.
-    active_mission_key = '/MissionConfig/active_mission'
-    active_mission = cache.get(active_mission_key)
-    if active_mission:
-        return (active_mission, None)
+    # First check cache. The mission's fields are cached rather than the
+    # model, so the cached value is plain data.
+    fields = active_mission_cache.get()
+    if fields:
+        return (MissionConfig(**fields), None)
 
     # Active mission not cached, query for one.
-    missions = MissionConfig.objects.filter(is_active=True)
+    missions = MissionConfig.objects.filter(is_active=True).values()
     if len(missions) != 1:
         logging.warning('Invalid number of active missions. Missions: %s.',
                         str(missions))
@@ -37,10 +37,16 @@ def active_mission():
                 HttpResponseServerError('Invalid number of active missions.'))
 
     # Add to cache for future requests.
-    active_mission = missions[0]
-    cache.set(active_mission_key, active_mission)
+    fields = missions[0]
+    active_mission_cache.set(fields)
 
-    return (active_mission, None)
+    return (MissionConfig(**fields), None)
+
+
+# The fields of the active mission.
+active_mission_cache = CachedArtifact('MissionConfig/active_mission',
+                                      [MissionConfig],
+                                      rebuild=active_mission)
 
 
 def mission_for_request(request_params):
@@ -109,6 +109,19 @@ class TestMissionForRequest(TestCase):
         recv_config, _ = mission_for_request({})
         self.assertEqual(config, recv_config)
 
+    def test_active_mission_cached(self):
+        """Tests the cached active mission needs no queries."""
+        config = self.create_config()
+        config.is_active = True
+        config.save()
+
+        active_mission()
+        with self.assertNumQueries(0):
+            recv_config, _ = active_mission()
+        self.assertEqual(config.pk, recv_config.pk)
+        self.assertEqual(config.home_pos_id, recv_config.home_pos_id)
+        self.assertEqual(config.home_pos, recv_config.home_pos)
+
 
 class TestMissionsViewLoggedOut(TestCase):
     def test_not_authenticated(self):
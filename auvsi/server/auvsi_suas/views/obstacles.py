@@ -2,20 +2,91 @@
 
 import iso8601
 import json
-from auvsi_suas.models import MovingObstacle
+from auvsi_suas.models import AccessLogBuffer
+from auvsi_suas.models import MissionConfig
 from auvsi_suas.models import ObstacleAccessLog
 from auvsi_suas.models import StationaryObstacle
+from auvsi_suas.models.cached_artifact import CachedArtifact
+from auvsi_suas.models.moving_obstacle import path_cache
+from auvsi_suas.models.epoch import seconds_since_epoch
 from auvsi_suas.views import boolean_param
 from auvsi_suas.views import logger
 from auvsi_suas.views.decorators import require_login
 from auvsi_suas.views.missions import active_mission
-from django.core.cache import cache
+from auvsi_suas.views.time_sliced_cache import TimeSlicedCache
+from django.conf import settings
 from django.http import HttpResponse
 from django.http import HttpResponseBadRequest
-from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views.generic import View
 
+# Buffer for the logs of obstacle downloads.
+access_logs = AccessLogBuffer(ObstacleAccessLog)
+
+
+def obstacles_payload(mission):
+    """Gets the precomputed parts of the obstacle responses for the mission.
+
+    The payload is cached as plain data: a JSON fragment for the stationary
+    obstacles, and the compiled paths of the moving obstacles.
+
+    Args:
+        mission: The MissionConfig of the obstacles.
+    Returns:
+        A tuple (stationary_obstacles_json, moving_obstacle_paths) of the JSON
+        string of the stationary obstacles, and a list of MovingObstaclePath.
+    """
+    def compute_payload():
+        stationary_obstacles = mission.stationary_obstacles.select_related(
+            'gps_position')
+        stationary_obstacles_json = json.dumps(
+            [obst.json() for obst in stationary_obstacles])
+        moving_obstacle_paths = [obst.path()
+                                 for obst in mission.moving_obstacles.all()]
+        return (stationary_obstacles_json, moving_obstacle_paths)
+
+    return payload_cache.get_or_compute(compute_payload, mission.pk)
+
+
+def rebuild_payload():
+    """Computes and caches the obstacle payload of the active mission."""
+    (mission, err) = active_mission()
+    if not err:
+        obstacles_payload(mission)
+
+
+# The obstacle payloads, by mission.
+payload_cache = CachedArtifact(
+    'MissionConfig/obstacles',
+    [MissionConfig, MissionConfig.stationary_obstacles.through,
+     MissionConfig.moving_obstacles.through, StationaryObstacle, path_cache],
+    rebuild=rebuild_payload)
+
+# Cache of the obstacles JSON shared by requests in the same quantum.
+obstacles_cache = TimeSlicedCache(
+    'Obstacles', lambda: settings.OBSTACLES_CACHE_QUANTUM_SEC,
+    dependencies=[payload_cache])
+
+
+def obstacles_json(mission, time):
+    """Forms the obstacles JSON response.
+
+    Args:
+        mission: The MissionConfig of the obstacles.
+        time: The time to give the obstacle positions for.
+    Returns:
+        The JSON string of the obstacles.
+    """
+    (stationary_obstacles_json,
+     moving_obstacle_paths) = obstacles_payload(mission)
+
+    times = seconds_since_epoch([time])
+    moving_obstacles_json = [path.json(times)[0]
+                             for path in moving_obstacle_paths]
+
+    return '{"stationary_obstacles": %s, "moving_obstacles": %s}' % (
+        stationary_obstacles_json, json.dumps(moving_obstacles_json))
+
 
 class Obstacles(View):
     """Gets the obstacle information as JSON with a GET request."""
@@ -26,7 +97,7 @@ class Obstacles(View):
 
     def get(self, request):
         log_access = True
-        time = timezone.now()
+        time = None
 
         # ?log=(true|false) to enable/disable logging of superusers
         if 'log' in request.GET:
@@ -55,50 +126,19 @@ class Obstacles(View):
         logger.info('User downloaded obstacle info: %s.' %
                     request.user.username)
         if log_access:
-            ObstacleAccessLog(user=request.user).save()
+            access_logs.log(request.user)
 
         # Get active mission for forming responses.
         (mission, err) = active_mission()
         if err:
             return err
 
-        # Form JSON response portion for stationary obstacles
-        stationary_obstacles_cached = True
-        stationary_obstacles_key = '/StationaryObstacle/all'
-        stationary_obstacles = cache.get(stationary_obstacles_key)
-        if stationary_obstacles is None:
-            stationary_obstacles = mission.stationary_obstacles.all()
-            stationary_obstacles_cached = False
-        stationary_obstacles_json = []
-        for cur_obst in stationary_obstacles:
-            # Add current obstacle
-            cur_obst_json = cur_obst.json()
-            stationary_obstacles_json.append(cur_obst_json)
-
-        # Form JSON response portion for moving obstacles
-        moving_obstacles_cached = True
-        moving_obstacles_key = '/MovingObstacle/all'
-        moving_obstacles = cache.get(moving_obstacles_key)
-        if moving_obstacles is None:
-            moving_obstacles = mission.moving_obstacles.all()
-            moving_obstacles_cached = False
-        moving_obstacles_json = []
-        for cur_obst in moving_obstacles:
-            # Add current obstacle
-            cur_obst_json = cur_obst.json(time=time)
-            moving_obstacles_json.append(cur_obst_json)
-
-        # Form final JSON response
-        data = {
-            'stationary_obstacles': stationary_obstacles_json,
-            'moving_obstacles': moving_obstacles_json
-        }
-
-        # Cache obstacles for next request
-        if not stationary_obstacles_cached:
-            cache.set(stationary_obstacles_key, stationary_obstacles)
-        if not moving_obstacles_cached:
-            cache.set(moving_obstacles_key, moving_obstacles)
+        # Requests without a time share the response for the time quantum.
+        if time is None:
+            data = obstacles_cache.get(
+                lambda start: obstacles_json(mission, start))
+        else:
+            data = obstacles_json(mission, time)
 
         # Return JSON data
-        return HttpResponse(json.dumps(data), content_type="application/json")
+        return HttpResponse(data, content_type="application/json")
@@ -140,6 +140,7 @@ class TestObstaclesViewCommon(TestCase):
             (38.148522, -76.419507, 750),
         ])
         config.moving_obstacles.add(obst)
+        self.moving_obstacle = obst
 
         config.save()
 
@@ -201,6 +202,8 @@ class TestObstaclesView(TestObstaclesViewCommon):
 
         data1 = json.loads(response.content)
 
+        # Wait for the next quantum, which has its own response.
+        time.sleep(settings.OBSTACLES_CACHE_QUANTUM_SEC)
         response = self.client.get(obstacle_url)
         self.assertEqual(200, response.status_code)
 
@@ -208,6 +211,37 @@ class TestObstaclesView(TestObstaclesViewCommon):
 
         self.assertNotEqual(data1, data2)
 
+    def test_shared_response(self):
+        """Responses in the same quantum are shared by all users."""
+        with self.settings(OBSTACLES_CACHE_QUANTUM_SEC=1000):
+            response = self.client.get(obstacle_url)
+            self.assertEqual(200, response.status_code)
+
+            client = Client()
+            User.objects.create_user('user2', 'email@example.com', 'pass')
+            client.post(login_url, {'username': 'user2', 'password': 'pass'})
+            shared_response = client.get(obstacle_url)
+            self.assertEqual(200, shared_response.status_code)
+
+        self.assertEqual(response.content, shared_response.content)
+        self.assertEqual(2, len(ObstacleAccessLog.objects.all()))
+
+    def test_obstacle_changed(self):
+        """Responses are invalidated when an obstacle changes."""
+        with self.settings(OBSTACLES_CACHE_QUANTUM_SEC=1000):
+            response = self.client.get(obstacle_url)
+            self.assertEqual(200, response.status_code)
+
+            self.moving_obstacle.sphere_radius = 42
+            self.moving_obstacle.save()
+            changed_response = self.client.get(obstacle_url)
+            self.assertEqual(200, changed_response.status_code)
+
+        radii = [obst['sphere_radius'] for obst in json.loads(
+            changed_response.content)['moving_obstacles']]
+        self.assertIn(42, radii)
+        self.assertNotEqual(response.content, changed_response.content)
+
     def test_no_time(self):
         """Normal users cannot set time."""
         response = self.client.get(obstacle_url, {
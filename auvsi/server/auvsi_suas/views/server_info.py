@@ -2,17 +2,61 @@
 
 import datetime
 import json
-from auvsi_suas.models import ServerInfo
+from auvsi_suas.models import AccessLogBuffer
+from auvsi_suas.models import MissionConfig
+from auvsi_suas.models import ServerInfo as ServerInfoModel
 from auvsi_suas.models import ServerInfoAccessLog
+from auvsi_suas.models.cached_artifact import CachedArtifact
 from auvsi_suas.views import logger
 from auvsi_suas.views.decorators import require_login
 from auvsi_suas.views.missions import active_mission
-from django.core.cache import cache
 from django.http import HttpResponseServerError
 from django.http import JsonResponse
 from django.utils.decorators import method_decorator
 from django.views.generic import View
 
+# Buffer for the logs of server info downloads.
+access_logs = AccessLogBuffer(ServerInfoAccessLog)
+
+
+def server_info_json():
+    """Gets the JSON of the active mission's server info.
+
+    The JSON is cached rather than the model, so the cached value is plain
+    data.
+
+    Returns:
+        (dict, HttpResponse). The dict is the ServerInfo JSON, or None if
+        there is an error. HttpResponse is None if the JSON could be
+        obtained, or the error message if not.
+    """
+    info_json = server_info_cache.get()
+    if info_json is not None:
+        return (info_json, None)
+
+    try:
+        # Get the server info stored in the active mission.
+        (mission, err) = active_mission()
+        if err:
+            return (None, err)
+        info = mission.server_info
+        if not info:
+            return (None,
+                    HttpResponseServerError('No server info for mission.'))
+    except ServerInfoModel.DoesNotExist:
+        # Failed to obtain server info.
+        return (None, HttpResponseServerError('No server info available.'))
+
+    info_json = info.json()
+    server_info_cache.set(info_json)
+    return (info_json, None)
+
+
+# The JSON of the active mission's server info.
+server_info_cache = CachedArtifact('ServerInfo/active_mission',
+                                   [MissionConfig, ServerInfoModel],
+                                   rebuild=server_info_json)
+
 
 class ServerInfo(View):
     """Gets the server information as JSON with a GET request."""
@@ -24,27 +68,12 @@ class ServerInfo(View):
     def get(self, request):
         # Log user access to server information.
         logger.info('User downloaded server info: %s.' % request.user.username)
-        ServerInfoAccessLog(user=request.user).save()
+        access_logs.log(request.user)
 
         # Form response.
-        try:
-            # Get the server info stored in the active mission.
-            server_info_key = '/ServerInfo/latest'
-            info = cache.get(server_info_key)
-            if info is None:
-                (mission, err) = active_mission()
-                if err:
-                    return err
-                info = mission.server_info
-                if not info:
-                    return HttpResponseServerError(
-                        'No server info for mission.')
-                cache.set(server_info_key, info)
-        except ServerInfo.DoesNotExist:
-            # Failed to obtain server info.
-            return HttpResponseServerError('No server info available.')
-
-        # Form JSON response.
-        data = info.json()
+        (info_json, err) = server_info_json()
+        if err:
+            return err
+        data = dict(info_json)
         data['server_time'] = datetime.datetime.now().isoformat()
         return JsonResponse(data)
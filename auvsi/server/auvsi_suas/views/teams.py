@@ -1,4 +1,5 @@
 """Teams view."""
+import datetime
 import json
 from auvsi_suas.models import UasTelemetry
 from auvsi_suas.models import TakeoffOrLandingEvent
@@ -7,6 +8,7 @@ from auvsi_suas.views.decorators import require_superuser
 from django.contrib.auth.models import User
 from django.http import HttpResponse
 from django.http import HttpResponseBadRequest
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views.generic import View
 
@@ -21,6 +23,47 @@ def user_json(user):
     }
 
 
+def telemetry_json(state):
+    """Generate JSON-style dict for last known telemetry, or None."""
+    if state is None:
+        return None
+    return {
+        'timestamp': state['timestamp'].isoformat(),
+        'latitude': state['latitude'],
+        'longitude': state['longitude'],
+        'altitude_msl': state['altitude_msl'],
+        'heading': state['uas_heading'],
+        'rate': state['rate'],
+    }
+
+
+def teams_json(users):
+    """Generate JSON-style dicts for users.
+
+    The status of all the users is found from cached state, seeded with a
+    constant number of queries. Users are active if their last known
+    telemetry is newer than the active period of UasTelemetry.user_active().
+    Telemetry timestamped after now, as a clock slightly ahead may give,
+    still counts as active.
+    """
+    now = timezone.now()
+    since = now - datetime.timedelta(seconds=10)
+    last_known = UasTelemetry.last_known(users)
+    flight_indexes = TakeoffOrLandingEvent.flight_indexes(users)
+
+    teams = []
+    for user in users:
+        state = last_known[user.pk]
+        teams.append({
+            'name': user.username,
+            'id': user.pk,
+            'in_air': flight_indexes[user.pk].in_air(now),
+            'active': state is not None and state['timestamp'] > since,
+            'telemetry': telemetry_json(state),
+        })
+    return teams
+
+
 class Teams(View):
     """Gets a list of all teams."""
 
@@ -29,13 +72,9 @@ class Teams(View):
         return super(Teams, self).dispatch(*args, **kwargs)
 
     def get(self, request):
-        users = User.objects.all()
-        teams = []
-
-        for user in users:
-            # Only standard users are exported
-            if not user.is_superuser:
-                teams.append(user_json(user))
+        # Only standard users are exported
+        users = list(User.objects.filter(is_superuser=False))
+        teams = teams_json(users)
 
         return HttpResponse(json.dumps(teams), content_type="application/json")
 
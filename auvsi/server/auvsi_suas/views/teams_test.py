@@ -1,14 +1,19 @@
 """Tests for the teams module."""
 
+import datetime
 import functools
+import iso8601
 import json
 from auvsi_suas.models import AerialPosition
 from auvsi_suas.models import GpsPosition
 from auvsi_suas.models import TakeoffOrLandingEvent
 from auvsi_suas.models import UasTelemetry
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
 login_url = reverse('auvsi_suas:login')
@@ -138,6 +143,59 @@ class TestTeamsView(TestCase):
         self.assertEqual(False, user2['in_air'])
         self.assertEqual(True, user2['active'])
 
+    def test_active_ahead(self):
+        """Telemetry timestamped slightly in the future is active."""
+        self.create_data()
+        telem = UasTelemetry.objects.get(user=self.user2)
+        telem.timestamp = timezone.now() + datetime.timedelta(seconds=2)
+        telem.save()
+
+        response = self.client.get(teams_url)
+        self.assertEqual(200, response.status_code)
+
+        data = json.loads(response.content)
+        names = [d['name'] for d in data]
+        self.assertEqual(True, data[names.index('user2')]['active'])
+
+    def test_telemetry(self):
+        """Last known telemetry of each user."""
+        self.create_data()
+
+        response = self.client.get(teams_url)
+        self.assertEqual(200, response.status_code)
+
+        data = json.loads(response.content)
+        names = [d['name'] for d in data]
+
+        self.assertIsNone(data[names.index('user1')]['telemetry'])
+
+        telemetry = data[names.index('user2')]['telemetry']
+        self.assertEqual(self.timestamp,
+                         iso8601.parse_date(telemetry['timestamp']))
+        self.assertEqual(38.6462, telemetry['latitude'])
+        self.assertEqual(-76.2452, telemetry['longitude'])
+        self.assertEqual(0, telemetry['altitude_msl'])
+        self.assertEqual(90, telemetry['heading'])
+
+    def num_queries(self):
+        """Gets the number of queries for the teams, with a cold cache."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(teams_url)
+        self.assertEqual(200, response.status_code)
+        return len(queries)
+
+    def test_constant_queries(self):
+        """The number of queries doesn't grow with the teams."""
+        self.create_data()
+        num_queries = self.num_queries()
+
+        for i in xrange(10):
+            user = User.objects.create_user('team%d' % i, 'email@example.com',
+                                            'testpass')
+            TakeoffOrLandingEvent(user=user, uas_in_air=True).save()
+        self.assertEqual(num_queries, self.num_queries())
+
 
 class TestTeamsIdViewLoggedOut(TestCase):
     def test_not_authenticated(self):
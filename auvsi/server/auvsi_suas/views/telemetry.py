@@ -1,19 +1,122 @@
 """Telemetry view."""
 
+import base64
 import iso8601
 import json
-from auvsi_suas.models import AerialPosition
-from auvsi_suas.models import GpsPosition
+import time
 from auvsi_suas.models import UasTelemetry
 from auvsi_suas.views import logger
 from auvsi_suas.views.decorators import require_login
 from auvsi_suas.views.decorators import require_superuser
+from auvsi_suas.views.missions import active_mission
+from auvsi_suas.views.telemetry_feed import TelemetryFeed
+from django.conf import settings
 from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Max
+from django.db.models import Q
 from django.http import HttpResponse
 from django.http import HttpResponseBadRequest
+from django.http import JsonResponse
+from django.http import StreamingHttpResponse
+from django.utils import timezone
 from django.utils.decorators import method_decorator
 from django.views.generic import View
 
+# Uploaded telemetry, published to the telemetry streams in this process.
+telemetry_feed = TelemetryFeed(lambda: settings.TELEMETRY_STREAM_MAX_PENDING)
+
+# Violations started by uploaded telemetry, published to the violation streams
+# in this process.
+violation_feed = TelemetryFeed(lambda: settings.TELEMETRY_STREAM_MAX_PENDING)
+
+
+def normalize_sample(data):
+    """Convert a batched telemetry sample to native Python types.
+
+    Args:
+        data: JSON-converted dictionary for a single telemetry sample.
+    Returns:
+        A (timestamp, latitude, longitude, altitude_msl, uas_heading) tuple.
+    Raises:
+        ValueError: Parameter missing, not convertable or out-of-range.
+    """
+    if not isinstance(data, dict):
+        raise ValueError('Sample must be an object.')
+
+    try:
+        timestamp = iso8601.parse_date(data['timestamp'])
+        latitude = float(data['latitude'])
+        longitude = float(data['longitude'])
+        altitude_msl = float(data['altitude_msl'])
+        uas_heading = float(data['uas_heading'])
+    except KeyError as e:
+        raise ValueError('Sample missing parameter %s.' % e)
+    except (TypeError, ValueError, iso8601.ParseError):
+        raise ValueError('Failed to convert sample to correct form.')
+
+    if timestamp > timezone.now():
+        raise ValueError('Sample timestamp is in the future.')
+    if latitude < -90 or latitude > 90:
+        raise ValueError('Must provide latitude between -90 and 90 degrees.')
+    if longitude < -180 or longitude > 180:
+        raise ValueError(
+            'Must provide longitude between -180 and 180 degrees.')
+    if uas_heading < 0 or uas_heading > 360:
+        raise ValueError('Must provide heading between 0 and 360 degrees.')
+
+    return (timestamp, latitude, longitude, altitude_msl, uas_heading)
+
+
+def monitor_telemetry(logs):
+    """Checks uploaded telemetry for violations of the active mission.
+
+    Alerts for the violations started by the telemetry are published to the
+    violation streams.
+
+    Args:
+        logs: A list of UasTelemetry logs.
+    """
+    (mission, _) = active_mission()
+    if mission is None:
+        return
+    alerts = mission.monitor_telemetry(logs)
+    for (log, alert) in alerts:
+        logger.warning('User %s violation: %s %s' %
+                       (log.user.username, alert['violation'], alert['id']))
+    violation_feed.publish_messages([(log.user_id, dict(
+        alert, user=log.user_id, timestamp=log.timestamp.isoformat()))
+                                     for (log, alert) in alerts])
+
+
+def encode_cursor(timestamp, pk):
+    """Encodes the position of a telemetry log as an opaque cursor.
+
+    Args:
+        timestamp: The timestamp of the log.
+        pk: The id of the log.
+    Returns:
+        The cursor string.
+    """
+    return base64.urlsafe_b64encode(json.dumps([timestamp, pk]))
+
+
+def decode_cursor(cursor):
+    """Decodes a cursor made by encode_cursor.
+
+    Args:
+        cursor: The cursor string.
+    Returns:
+        A (timestamp, pk) tuple.
+    Raises:
+        ValueError: The cursor is not valid.
+    """
+    try:
+        (timestamp, pk) = json.loads(base64.urlsafe_b64decode(str(cursor)))
+        return (iso8601.parse_date(timestamp), int(pk))
+    except (TypeError, ValueError, iso8601.ParseError):
+        raise ValueError('Invalid cursor.')
+
 
 class Telemetry(View):
     """GET/POST telemetry."""
@@ -71,21 +174,29 @@ class Telemetry(View):
             # Store telemetry
             logger.info('User uploaded telemetry: %s' % request.user.username)
 
-            gpos = GpsPosition(latitude=latitude, longitude=longitude)
-            gpos.save()
-
-            apos = AerialPosition(gps_position=gpos, altitude_msl=altitude_msl)
-            apos.save()
-
             telemetry = UasTelemetry(user=request.user,
-                                     uas_position=apos,
+                                     latitude=latitude,
+                                     longitude=longitude,
+                                     altitude_msl=altitude_msl,
                                      uas_heading=uas_heading)
             telemetry.save()
+            telemetry_feed.publish([telemetry])
+            monitor_telemetry([telemetry])
 
             return HttpResponse('UAS Telemetry Successfully Posted.')
 
     @method_decorator(require_superuser)
     def get(self, request):
+        """Gets telemetry, filtered by the optional parameters.
+
+        limit: The max number of logs returned, 100 by default.
+        user: The id of the user to get telemetry for.
+        since: Only logs after this ISO 8601 time are returned.
+        before: Only logs before this ISO 8601 time are returned.
+        cursor: If given, returns an object with the page of "telemetry"
+            after the cursor, oldest first, and the "cursor" of the next
+            page. Without a cursor, a list of the latest logs is returned.
+        """
         limit = 100
         user = None
         since = None
@@ -126,10 +237,7 @@ class Telemetry(View):
                 return HttpResponseBadRequest("Bad timestamp '%s'" % \
                                                 request.GET['before'])
 
-        # Prefetch data from all ForeignKeys (e.g., AerialPosition) when
-        # evaluating the query.  This allows us to avoid making hundreds
-        # of other queries as we access all of those fields.
-        query = UasTelemetry.objects.select_related()
+        query = UasTelemetry.objects.all()
 
         if user:
             query = query.filter(user=user)
@@ -140,9 +248,205 @@ class Telemetry(View):
         if before:
             query = query.filter(timestamp__lt=before)
 
-        logs = query.order_by('-timestamp').all()[:limit]
+        if 'cursor' not in request.GET:
+            response = UasTelemetry.json_values(
+                query.order_by('-timestamp')[:limit])
+            return HttpResponse(json.dumps(response),
+                                content_type="application/json")
+
+        # With a cursor, pages of telemetry are returned in ascending order,
+        # continuing after the log at the cursor. An empty cursor starts with
+        # the first log.
+        cursor = request.GET['cursor']
+        if cursor:
+            try:
+                (timestamp, pk) = decode_cursor(cursor)
+            except ValueError:
+                return HttpResponseBadRequest("Invalid cursor '%s'" % cursor)
+            query = query.filter(Q(timestamp__gt=timestamp) |
+                                 Q(timestamp=timestamp, pk__gt=pk))
+
+        logs = UasTelemetry.json_values(
+            query.order_by('timestamp', 'pk')[:limit])
+        if logs:
+            cursor = encode_cursor(logs[-1]['timestamp'], logs[-1]['id'])
+
+        return JsonResponse({'telemetry': logs, 'cursor': cursor})
+
+
+class TelemetryBatch(View):
+    """POST a batch of timestamped telemetry samples."""
+
+    @method_decorator(require_login)
+    def dispatch(self, *args, **kwargs):
+        return super(TelemetryBatch, self).dispatch(*args, **kwargs)
+
+    def post(self, request):
+        """Posts a list of UAS positions as a JSON array.
+
+        Each sample must contain "timestamp" (ISO 8601), "latitude",
+        "longitude", "altitude_msl" and "uas_heading". Samples are validated
+        individually; valid samples are stored in a single transaction and
+        invalid samples are reported by their index in the batch.
+        """
+        try:
+            samples = json.loads(request.body)
+        except ValueError:
+            return HttpResponseBadRequest('Invalid JSON: %s' % request.body)
+
+        if not isinstance(samples, list):
+            return HttpResponseBadRequest('Batch must be a JSON array.')
+        if len(samples) > settings.TELEMETRY_BATCH_MAX_SAMPLES:
+            return HttpResponseBadRequest(
+                'Batch may contain at most %d samples.' %
+                settings.TELEMETRY_BATCH_MAX_SAMPLES)
+
+        # Validate each sample, keeping the valid ones for storage.
+        valid = []
+        errors = []
+        for i, sample in enumerate(samples):
+            try:
+                valid.append(normalize_sample(sample))
+            except ValueError as e:
+                errors.append({'index': i, 'error': str(e)})
+
+        if errors:
+            logger.warning('User %s sent %d invalid telemetry samples.' %
+                           (request.user.username, len(errors)))
+
+        # Store telemetry with a single insert in a single transaction.
+        logger.info('User uploaded %d telemetry samples: %s' %
+                    (len(valid), request.user.username))
+        logs = [UasTelemetry(user=request.user,
+                             timestamp=timestamp,
+                             latitude=latitude,
+                             longitude=longitude,
+                             altitude_msl=altitude_msl,
+                             uas_heading=uas_heading)
+                for (timestamp, latitude, longitude, altitude_msl,
+                     uas_heading) in valid]
+        with transaction.atomic():
+            last_pk = UasTelemetry.objects.aggregate(pk=Max('pk'))['pk']
+            UasTelemetry.objects.bulk_create(logs)
+            if logs:
+                # Bulk created logs aren't given their ids, which are needed
+                # by the streams, so read the logs back. They are the user's
+                # logs in the batch's time range inserted after the last.
+                timestamps = [log.timestamp for log in logs]
+                logs = list(UasTelemetry.objects.filter(
+                    user=request.user,
+                    pk__gt=last_pk or 0,
+                    timestamp__gte=min(timestamps),
+                    timestamp__lte=max(timestamps)).order_by('pk'))
+        UasTelemetry.update_last_known(logs)
+        telemetry_feed.publish(logs)
+        monitor_telemetry(logs)
+
+        return JsonResponse({'accepted': len(valid), 'errors': errors})
+
+
+def telemetry_events(user_id, feed=telemetry_feed):
+    """Generates server-sent events for telemetry as it is uploaded.
+
+    Each event's data is a telemetry log as returned by Telemetry GET. When
+    no telemetry is uploaded a comment is sent to keep the connection open.
+    Each stream holds a server thread, so it ends after a time and the client
+    reconnects.
+
+    Args:
+        user_id: The id of the user to stream telemetry for, or None to
+            stream telemetry for all users.
+        feed: The feed to stream, by default the uploaded telemetry.
+    """
+    subscription = feed.subscribe(user_id)
+    try:
+        yield 'retry: %d\n\n' % (settings.TELEMETRY_STREAM_RETRY_SEC * 1000)
+
+        end = time.time() + settings.TELEMETRY_STREAM_MAX_SEC
+        while True:
+            remaining = end - time.time()
+            if remaining <= 0:
+                break
+            messages = subscription.wait(
+                min(remaining, settings.TELEMETRY_STREAM_KEEPALIVE_SEC))
+            if messages:
+                yield ''.join('data: %s\n\n' % m for m in messages)
+            else:
+                yield ': keepalive\n\n'
+    finally:
+        subscription.close()
+
+
+class TelemetryStream(View):
+    """GET a stream of telemetry as it is uploaded."""
+
+    # The feed streamed by the view.
+    feed = telemetry_feed
+
+    @method_decorator(require_superuser)
+    def get(self, request):
+        """Streams telemetry as server-sent events.
+
+        Takes an optional "user" parameter, the id of the user to stream
+        telemetry for. Otherwise telemetry for all users is streamed.
+        """
+        user_id = None
+        if 'user' in request.GET:
+            try:
+                user_id = int(request.GET['user'])
+            except (TypeError, ValueError):
+                return HttpResponseBadRequest("Invalid user '%s'" % \
+                                                request.GET['user'])
+            if not User.objects.filter(pk=user_id).exists():
+                return HttpResponseBadRequest("Unknown user '%s'" % \
+                                                request.GET['user'])
+
+        response = StreamingHttpResponse(telemetry_events(user_id,
+                                                          self.feed),
+                                         content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+
+class TelemetryViolations(View):
+    """GET the teams' violations of the active mission so far."""
+
+    @method_decorator(require_superuser)
+    def get(self, request):
+        """Gets the violations found as each team's telemetry was uploaded.
+
+        The violations are found during flights, as telemetry is uploaded, so
+        they are read without evaluating the teams. The evaluate teams export
+        remains the official evaluation.
+        """
+        (mission, error) = active_mission()
+        if error:
+            return error
+
+        users = list(User.objects.filter(is_superuser=False).order_by('pk'))
+        states = mission.violations(users)
+        teams = []
+        for user in users:
+            state = states[user.pk]
+            teams.append({
+                'id': user.pk,
+                'name': user.username,
+                'out_of_bounds': (state['last'] is not None and
+                                  not state['last'][4]),
+                'out_of_bounds_time': state['out_of_bounds_time'],
+                'out_of_bounds_violations':
+                state['out_of_bounds_violations'],
+                'stationary_obst_collision':
+                sorted(state['stationary_obst_collision']),
+                'moving_obst_collision':
+                sorted(state['moving_obst_collision']),
+            })
+        return JsonResponse(teams, safe=False)
+
 
-        response = [l.json() for l in logs]
+class TelemetryViolationStream(TelemetryStream):
+    """GET a stream of violations as telemetry is uploaded."""
 
-        return HttpResponse(json.dumps(response),
-                            content_type="application/json")
+    # Each event's data is an alert from MissionConfig.monitor_telemetry(),
+    # with the 'user' and the 'timestamp' of the telemetry.
+    feed = violation_feed
@@ -0,0 +1,110 @@
+"""Feed of telemetry as it is uploaded, for live consumers."""
+
+import collections
+import json
+import threading
+import time
+
+
+class TelemetryFeed(object):
+    """Publishes uploaded telemetry to the subscribers in this process.
+
+    The telemetry views publish each uploaded log, which is serialized once
+    and the same message given to every subscriber, so streaming to many
+    consumers costs no queries. Subscribers only see telemetry uploaded to
+    the process they are subscribed in.
+
+    Each subscriber keeps a bounded queue of pending messages. A subscriber
+    which falls behind loses its oldest messages rather than holding memory
+    for telemetry it may never read.
+    """
+
+    def __init__(self, max_pending):
+        """Creates the feed.
+
+        Args:
+            max_pending: A function returning the max number of messages
+                pending for each subscriber.
+        """
+        self.max_pending = max_pending
+        self.subscribers = set()
+        # Guards subscribers and their queues, notified on publish.
+        self.cv = threading.Condition()
+
+    def subscribe(self, user_id=None):
+        """Subscribes to the feed.
+
+        Args:
+            user_id: The id of the user to receive telemetry for, or None to
+                receive telemetry for all users.
+        Returns:
+            A Subscription, which must be closed when no longer used.
+        """
+        subscription = Subscription(self, user_id,
+                                    collections.deque(
+                                        maxlen=self.max_pending()))
+        with self.cv:
+            self.subscribers.add(subscription)
+        return subscription
+
+    def publish(self, logs):
+        """Publishes uploaded telemetry to the subscribers.
+
+        Args:
+            logs: A list of UasTelemetry logs.
+        """
+        if not self.subscribers:
+            return
+        self.publish_messages([(log.user_id, log.json()) for log in logs])
+
+    def publish_messages(self, messages):
+        """Publishes messages about users to the subscribers.
+
+        Args:
+            messages: A list of (user_id, data) tuples, where data is a
+                JSON-style dict.
+        """
+        if not self.subscribers:
+            return
+        messages = [(user_id, json.dumps(data))
+                    for (user_id, data) in messages]
+        with self.cv:
+            for subscription in self.subscribers:
+                subscription.pending.extend(
+                    message for (user_id, message) in messages
+                    if subscription.user_id in (None, user_id))
+            self.cv.notify_all()
+
+
+class Subscription(object):
+    """A subscription to a TelemetryFeed."""
+
+    def __init__(self, feed, user_id, pending):
+        self.feed = feed
+        self.user_id = user_id
+        self.pending = pending
+
+    def wait(self, timeout):
+        """Waits for messages to be published.
+
+        Args:
+            timeout: The max seconds to wait.
+        Returns:
+            A list of the messages published since the last wait, which is
+            empty if none were published before the timeout.
+        """
+        deadline = time.time() + timeout
+        with self.feed.cv:
+            while not self.pending:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return []
+                self.feed.cv.wait(remaining)
+            messages = list(self.pending)
+            self.pending.clear()
+            return messages
+
+    def close(self):
+        """Unsubscribes from the feed."""
+        with self.feed.cv:
+            self.feed.subscribers.discard(self)
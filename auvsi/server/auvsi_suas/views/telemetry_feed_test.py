@@ -0,0 +1,65 @@
+"""Tests for the telemetry_feed module."""
+
+import json
+import threading
+from auvsi_suas.models import UasTelemetry
+from auvsi_suas.views.telemetry_feed import TelemetryFeed
+from django.contrib.auth.models import User
+from django.test import TestCase
+
+
+class TestTelemetryFeed(TestCase):
+    """Tests the TelemetryFeed."""
+
+    def setUp(self):
+        self.user1 = User.objects.create_user('user1', 'email@example.com',
+                                              'pass')
+        self.user2 = User.objects.create_user('user2', 'email@example.com',
+                                              'pass')
+        self.feed = TelemetryFeed(lambda: 3)
+
+    def log(self, user, latitude=0):
+        """Creates an unsaved telemetry log."""
+        return UasTelemetry(user=user,
+                            latitude=latitude,
+                            longitude=0,
+                            altitude_msl=0,
+                            uas_heading=0)
+
+    def latitudes(self, messages):
+        """Gets the latitudes of the published messages."""
+        return [json.loads(m)['latitude'] for m in messages]
+
+    def test_publish(self):
+        """Subscribers receive telemetry for their user."""
+        all_users = self.feed.subscribe()
+        user1 = self.feed.subscribe(self.user1.pk)
+
+        self.feed.publish([self.log(self.user1, 1), self.log(self.user2, 2)])
+        self.assertEqual([1, 2], self.latitudes(all_users.wait(0)))
+        self.assertEqual([1], self.latitudes(user1.wait(0)))
+        self.assertEqual([], all_users.wait(0))
+
+    def test_wait(self):
+        """Waiting subscribers are woken by published telemetry."""
+        subscription = self.feed.subscribe()
+        timer = threading.Timer(
+            0.05, lambda: self.feed.publish([self.log(self.user1, 1)]))
+        timer.start()
+        self.assertEqual([1], self.latitudes(subscription.wait(10)))
+        timer.join()
+
+    def test_max_pending(self):
+        """Subscribers which fall behind drop their oldest telemetry."""
+        subscription = self.feed.subscribe()
+        self.feed.publish([self.log(self.user1, i) for i in xrange(5)])
+        self.assertEqual([2, 3, 4], self.latitudes(subscription.wait(0)))
+
+    def test_close(self):
+        """Closed subscriptions no longer receive telemetry."""
+        subscription = self.feed.subscribe()
+        subscription.close()
+        self.assertEqual(set(), self.feed.subscribers)
+
+        self.feed.publish([self.log(self.user1)])
+        self.assertEqual([], subscription.wait(0))
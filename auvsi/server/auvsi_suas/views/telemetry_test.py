@@ -6,15 +6,24 @@ import json
 import time
 from auvsi_suas.models import AerialPosition
 from auvsi_suas.models import GpsPosition
+from auvsi_suas.models import StationaryObstacle
+from auvsi_suas.models import TakeoffOrLandingEvent
 from auvsi_suas.models import UasTelemetry
 from django.conf import settings
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from django.core.urlresolvers import reverse
+from django.test import Client
 from django.test import TestCase
 from django.utils import timezone
 
 login_url = reverse('auvsi_suas:login')
 telemetry_url = reverse('auvsi_suas:telemetry')
+telemetry_batch_url = reverse('auvsi_suas:telemetry_batch')
+telemetry_stream_url = reverse('auvsi_suas:telemetry_stream')
+telemetry_violations_url = reverse('auvsi_suas:telemetry_violations')
+telemetry_violation_stream_url = reverse(
+    'auvsi_suas:telemetry_violation_stream')
 
 
 class TestTelemetryViewLoggedOut(TestCase):
@@ -144,6 +153,119 @@ class TestTelemetryPost(TestCase):
                                 settings.TEST_LOADTEST_INTEROP_MIN_RATE)
 
 
+class TestTelemetryBatchPost(TestCase):
+    """Tests the TelemetryBatch view POST."""
+
+    def setUp(self):
+        """Sets up the client and user."""
+        self.user = User.objects.create_user('testuser', 'testemail@x.com',
+                                             'testpass')
+        self.user.save()
+
+        response = self.client.post(login_url, {
+            'username': 'testuser',
+            'password': 'testpass'
+        })
+        self.assertEqual(200, response.status_code)
+
+        self.year2000 = datetime.datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+    def sample(self, i, **kwargs):
+        """Creates a valid sample, with optional overrides."""
+        data = {
+            'timestamp': (self.year2000 + datetime.timedelta(seconds=i)
+                          ).isoformat(),
+            'latitude': 38 + 0.001 * i,
+            'longitude': -76,
+            'altitude_msl': 100,
+            'uas_heading': 90,
+        }
+        data.update(kwargs)
+        return data
+
+    def post_batch(self, samples):
+        return self.client.post(telemetry_batch_url,
+                                data=json.dumps(samples),
+                                content_type='application/json')
+
+    def test_not_authenticated(self):
+        """Tests requests that have not yet been authenticated."""
+        self.client.logout()
+        response = self.post_batch([self.sample(0)])
+        self.assertEqual(403, response.status_code)
+
+    def test_invalid_body(self):
+        """Tests bodies which are not JSON arrays."""
+        response = self.client.post(telemetry_batch_url,
+                                    data='Hi!',
+                                    content_type='application/json')
+        self.assertEqual(400, response.status_code)
+
+        response = self.post_batch(self.sample(0))
+        self.assertEqual(400, response.status_code)
+
+    def test_too_many_samples(self):
+        """Tests a batch over the size limit."""
+        with self.settings(TELEMETRY_BATCH_MAX_SAMPLES=2):
+            response = self.post_batch([self.sample(i) for i in range(3)])
+        self.assertEqual(400, response.status_code)
+        self.assertEqual(0, UasTelemetry.objects.count())
+
+    def test_upload_and_store(self):
+        """Tests correct upload and storage of a batch."""
+        response = self.post_batch([self.sample(i) for i in range(10)])
+        self.assertEqual(200, response.status_code)
+
+        data = json.loads(response.content)
+        self.assertEqual(10, data['accepted'])
+        self.assertEqual([], data['errors'])
+
+        logs = UasTelemetry.by_user(self.user)
+        self.assertEqual(10, len(logs))
+        for i, log in enumerate(logs):
+            self.assertEqual(self.year2000 + datetime.timedelta(seconds=i),
+                             log.timestamp)
+            self.assertAlmostEqual(38 + 0.001 * i,
+                                   log.uas_position.gps_position.latitude)
+            self.assertEqual(-76, log.uas_position.gps_position.longitude)
+            self.assertEqual(100, log.uas_position.altitude_msl)
+            self.assertEqual(90, log.uas_heading)
+
+    def test_last_known(self):
+        """Tests the batch updates the last known telemetry."""
+        self.assertIsNone(UasTelemetry.last_known([self.user])[self.user.pk])
+
+        response = self.post_batch([self.sample(i) for i in range(3)])
+        self.assertEqual(200, response.status_code)
+
+        state = UasTelemetry.last_known([self.user])[self.user.pk]
+        self.assertEqual(self.year2000 + datetime.timedelta(seconds=2),
+                         state['timestamp'])
+        self.assertAlmostEqual(38.002, state['latitude'])
+        self.assertAlmostEqual(1, state['rate'])
+
+    def test_per_sample_errors(self):
+        """Tests invalid samples are reported and valid ones stored."""
+        future = timezone.now() + datetime.timedelta(days=1)
+        response = self.post_batch([
+            self.sample(0),
+            self.sample(1, latitude=100),
+            'Hi!',
+            self.sample(3, timestamp='June 1, 2000'),
+            self.sample(4, timestamp=future.isoformat()),
+            self.sample(5, uas_heading=370),
+            {'latitude': 0},
+            self.sample(7),
+        ])
+        self.assertEqual(200, response.status_code)
+
+        data = json.loads(response.content)
+        self.assertEqual(2, data['accepted'])
+        self.assertEqual([1, 2, 3, 4, 5, 6],
+                         [e['index'] for e in data['errors']])
+        self.assertEqual(2, UasTelemetry.objects.count())
+
+
 class TestTelemetryGet(TestCase):
     """Test telemetry view GET."""
 
@@ -401,3 +523,264 @@ class TestTelemetryGet(TestCase):
             time = iso8601.parse_date(entry['timestamp'])
             self.assertGreater(time, self.year2001)
             self.assertLess(time, self.year2002)
+
+    def get_pages(self, params):
+        """Gets pages of telemetry with cursors until a page is empty."""
+        pages = []
+        cursor = ''
+        while True:
+            response = self.client.get(telemetry_url,
+                                       dict(params, cursor=cursor))
+            self.assertEqual(200, response.status_code)
+            data = json.loads(response.content)
+            if not data['telemetry']:
+                self.assertEqual(cursor, data['cursor'])
+                return pages
+            pages.append(data['telemetry'])
+            cursor = data['cursor']
+
+    def test_cursor(self):
+        """Pages of logs are returned oldest first, without duplicates."""
+        telem = self.create_logs(self.user1, num=25, start=self.year2000)
+
+        pages = self.get_pages({'limit': 10})
+        self.assertEqual([10, 10, 5], [len(page) for page in pages])
+        self.assertEqual([t.pk for t in telem],
+                         [entry['id'] for page in pages for entry in page])
+
+    def test_cursor_ties(self):
+        """Logs with the same timestamp are split across pages once."""
+        telem = self.create_logs(self.user1,
+                                 num=7,
+                                 start=self.year2000,
+                                 delta=datetime.timedelta())
+
+        pages = self.get_pages({'limit': 3})
+        self.assertEqual(sorted(t.pk for t in telem),
+                         [entry['id'] for page in pages for entry in page])
+
+    def test_cursor_filters(self):
+        """Cursors are combined with the other parameters."""
+        self.create_logs(self.user1, num=10, start=self.year2000)
+        self.create_logs(self.user2, num=10, start=self.year2001)
+        self.create_logs(self.user2, num=10, start=self.year2002)
+
+        pages = self.get_pages({'limit': 4,
+                                'user': self.user2.pk,
+                                'before': self.year2002.isoformat()})
+        entries = [entry for page in pages for entry in page]
+        self.assertEqual(10, len(entries))
+        for entry in entries:
+            self.assertEqual(self.user2.pk, entry['user'])
+
+    def test_cursor_tail(self):
+        """Logs added after the last page are returned from its cursor."""
+        self.create_logs(self.user1, num=5, start=self.year2000)
+        response = self.client.get(telemetry_url, {'cursor': ''})
+        cursor = json.loads(response.content)['cursor']
+
+        telem = self.create_logs(self.user1, num=2, start=self.year2001)
+        response = self.client.get(telemetry_url, {'cursor': cursor})
+        data = json.loads(response.content)
+        self.assertEqual([t.pk for t in telem],
+                         [entry['id'] for entry in data['telemetry']])
+
+    def test_invalid_cursor(self):
+        """Invalid cursor parameter"""
+        response = self.client.get(telemetry_url, {'cursor': 'Hi!'})
+        self.assertEqual(400, response.status_code)
+
+
+class TestTelemetryStream(TestCase):
+    """Tests the TelemetryStream view."""
+
+    def setUp(self):
+        self.superuser = User.objects.create_superuser(
+            'superuser', 'email@example.com', 'superpass')
+        self.user = User.objects.create_user('testuser', 'testemail@x.com',
+                                             'testpass')
+
+        response = self.client.post(login_url, {
+            'username': 'superuser',
+            'password': 'superpass'
+        })
+        self.assertEqual(200, response.status_code)
+
+    def post_telemetry(self, latitude):
+        """Posts telemetry as the test user, with a separate client."""
+        client = Client()
+        client.post(login_url, {'username': 'testuser',
+                                'password': 'testpass'})
+        response = client.post(telemetry_url, {
+            'latitude': latitude,
+            'longitude': 0,
+            'altitude_msl': 0,
+            'uas_heading': 0,
+        })
+        self.assertEqual(200, response.status_code)
+
+    def test_normal_user(self):
+        """Normal users not allowed access."""
+        client = Client()
+        client.post(login_url, {'username': 'testuser',
+                                'password': 'testpass'})
+        response = client.get(telemetry_stream_url)
+        self.assertEqual(403, response.status_code)
+
+    def test_invalid_user(self):
+        """Test invalid and unknown user parameters."""
+        response = self.client.get(telemetry_stream_url, {'user': 'foo'})
+        self.assertEqual(400, response.status_code)
+        response = self.client.get(telemetry_stream_url, {'user': 1000})
+        self.assertEqual(400, response.status_code)
+
+    def test_stream(self):
+        """Uploaded telemetry is streamed as events."""
+        response = self.client.get(telemetry_stream_url,
+                                   {'user': self.user.pk})
+        self.assertEqual(200, response.status_code)
+        self.assertEqual('text/event-stream', response['Content-Type'])
+        events = iter(response.streaming_content)
+        self.assertEqual('retry: 1000\n\n', next(events))
+
+        self.post_telemetry(10)
+        event = next(events)
+        self.assertTrue(event.startswith('data: '))
+        self.assertTrue(event.endswith('\n\n'))
+        data = json.loads(event[len('data: '):])
+        self.assertEqual(self.user.pk, data['user'])
+        self.assertEqual(10, data['latitude'])
+        response.close()
+
+    def test_stream_batch(self):
+        """Uploaded batches are streamed with the ids of the stored logs."""
+        response = self.client.get(telemetry_stream_url,
+                                   {'user': self.user.pk})
+        events = iter(response.streaming_content)
+        self.assertEqual('retry: 1000\n\n', next(events))
+
+        client = Client()
+        client.post(login_url, {'username': 'testuser',
+                                'password': 'testpass'})
+        now = timezone.now()
+        samples = [{
+            'timestamp': (now - datetime.timedelta(seconds=3 - i)).isoformat(),
+            'latitude': i,
+            'longitude': 0,
+            'altitude_msl': 0,
+            'uas_heading': 0,
+        } for i in range(3)]
+        batch_response = client.post(telemetry_batch_url,
+                                     data=json.dumps(samples),
+                                     content_type='application/json')
+        self.assertEqual(200, batch_response.status_code)
+
+        data = [json.loads(event[len('data: '):])
+                for event in next(events).split('\n\n') if event]
+        logs = UasTelemetry.by_user(self.user)
+        self.assertEqual([log.pk for log in logs], [d['id'] for d in data])
+        self.assertEqual([0, 1, 2], [d['latitude'] for d in data])
+        response.close()
+
+    def test_keepalive_and_end(self):
+        """Idle streams send keepalives and end after the max time."""
+        with self.settings(TELEMETRY_STREAM_KEEPALIVE_SEC=0.01,
+                           TELEMETRY_STREAM_MAX_SEC=0.05):
+            response = self.client.get(telemetry_stream_url)
+            events = list(response.streaming_content)
+        self.assertEqual('retry: 1000\n\n', events[0])
+        self.assertEqual(set([': keepalive\n\n']), set(events[1:]))
+
+
+class TestTelemetryViolations(TestCase):
+    """Tests the violations found as telemetry is uploaded."""
+
+    fixtures = ['testdata/sample_mission.json']
+
+    def setUp(self):
+        cache.clear()
+        self.superuser = User.objects.create_superuser(
+            'superuser', 'email@example.com', 'superpass')
+        self.user = User.objects.create_user('testuser', 'testemail@x.com',
+                                             'testpass')
+        TakeoffOrLandingEvent(user=self.user, uas_in_air=True).save()
+
+        response = self.client.post(login_url, {
+            'username': 'superuser',
+            'password': 'superpass'
+        })
+        self.assertEqual(200, response.status_code)
+
+        self.obst = StationaryObstacle.objects.get(pk=25)
+        self.user_client = Client()
+        self.user_client.post(login_url, {'username': 'testuser',
+                                          'password': 'testpass'})
+
+    def post_collision(self):
+        """Posts telemetry inside a stationary obstacle."""
+        response = self.user_client.post(telemetry_url, {
+            'latitude': self.obst.gps_position.latitude,
+            'longitude': self.obst.gps_position.longitude,
+            'altitude_msl': self.obst.cylinder_height / 2,
+            'uas_heading': 0,
+        })
+        self.assertEqual(200, response.status_code)
+
+    def get_team(self):
+        """Gets the violations of the test user."""
+        response = self.client.get(telemetry_violations_url)
+        self.assertEqual(200, response.status_code)
+        teams = json.loads(response.content)
+        return [t for t in teams if t['id'] == self.user.pk][0]
+
+    def test_normal_user(self):
+        """Normal users not allowed access."""
+        response = self.user_client.get(telemetry_violations_url)
+        self.assertEqual(403, response.status_code)
+        response = self.user_client.get(telemetry_violation_stream_url)
+        self.assertEqual(403, response.status_code)
+
+    def test_violations(self):
+        """Violations are found as telemetry is uploaded."""
+        team = self.get_team()
+        self.assertEqual([], team['stationary_obst_collision'])
+        self.assertEqual(0, team['out_of_bounds_violations'])
+
+        self.post_collision()
+
+        team = self.get_team()
+        self.assertEqual([25], team['stationary_obst_collision'])
+
+    def test_batch(self):
+        """Violations are found in uploaded batches."""
+        response = self.user_client.post(
+            telemetry_batch_url,
+            data=json.dumps([{
+                'timestamp': timezone.now().isoformat(),
+                'latitude': self.obst.gps_position.latitude,
+                'longitude': self.obst.gps_position.longitude,
+                'altitude_msl': self.obst.cylinder_height / 2,
+                'uas_heading': 0,
+            }]),
+            content_type='application/json')
+        self.assertEqual(200, response.status_code)
+
+        self.assertEqual([25], self.get_team()['stationary_obst_collision'])
+
+    def test_stream(self):
+        """Violations are streamed as alerts."""
+        response = self.client.get(telemetry_violation_stream_url)
+        self.assertEqual(200, response.status_code)
+        events = iter(response.streaming_content)
+        self.assertEqual('retry: 1000\n\n', next(events))
+
+        self.post_collision()
+        alerts = [json.loads(event[len('data: '):])
+                  for event in next(events).split('\n\n') if event]
+        self.assertIn({
+            'user': self.user.pk,
+            'timestamp': alerts[0]['timestamp'],
+            'violation': 'stationary_obst_collision',
+            'id': 25,
+        }, alerts)
+        response.close()
@@ -0,0 +1,168 @@
+"""Cache of values shared by all requests within a slice of time."""
+
+import datetime
+import math
+import threading
+import time
+from auvsi_suas.models.cached_artifact import CachedArtifact
+from django.core.cache import cache
+from django.utils import timezone
+
+# The time a worker may hold the lease to compute a value, in seconds.
+LEASE_TIMEOUT_SEC = 5
+# The number of times per quantum that workers check for a value another
+# worker is computing.
+LEASE_POLLS_PER_QUANTUM = 10
+# The interval at which each process adds its hits and misses to the counts
+# shared by all workers, in seconds.
+STATS_FLUSH_SEC = 10
+
+
+class TimeSlicedCache(object):
+    """Caches a value for each quantum of time, shared by all requests.
+
+    Time is divided into quanta of a configurable length, and the value for
+    each quantum is computed once for the start of the quantum and shared by
+    all users and workers using the cache.
+
+    Only one request computes each value. Within a process, concurrent
+    requests wait on a lock. Across processes, the first worker takes a lease
+    in the cache and the others wait for its value, computing it themselves
+    only if it does not appear within the quantum.
+
+    Hits and misses are counted in each process, and added to counts in the
+    cache shared by all workers every STATS_FLUSH_SEC, so requests don't write
+    to the cache to count.
+
+    The cached values are a CachedArtifact, invalidated when the models or
+    artifacts they are computed from change.
+    """
+
+    def __init__(self, name, quantum_sec, dependencies=()):
+        """Creates the cache.
+
+        Args:
+            name: The name of the cached value, used in cache keys.
+            quantum_sec: A function giving the length of the quantum in
+                seconds, so it may follow the settings.
+            dependencies: Optional. The dependencies of the values, as given
+                to CachedArtifact.
+        """
+        self.name = name
+        self.quantum_sec = quantum_sec
+        self.lock = threading.Lock()
+        self.counts_lock = threading.Lock()
+        self.counts = {'hits': 0, 'misses': 0}
+        self.counts_flush_time = time.time()
+        self.artifact = CachedArtifact('TimeSlicedCache/%s' % name,
+                                       dependencies)
+
+    def key(self, suffix):
+        """Gets the cache key for the suffix, for keys outside the artifact."""
+        return '/TimeSlicedCache/%s/%s' % (self.name, suffix)
+
+    def quantum(self, now=None):
+        """Gets the quantum of time.
+
+        Args:
+            now: Optional. The time within the quantum. Defaults to now.
+        Returns:
+            A tuple (index, start) of the index of the quantum since the epoch,
+            and the datetime at which the quantum starts.
+        """
+        if now is None:
+            now = timezone.now()
+        quantum_sec = self.quantum_sec()
+        epoch = datetime.datetime(1970, 1, 1, tzinfo=timezone.utc)
+        index = int(math.floor((now - epoch).total_seconds() / quantum_sec))
+        start = epoch + datetime.timedelta(seconds=index * quantum_sec)
+        return (index, start)
+
+    def get(self, compute, now=None):
+        """Gets the value for the quantum, computing it if needed.
+
+        Args:
+            compute: A function of the datetime of the start of the quantum,
+                giving the value. The value must not be None.
+            now: Optional. The time within the quantum. Defaults to now.
+        Returns:
+            The value for the quantum.
+        """
+        (index, start) = self.quantum(now)
+        key = self.artifact.key(index)
+
+        value = cache.get(key)
+        if value is not None:
+            self.count('hits')
+            return value
+
+        with self.lock:
+            value = cache.get(key)
+            if value is None and not cache.add(key + '/lease', True,
+                                               LEASE_TIMEOUT_SEC):
+                value = self.wait_for(key)
+            if value is not None:
+                self.count('hits')
+                return value
+
+            value = compute(start)
+            timeout = int(math.ceil(self.quantum_sec())) + 1
+            cache.set(key, value, timeout)
+            self.count('misses')
+            return value
+
+    def wait_for(self, key):
+        """Waits up to a quantum for another worker to compute a value.
+
+        Args:
+            key: The cache key of the value.
+        Returns:
+            The value, or None if it was not computed in time.
+        """
+        quantum_sec = self.quantum_sec()
+        for _ in xrange(LEASE_POLLS_PER_QUANTUM):
+            time.sleep(quantum_sec / LEASE_POLLS_PER_QUANTUM)
+            value = cache.get(key)
+            if value is not None:
+                return value
+        return None
+
+    def count(self, counter):
+        """Increments a counter, adding it to the shared counts when due."""
+        with self.counts_lock:
+            self.counts[counter] += 1
+            due = time.time() - self.counts_flush_time >= STATS_FLUSH_SEC
+        if due:
+            self.flush_counts()
+
+    def flush_counts(self):
+        """Adds the process's counts to the counts shared by all workers."""
+        with self.counts_lock:
+            counts = self.counts
+            self.counts = {'hits': 0, 'misses': 0}
+            self.counts_flush_time = time.time()
+        for (counter, count) in counts.items():
+            if count == 0:
+                continue
+            key = self.key(counter)
+            cache.add(key, 0, None)
+            try:
+                cache.incr(key, count)
+            except ValueError:
+                # Counter evicted since added, start it again.
+                cache.set(key, count, None)
+
+    def stats(self):
+        """Gets the hit statistics of the cache.
+
+        Returns:
+            A dict with the number of 'hits' and 'misses', and the 'hit_ratio'
+            of hits to requests, which is None without requests.
+        """
+        self.flush_counts()
+        hits = cache.get(self.key('hits'), 0)
+        misses = cache.get(self.key('misses'), 0)
+        hit_ratio = None
+        if hits + misses > 0:
+            hit_ratio = float(hits) / (hits + misses)
+        return {'hits': hits, 'misses': misses, 'hit_ratio': hit_ratio}
@@ -0,0 +1,114 @@
+"""Tests for the time_sliced_cache module."""
+
+import datetime
+import threading
+import time
+from auvsi_suas.views.time_sliced_cache import STATS_FLUSH_SEC
+from auvsi_suas.views.time_sliced_cache import TimeSlicedCache
+from django.core.cache import cache
+from django.test import TestCase
+from django.utils import timezone
+
+
+class TestTimeSlicedCache(TestCase):
+    """Tests the TimeSlicedCache."""
+
+    def setUp(self):
+        cache.clear()
+        self.quantum_sec = 0.05
+        self.cache = TimeSlicedCache('Test', lambda: self.quantum_sec)
+        self.now = datetime.datetime(2000, 1, 1, 0, 0, 0, 20000,
+                                     tzinfo=timezone.utc)
+        self.computed = []
+
+    def compute(self, start):
+        """Computes a value, recording the time it is computed for."""
+        self.computed.append(start)
+        return 'value %d' % len(self.computed)
+
+    def test_quantum(self):
+        """Times are divided into quanta."""
+        (index, start) = self.cache.quantum(self.now)
+        self.assertEqual(int(946684800 / self.quantum_sec), index)
+        self.assertEqual(self.now.replace(microsecond=0), start)
+
+        (next_index, next_start) = self.cache.quantum(
+            self.now + datetime.timedelta(seconds=self.quantum_sec))
+        self.assertEqual(index + 1, next_index)
+        self.assertAlmostEqual(self.quantum_sec,
+                               (next_start - start).total_seconds())
+
+    def test_computed_once(self):
+        """The value is computed once per quantum, for its start."""
+        self.assertEqual('value 1', self.cache.get(self.compute, self.now))
+        self.assertEqual('value 1', self.cache.get(
+            self.compute, self.now + datetime.timedelta(seconds=0.01)))
+        self.assertEqual([self.now.replace(microsecond=0)], self.computed)
+
+        later = self.now + datetime.timedelta(seconds=self.quantum_sec)
+        self.assertEqual('value 2', self.cache.get(self.compute, later))
+        self.assertEqual(2, len(self.computed))
+
+    def test_stats(self):
+        """Hits and misses are counted."""
+        self.assertEqual({'hits': 0,
+                          'misses': 0,
+                          'hit_ratio': None}, self.cache.stats())
+
+        for _ in xrange(4):
+            self.cache.get(self.compute, self.now)
+        self.assertEqual({'hits': 3,
+                          'misses': 1,
+                          'hit_ratio': 0.75}, self.cache.stats())
+
+    def test_stats_flushed(self):
+        """Counts are only added to the cache once due, or for stats."""
+        self.cache.get(self.compute, self.now)
+        self.cache.get(self.compute, self.now)
+        self.assertIsNone(cache.get(self.cache.key('hits')))
+
+        self.cache.counts_flush_time -= STATS_FLUSH_SEC
+        self.cache.get(self.compute, self.now)
+        self.assertEqual(2, cache.get(self.cache.key('hits')))
+        self.assertEqual(1, cache.get(self.cache.key('misses')))
+
+    def test_single_flight(self):
+        """Concurrent requests compute the value once."""
+
+        def slow_compute(start):
+            time.sleep(0.1)
+            return self.compute(start)
+
+        results = []
+        threads = [threading.Thread(
+            target=lambda: results.append(self.cache.get(slow_compute,
+                                                         self.now)))
+                   for _ in xrange(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(['value 1'] * 5, results)
+        self.assertEqual(1, len(self.computed))
+
+    def test_lease_held(self):
+        """Waits for a value another worker is computing."""
+        (index, _) = self.cache.quantum(self.now)
+        key = self.cache.artifact.key(index)
+        cache.add(key + '/lease', True)
+
+        # Computes the value itself if the other worker never does.
+        self.assertEqual('value 1', self.cache.get(self.compute, self.now))
+
+        # Uses the value of the other worker if it appears.
+        later = self.now + datetime.timedelta(seconds=self.quantum_sec)
+        (index, _) = self.cache.quantum(later)
+        key = self.cache.artifact.key(index)
+        cache.add(key + '/lease', True)
+        timer = threading.Timer(self.quantum_sec / 2,
+                                lambda: cache.set(key, 'other value'))
+        timer.start()
+        self.assertEqual('other value', self.cache.get(self.compute, later))
+        timer.join()
+        self.assertEqual(1, len(self.computed))
@@ -1,3 +1,4 @@
+from auvsi_suas.views.cache_stats import CacheStats
 from auvsi_suas.views.clear_cache import ClearCache
 from auvsi_suas.views.login import Login
 from auvsi_suas.views.missions import Missions
@@ -5,7 +6,10 @@ from auvsi_suas.views.obstacles import Obstacles
 from auvsi_suas.views.server_info import ServerInfo
 from auvsi_suas.views.targets import Targets, TargetsId, TargetsIdImage
 from auvsi_suas.views.teams import Teams, TeamsId
-from auvsi_suas.views.telemetry import Telemetry
+from auvsi_suas.views.telemetry import Telemetry, TelemetryBatch
+from auvsi_suas.views.telemetry import TelemetryStream
+from auvsi_suas.views.telemetry import TelemetryViolations
+from auvsi_suas.views.telemetry import TelemetryViolationStream
 from auvsi_suas.views.auvsi_admin.evaluate_teams import EvaluateTeams
 from auvsi_suas.views.auvsi_admin.export_kml import ExportKml
 from auvsi_suas.views.auvsi_admin.index import Index
@@ -23,6 +27,15 @@ urlpatterns = patterns(
     url(r'^api/server_info$', ServerInfo.as_view(), name='server_info'),
     url(r'^api/obstacles$', Obstacles.as_view(), name='obstacles'),
     url(r'^api/telemetry$', Telemetry.as_view(), name='telemetry'),
+    url(r'^api/telemetry/batch$', TelemetryBatch.as_view(),
+        name='telemetry_batch'),
+    url(r'^api/telemetry/stream$', TelemetryStream.as_view(),
+        name='telemetry_stream'),
+    url(r'^api/telemetry/violations$', TelemetryViolations.as_view(),
+        name='telemetry_violations'),
+    url(r'^api/telemetry/violations/stream$',
+        TelemetryViolationStream.as_view(),
+        name='telemetry_violation_stream'),
     url(r'^api/targets$', Targets.as_view(), name='targets'),
     url(r'^api/targets/(?P<pk>\d+)$', TargetsId.as_view(), name='targets_id'),
     url(r'^api/targets/(?P<pk>\d+)/image$', TargetsIdImage.as_view(),
@@ -32,6 +45,7 @@ urlpatterns = patterns(
     url(r'^api/teams$', Teams.as_view(), name='teams'),
     url(r'^api/teams/(?P<pk>\d+)$', TeamsId.as_view(), name='teams_id'),
     url(r'^api/clear_cache$', ClearCache.as_view(), name='clear_cache'),
+    url(r'^api/cache_stats$', CacheStats.as_view(), name='cache_stats'),
     # Admin access views
     url(r'^$', Index.as_view(), name='index'),
     url(r'^auvsi_admin/evaluate_teams.csv$', EvaluateTeams.as_view(),
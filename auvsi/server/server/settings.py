@@ -93,6 +93,26 @@ CACHES = {
     }
 }
 
+# Whether to share the cache between all of the server's processes on this
+# machine, so each value is computed once rather than once per process. The
+# shared cache is kept in files under SHARED_CACHE_DIR.
+SHARED_CACHE = False
+SHARED_CACHE_DIR = '/var/tmp/auvsi_suas_cache'
+# The version of the shared cache's keys. Increase it when the format of
+# cached values changes, so values left by an older server aren't read.
+SHARED_CACHE_VERSION = 1
+if SHARED_CACHE:
+    CACHES['default'] = {
+        'BACKEND': 'auvsi_suas.shared_cache.SharedFileCache',
+        'LOCATION': SHARED_CACHE_DIR,
+        'TIMEOUT': 30,
+        'VERSION': SHARED_CACHE_VERSION,
+        'OPTIONS': {
+            # Culling lists the directory, so keep it small.
+            'MAX_ENTRIES': 10000
+        }
+    }
+
 # Logging
 
 LOGGING = {
@@ -177,5 +197,56 @@ TEST_LOADTEST_TIME = 10.0
 # (1.5x safety factor, 10Hz, 4 interfaces)
 TEST_LOADTEST_INTEROP_MIN_RATE = 1.5 * 10.0 * 4
 
+# The max number of samples accepted in a single telemetry batch upload.
+TELEMETRY_BATCH_MAX_SAMPLES = 1000
+
+# Telemetry streams send a comment after this many seconds without telemetry,
+# so idle connections aren't closed.
+TELEMETRY_STREAM_KEEPALIVE_SEC = 15
+# Telemetry streams end after this many seconds, freeing their server thread,
+# and clients reconnect after the retry delay.
+TELEMETRY_STREAM_MAX_SEC = 300
+TELEMETRY_STREAM_RETRY_SEC = 1
+# The max number of telemetry logs waiting to be sent on a stream. Streams
+# which fall behind drop their oldest logs.
+TELEMETRY_STREAM_MAX_PENDING = 1000
+
+# Obstacle and server info access logs are buffered, and written in batches
+# once this many are buffered or the oldest has waited this long. With a max
+# of 1 log, logs are written as they are made.
+ACCESS_LOG_BUFFER_MAX_LOGS = 500
+ACCESS_LOG_BUFFER_MAX_DELAY_SEC = 1.0
+# Whether buffered access logs are written when the server shuts down, and
+# kept to retry when writing fails.
+ACCESS_LOG_BUFFER_DURABLE = True
+# Logs which fail to be written alone are retried this many times before
+# being dropped. At most this many logs are buffered, dropping the oldest.
+ACCESS_LOG_BUFFER_MAX_RETRIES = 3
+ACCESS_LOG_BUFFER_MAX_BUFFERED = 100000
+
+# Whether cached values invalidated by a model change are rebuilt in the
+# background once the request making the change finishes.
+CACHE_EAGER_REBUILD = False
+
+# Obstacle requests without a time in the same quantum of this many seconds
+# share a response, computed once for the start of the quantum.
+OBSTACLES_CACHE_QUANTUM_SEC = 0.05
+
 # The max distance for a waypoint to be considered satisfied.
 SATISFIED_WAYPOINT_DIST_MAX_FT = 50
+
+# The number of telemetry logs compared to all waypoints at a time when
+# evaluating waypoints. Bounds the size of the waypoint distance matrix.
+SATISFIED_WAYPOINT_EVAL_CHUNK_LOGS = 10000
+
+# The number of worker processes used to evaluate teams by the evaluate_teams
+# command. With 1, teams are evaluated in the command's process. Requests
+# always evaluate teams in the requesting process.
+EVALUATE_TEAMS_PROCESSES = 1
+# The number of teams whose flight data is loaded at a time when evaluating
+# teams. Bounds memory use, at the cost of queries for each chunk.
+EVALUATE_TEAMS_CHUNK_TEAMS = 8
+# Only logs older than this many seconds are folded into the saved flight
+# checkpoints. Newer logs may still be committed out of ID order, so they
+# are read and scored again by each evaluation until they are this old.
+EVALUATE_TEAMS_SETTLE_SEC = 10